@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import prem_bot
+import tracing
+from session_store import InMemorySessionStore
+
+# Utterances processed concurrently; also bounds how many results are buffered to keep output in order
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "32"))
+# Conversations (records sharing a "session" key) kept alive at once; the least recently used are dropped
+BATCH_MAX_SESSIONS = int(os.environ.get("BATCH_MAX_SESSIONS", "10000"))
+
+
+# Parse one input line: a JSON object with "text" (and optional "id" and "session"), or a bare JSON string
+def parse_record(line):
+    record = json.loads(line)
+    if isinstance(record, str):
+        record = {"text": record}
+    if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+        raise ValueError("expected a JSON string or an object with a 'text' field")
+    return record
+
+
+# Streams utterances through the chatbot pipeline, reporting the replies and the route that produced them
+# (stage, intent acted on, confidence). Lookups are shared across the batch (team IDs are resolved once per team, identical API
+# calls are coalesced by the client cache), and only `concurrency` records are held in memory at a time
+class BatchRunner:
+    def __init__(self, concurrency=BATCH_CONCURRENCY, max_sessions=BATCH_MAX_SESSIONS):
+        self.concurrency = concurrency
+        self.sessions = InMemorySessionStore(idle_timeout=float("inf"), max_sessions=max_sessions)
+        self._locks = {}
+        self.processed = 0
+        self.errors = 0
+
+    # Answer one record. Records with the same "session" are one conversation and run in input order;
+    # records without one each start a new conversation
+    async def process(self, line_number, line):
+        import asyncio
+
+        try:
+            record = parse_record(line)
+        except ValueError as e:
+            self.errors += 1
+            return {"line": line_number, "error": str(e)}
+
+        result = {"line": line_number}
+        if "id" in record:
+            result["id"] = record["id"]
+        text = record["text"]
+        session_id = record.get("session")
+        try:
+            if session_id is None:
+                replies, route = await prem_bot.respond_routed_async(text, prem_bot.new_session())
+            else:
+                lock = self._locks.setdefault(session_id, asyncio.Lock())
+                async with lock:
+                    session = self.sessions.get(session_id) or prem_bot.new_session()
+                    replies, route = await prem_bot.respond_routed_async(text, session)
+                    for evicted in self.sessions.put(session_id, session):
+                        self._locks.pop(evicted, None)
+        except Exception as e:  # One bad record should not stop a million-line run
+            self.errors += 1
+            result["error"] = f"{type(e).__name__}: {e}"
+            return result
+        self.processed += 1
+        result.update({"text": text, "stage": route.stage, "intent": route.intent,
+                       "confidence": round(route.confidence, 4), "replies": replies})
+        return result
+
+    # Yield one result per input line, in input order, with at most `concurrency` records in flight
+    async def results(self, lines):
+        import asyncio
+        from collections import deque
+
+        in_flight = deque()
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            in_flight.append(asyncio.ensure_future(self.process(line_number, line)))
+            if len(in_flight) >= self.concurrency:
+                yield await in_flight.popleft()
+        while in_flight:
+            yield await in_flight.popleft()
+
+    # Write results to `output` as JSONL; returns the number of records processed
+    async def run(self, lines, output):
+        async for result in self.results(lines):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return self.processed
+
+
+# Process a JSONL stream (blocking); returns the BatchRunner so callers can read its counters
+def run_batch(lines, output, concurrency=BATCH_CONCURRENCY):
+    runner = BatchRunner(concurrency)
+    prem_bot.run_sync(runner.run(lines, output))
+    output.flush()
+    return runner
+
+
+# Replay utterances offline: python batch_runner.py [input.jsonl|-] [-o output.jsonl] [--concurrency N]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a JSONL file of utterances through the chatbot")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file, or - for stdout")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    args = parser.parse_args()
+
+    prem_bot.start_team_id_prefetch()
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        runner = run_batch(source, sink, args.concurrency)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    elapsed = time.perf_counter() - start
+    print(f"Processed {runner.processed} records ({runner.errors} errors) in {elapsed:.1f}s; "
+          f"API cache: {prem_bot.get_sports_client().cache.stats()}", file=sys.stderr)
+    if tracing.is_enabled():
+        print(json.dumps(tracing.report(), indent=2), file=sys.stderr)
@@ -0,0 +1,101 @@
+# Date/season parsing: DateParser against dateutil's fuzzy parser.
+#
+# Builds a corpus of answers to "When is the match?" in the shapes users type (ISO, compact, "15th
+# December 2024", "December 15, 2024", UK slashes, relative phrases, the odd free-form leftover), with
+# repeats as in real traffic. It checks that every date dateutil also understands comes out the same,
+# then times dateutil, DateParser with an empty cache, and DateParser with its cache warm.
+#
+#   python benchmarks/bench_date_parser.py --utterances 20000
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from date_parser import DateParser  # noqa: E402
+
+TODAY = datetime.date(2024, 11, 20)
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+               "October", "November", "December"]
+RELATIVE = ["next Saturday", "this Saturday", "on Sunday", "tomorrow", "this weekend", "next tuesday",
+            "today", "coming friday"]
+LEFTOVERS = ["sometime in March 2025", "the 2nd week of december, 2024", "Dec 2024", "2pm, 15 Dec"]
+
+
+def ordinal(day):
+    return f"{day}{'th' if 11 <= day <= 13 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')}"
+
+
+def random_answer(rng):
+    day = TODAY + datetime.timedelta(days=rng.randint(0, 400))
+    month = MONTH_NAMES[day.month - 1]
+    shape = rng.random()
+    if shape < 0.25:
+        return f"{day.isoformat()}"
+    if shape < 0.35:
+        return f"{day:%Y%m%d}"
+    if shape < 0.55:
+        return f"the {ordinal(day.day)} of {month} {day.year}"
+    if shape < 0.70:
+        return f"{month} {day.day}, {day.year}"
+    if shape < 0.80:
+        return f"{day.day:02d}/{day.month:02d}/{day.year}"
+    if shape < 0.97:
+        return rng.choice(RELATIVE)
+    return rng.choice(LEFTOVERS)
+
+
+def dateutil_parse(text):
+    from dateutil.parser import parse
+
+    default = datetime.datetime(TODAY.year, TODAY.month, TODAY.day)
+    try:
+        return parse(text, fuzzy=True, dayfirst="/" in text, default=default).date().isoformat()
+    except (ValueError, OverflowError):
+        return None
+
+
+def timed(fn, corpus):
+    start = time.perf_counter()
+    for text in corpus:
+        fn(text)
+    return (time.perf_counter() - start) / len(corpus) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DateParser vs dateutil benchmark")
+    parser.add_argument("--utterances", type=int, default=20000)
+    parser.add_argument("--distinct", type=int, default=2000, help="distinct answers the corpus is drawn from")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    pool = [random_answer(rng) for _ in range(args.distinct)]
+    corpus = [pool[min(int(rng.paretovariate(0.5)) - 1, len(pool) - 1)] for _ in range(args.utterances)]
+
+    # Parity with dateutil on absolute dates (dateutil has no notion of "next Saturday")
+    date_parser = DateParser(clock=lambda: TODAY)
+    mismatches = [(text, date_parser.parse_date(text), dateutil_parse(text)) for text in set(pool)
+                  if text not in RELATIVE and date_parser.parse_date(text) != dateutil_parse(text)]
+    for text, ours, theirs in mismatches[:10]:
+        print(f"  mismatch: {text!r}: DateParser {ours}, dateutil {theirs}")
+    print(f"Parity with dateutil on {len(set(pool)) - sum(t in RELATIVE for t in set(pool))} distinct absolute "
+          f"answers: {len(mismatches)} mismatches")
+
+    dateutil_us = timed(dateutil_parse, corpus)
+    cold = DateParser(clock=lambda: TODAY, cache_size=0)
+    cold_us = timed(cold.parse, corpus)
+    warm = DateParser(clock=lambda: TODAY)
+    warm_us = timed(warm.parse, corpus)
+    print(f"{len(corpus)} answers ({len(set(corpus))} distinct):")
+    print(f"  dateutil fuzzy parse:  {dateutil_us:7.2f} µs per answer")
+    print(f"  DateParser, no cache:  {cold_us:7.2f} µs per answer ({dateutil_us / cold_us:.0f}x), "
+          f"{cold.fallbacks} dateutil fallbacks")
+    print(f"  DateParser, cached:    {warm_us:7.2f} µs per answer ({dateutil_us / warm_us:.0f}x), {warm.stats()}")
+
+
+if __name__ == "__main__":
+    main()
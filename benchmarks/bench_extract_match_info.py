@@ -0,0 +1,146 @@
+# Throughput benchmark for extract_match_info.
+#
+# Runs a few thousand generated utterances through the original regex/str.replace/dateutil path
+# and through the compiled single-pass MatchInfoExtractor, and reports utterances per second
+# plus how often the two agree on (team1, team2, date_or_season). The differences are intended: the
+# original path left exact team names uncanonicalised ("burnley"), kept "between" in the first team
+# ("between man u" rather than Manchester United) and dropped "play" before splitting "X play Y" into
+# two teams. Each is counted, with an example.
+#
+#   python benchmarks/bench_extract_match_info.py --utterances 5000
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prem_bot  # noqa: E402
+
+TEMPLATES = [
+    "{a} vs {b}",
+    "{a} vs {b} in {year}",
+    "Results for {a} vs {b} in {year}",
+    "Game between {a} and {b} in {year}",
+    "When will {a} play {b}?",
+    "I want to book tickets for {a} vs {b} on {iso}",
+    "Book tickets for {a} vs {b} on {day} December {year}",
+    "When does {a} play next?",
+    "Show me {a} match results.",
+    "What were the results of {a} vs {b} in {year}?",
+]
+
+
+# map_alias_to_team_name as it was before the alias index: a linear, exact (case-insensitive) scan
+def legacy_map_alias_to_team_name(alias):
+    for team, aliases in prem_bot.team_aliases.items():
+        if alias.lower() in map(str.lower, aliases):
+            return team
+    return alias
+
+
+# The extractor as it was before the compiled engine, kept here as the benchmark baseline
+def legacy_extract_match_info(user_input):
+    from dateutil.parser import parse
+
+    normalized_input = re.sub(
+        r'\b(i want to book|book|tickets?|for|on|match|game|play|when|what|fixtures?|results?|did|will|were|of|does|the|show|find|recent|in|last|previous|is|was|next|me)\b',
+        '',
+        user_input,
+        flags=re.IGNORECASE
+    ).strip()
+    date_match = re.search(r'\b(\d{4}-\d{2}-\d{2}|\d{8}|\d{4}|(?:\d{1,2}(?:st|nd|rd|th)?\s\w+\s\d{4}))\b', normalized_input)
+    extracted_date = None
+    season = None
+    if date_match:
+        date_text = date_match.group(0)
+        try:
+            if len(date_text) == 4:
+                season = f"{date_text}-{int(date_text) + 1}"
+            else:
+                extracted_date = parse(date_text, fuzzy=True).strftime('%Y-%m-%d')
+            normalized_input = normalized_input.replace(date_text, '').strip()
+        except ValueError:
+            pass
+    normalized_input = normalized_input.replace(" and ", " vs ")
+    normalized_input = normalized_input.replace(" play ", " vs ")
+    team1, team2 = None, None
+    match_teams = re.search(r'(.+?)\s+vs\s+(.+)', normalized_input, re.IGNORECASE)
+    if match_teams:
+        team1, team2 = match_teams.groups()
+        team1 = legacy_map_alias_to_team_name(team1.strip()).replace(' ', '_')
+        team2 = legacy_map_alias_to_team_name(team2.strip()).replace(' ', '_')
+    else:
+        team_match = re.search(r'(.+)', normalized_input, re.IGNORECASE)
+        if team_match:
+            team1 = legacy_map_alias_to_team_name(team_match.group(1).strip()).replace(' ', '_')
+    return team1, team2, extracted_date or season
+
+
+# Why the legacy and compiled results differ for an utterance (see the header)
+def difference(utterance, legacy, compiled):
+    if [v and v.lower() for v in legacy] == [v and v.lower() for v in compiled]:
+        return "exact team names left uncanonicalised"
+    if legacy[0] and legacy[0].startswith("between_"):
+        return "'between' kept in the first team"
+    if " play " in utterance and legacy[1] is None:
+        return "'X play Y' not split into two teams"
+    return "other"
+
+
+# Generate preprocessed utterances mixing canonical names and aliases
+def build_corpus(size, seed=42):
+    rng = random.Random(seed)
+    names = [name for team, aliases in prem_bot.team_aliases.items() for name in [team] + aliases]
+    corpus = []
+    for _ in range(size):
+        a, b = rng.sample(names, 2)
+        year = rng.randint(2005, 2025)
+        text = rng.choice(TEMPLATES).format(
+            a=a, b=b, year=year, day=rng.randint(1, 28), iso=f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+        corpus.append(prem_bot.preprocess_input(text))
+    return corpus
+
+
+# Best-of-N utterances per second for an extractor over the corpus
+def throughput(extract, corpus, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for utterance in corpus:
+            extract(utterance)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="extract_match_info throughput benchmark")
+    parser.add_argument("--utterances", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.utterances)
+    differences, examples = {}, {}
+    for utterance in corpus:
+        legacy, compiled = legacy_extract_match_info(utterance), prem_bot.extract_match_info(utterance)
+        if legacy != compiled:
+            reason = difference(utterance, legacy, compiled)
+            differences[reason] = differences.get(reason, 0) + 1
+            examples.setdefault(reason, (utterance, legacy, compiled))
+    agree = len(corpus) - sum(differences.values())
+
+    legacy = throughput(legacy_extract_match_info, corpus, args.repeat)
+    compiled = throughput(prem_bot.extract_match_info, corpus, args.repeat)
+    print(f"utterances: {len(corpus)}")
+    print(f"legacy regex path:  {legacy:>10.0f} utterances/s")
+    print(f"compiled extractor: {compiled:>10.0f} utterances/s ({compiled / legacy:.1f}x)")
+    print(f"identical results:  {agree / len(corpus):.1%}; differences (intended, see the header):")
+    for reason, count in sorted(differences.items(), key=lambda item: -item[1]):
+        utterance, legacy, compiled = examples[reason]
+        print(f"  {count / len(corpus):6.1%} {reason}, e.g. {utterance!r}: {legacy} -> {compiled}")
+
+
+if __name__ == "__main__":
+    main()
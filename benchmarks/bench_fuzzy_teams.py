@@ -0,0 +1,110 @@
+# Accuracy and latency of typo-tolerant team resolution (TeamAliasIndex.fuzzy_resolve).
+#
+# Misspells every team name and alias with one or two random edits (deletion, insertion, substitution or
+# swapped neighbours) and checks how many resolve to the right team, timing uncached lookups. Checks that
+# everyday words close to a short alias ("place", "white", "blue") resolve to no team at all. Then
+# repeats the timing on an alias table padded with synthetic clubs, to show the cost does not grow with
+# the number of teams, and against difflib.get_close_matches as a brute-force reference.
+#
+#   python benchmarks/bench_fuzzy_teams.py --typos 2000 --clubs 3000
+import argparse
+import difflib
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prem_bot import team_aliases  # noqa: E402
+from team_index import TeamAliasIndex, normalize_team_key  # noqa: E402
+
+# Made-up club names are built from syllables like these, with the usual suffixes
+ONSETS = ["b", "br", "c", "ch", "d", "f", "g", "gr", "h", "k", "l", "m", "n", "p", "r", "s", "st", "t", "th", "w"]
+VOWELS = ["a", "e", "i", "o", "u", "ea", "ou", "ay"]
+CODAS = ["", "n", "r", "l", "m", "st", "ck", "rd", "ton", "ley", "ford", "ham", "field", "mouth"]
+SUFFIXES = ["United", "City", "Town", "Rovers", "Athletic", "Albion", "Wanderers", "County", "FC"]
+
+# Everyday words that are one or two edits from an alias but must not be taken for a team
+COMMON_WORDS = ["place", "white", "blue", "saint", "eagle", "town", "reds", "rover", "bees", "wolf", "fox",
+                "spur", "villa", "hello", "thanks", "please", "season", "ticket", "people", "player"]
+
+
+def misspell(name, rng, edits):
+    chars = list(name)
+    for _ in range(edits):
+        i = rng.randrange(len(chars))
+        kind = rng.choice(["delete", "insert", "substitute", "swap"])
+        if kind == "delete" and len(chars) > 4:
+            del chars[i]
+        elif kind == "insert":
+            chars.insert(i, rng.choice(string.ascii_lowercase))
+        elif kind == "swap" and i + 1 < len(chars):
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        else:
+            chars[i] = rng.choice(string.ascii_lowercase)
+    return "".join(chars)
+
+
+# team_aliases plus `clubs` made-up clubs, each with a couple of aliases
+def padded_aliases(clubs, rng):
+    aliases = dict(team_aliases)
+    while len(aliases) < len(team_aliases) + clubs:
+        name = "".join(rng.choice(ONSETS) + rng.choice(VOWELS) + rng.choice(CODAS)
+                       for _ in range(rng.randint(2, 3))).title()
+        aliases.setdefault(f"{name} {rng.choice(SUFFIXES)}", [name, f"{name} FC"])
+    return aliases
+
+
+def time_lookups(index, queries):
+    durations = []
+    for query in queries:
+        index.clear_fuzzy_cache()  # Time the index itself, not the memo
+        start = time.perf_counter()
+        index.fuzzy_resolve(query)
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return durations[len(durations) // 2] * 1e6, durations[int(len(durations) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzzy team resolution benchmark")
+    parser.add_argument("--typos", type=int, default=2000, help="misspelt names to resolve")
+    parser.add_argument("--clubs", type=int, default=3000, help="synthetic clubs added for the scaling run")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    index = TeamAliasIndex(team_aliases)
+    names = [(name, team) for team, aliases in team_aliases.items() for name in [team] + aliases
+             if len(normalize_team_key(name)) >= 6]
+    for edits in (1, 2):
+        cases = []
+        for _ in range(args.typos):
+            name, team = rng.choice(names)
+            cases.append((misspell(normalize_team_key(name), rng, edits), team))
+        correct = sum(index.canonical_name(query, fuzzy=True) == team for query, team in cases)
+        wrong = sum(index.canonical_name(query, fuzzy=True) not in (team, None) for query, team in cases)
+        p50, p99 = time_lookups(index, [query for query, _ in cases])
+        print(f"{edits} edit(s): {correct / len(cases):.1%} resolved correctly, {wrong / len(cases):.1%} to the "
+              f"wrong team; p50 {p50:.1f} µs, p99 {p99:.1f} µs ({len(index.keys())} keys)")
+
+    false_positives = [(word, index.canonical_name(word, fuzzy=True)) for word in COMMON_WORDS
+                       if index.resolve(word) is None and index.resolve(word, fuzzy=True) is not None]
+    print(f"Everyday words taken for a team: {len(false_positives)}/{len(COMMON_WORDS)} {false_positives}")
+
+    big = TeamAliasIndex(padded_aliases(args.clubs, rng))
+    keys = big.keys()
+    queries = [misspell(rng.choice(keys), rng, 1) for _ in range(min(args.typos, 500))]
+    p50, p99 = time_lookups(big, queries)
+    print(f"{len(big)} teams / {len(keys)} keys: p50 {p50:.1f} µs, p99 {p99:.1f} µs")
+
+    start = time.perf_counter()
+    for query in queries[:100]:
+        difflib.get_close_matches(query, keys, n=1, cutoff=0.75)
+    print(f"difflib.get_close_matches over the same keys: {(time.perf_counter() - start) / 100 * 1e6:.0f} µs per lookup")
+
+
+if __name__ == "__main__":
+    main()
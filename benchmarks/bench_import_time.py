@@ -0,0 +1,74 @@
+# Import-time regression benchmark for the prem_bot parsing utilities.
+#
+# Runs `python -X importtime -c "import prem_bot"` in a fresh interpreter several times and fails
+# (exit code 1) if the best cumulative import time goes past the budget, or if importing prem_bot
+# pulls in any of the heavy dependencies that should only load on first use.
+#
+#   python benchmarks/bench_import_time.py --budget-ms 50
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported just to use extract_match_info / is_valid_team
+HEAVY_MODULES = ["sklearn", "numpy", "scipy", "requests", "dateutil", "intent_model"]
+
+CHECK_SCRIPT = (
+    "import sys, prem_bot\n"
+    "prem_bot.extract_match_info('chelsea vs arsenal')\n"
+    "prem_bot.is_valid_team('Spurs')\n"
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))\n"
+).format(heavy=HEAVY_MODULES)
+
+
+# Return the cumulative import time of prem_bot in microseconds for one cold interpreter
+def measure_import_us():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import prem_bot"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+prem_bot\s*$", line)
+        if match:
+            return int(match.group(2))
+    raise RuntimeError("prem_bot was not found in the -X importtime output")
+
+
+# Return the heavy modules that got imported while using the parsing utilities
+def heavy_modules_loaded():
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK_SCRIPT], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    return [m for m in result.stdout.strip().split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check for prem_bot")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="maximum cold import time (best of runs)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings_ms = [measure_import_us() / 1000 for _ in range(args.runs)]
+    best_ms = min(timings_ms)
+    loaded = heavy_modules_loaded()
+
+    print(f"prem_bot cold import: best {best_ms:.1f} ms, worst {max(timings_ms):.1f} ms over {args.runs} runs "
+          f"(budget {args.budget_ms:.1f} ms)")
+
+    failed = False
+    if best_ms > args.budget_ms:
+        print(f"FAIL: import time {best_ms:.1f} ms is over the {args.budget_ms:.1f} ms budget")
+        failed = True
+    if loaded:
+        print(f"FAIL: parsing utilities imported heavy modules: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# Throughput benchmark for batched intent prediction.
+#
+# Compares classifying utterances one at a time with intent_pipeline.predict([text]) (the per-call
+# path) against one vectorized predict_proba per batch for batch sizes 1/8/64/256, and measures the
+# asyncio IntentBatcher with many concurrent callers. Then does the same for the exported IntentScorer
+# that serves conversations: it scores one utterance at a time, so batching it gains nothing and
+# predict_intent_async calls it directly.
+#
+#   python benchmarks/bench_intent_batching.py --utterances 4096
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prem_bot  # noqa: E402
+from intent_model import IntentBatcher, predict_with_confidence  # noqa: E402
+
+
+# Preprocessed utterances sampled from the training phrases with team names swapped in
+def build_corpus(size, seed=42):
+    rng = random.Random(seed)
+    teams = list(prem_bot.team_aliases)
+    corpus = []
+    for _ in range(size):
+        text, _ = rng.choice(prem_bot.training_data)
+        for team in ("Chelsea", "Arsenal", "Liverpool"):
+            text = text.replace(team, rng.choice(teams))
+        corpus.append(prem_bot.preprocess_input(text))
+    return corpus
+
+
+def per_call(pipeline, corpus):
+    for text in corpus:
+        pipeline.predict([text])
+
+
+def batched(pipeline, corpus, batch_size):
+    for i in range(0, len(corpus), batch_size):
+        predict_with_confidence(pipeline, corpus[i:i + batch_size])
+
+
+# All utterances submitted concurrently to one IntentBatcher on a single event loop
+def async_batcher(pipeline, corpus, batch_size):
+    async def run():
+        batcher = IntentBatcher(pipeline, max_batch_size=batch_size)
+        await asyncio.gather(*(batcher.predict(text) for text in corpus))
+    asyncio.run(run())
+
+
+def throughput(fn, corpus, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched intent prediction benchmark")
+    parser.add_argument("--utterances", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pipeline = prem_bot.get_intent_pipeline()
+    corpus = build_corpus(args.utterances)
+
+    # Batched predictions must match the per-call path
+    assert [intent for intent, _ in predict_with_confidence(pipeline, corpus)] == \
+        [str(intent) for intent in pipeline.predict(corpus)]
+
+    baseline = throughput(lambda: per_call(pipeline, corpus), corpus, args.repeat)
+    print(f"{'path':<28} {'utterances/s':>13} {'vs per-call':>12}")
+    print(f"{'per-call predict':<28} {baseline:>13.0f} {1.0:>11.1f}x")
+    for batch_size in (1, 8, 64, 256):
+        rate = throughput(lambda: batched(pipeline, corpus, batch_size), corpus, args.repeat)
+        print(f"{f'predict_proba batch={batch_size}':<28} {rate:>13.0f} {rate / baseline:>11.1f}x")
+    for batch_size in (8, 64, 256):
+        rate = throughput(lambda: async_batcher(pipeline, corpus, batch_size), corpus, args.repeat)
+        print(f"{f'IntentBatcher max={batch_size}':<28} {rate:>13.0f} {rate / baseline:>11.1f}x")
+
+    scorer = prem_bot.get_intent_scorer()
+    direct = throughput(lambda: per_call(scorer, corpus), corpus, args.repeat)
+    print(f"{'IntentScorer per-call':<28} {direct:>13.0f} {direct / baseline:>11.1f}x")
+    rate = throughput(lambda: async_batcher(scorer, corpus, 64), corpus, args.repeat)
+    print(f"{'IntentScorer batcher max=64':<28} {rate:>13.0f} {rate / baseline:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
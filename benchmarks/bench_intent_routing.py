@@ -0,0 +1,79 @@
+# Which predictions the intent router acts on and which it sends to ambiguous_query.
+#
+# Checks that training phrases the model classifies correctly stay on their intents, that clear requests
+# do too, and that vague utterances ("tell me something", "i want to know") and unknown words go to
+# ambiguous_query. Then reports the share sent to ambiguous_query of templated match requests (the
+# extraction benchmark's corpus) and of random in-vocabulary inputs, next to what a fixed 0.15 confidence
+# threshold would have sent.
+#
+#   python benchmarks/bench_intent_routing.py --inputs 20000
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prem_bot  # noqa: E402
+from bench_extract_match_info import build_corpus  # noqa: E402
+from intent_router import STAGE_LOW_CONFIDENCE, IntentRouter  # noqa: E402
+
+# Requests clear enough to act on, with the intent they must stay on
+CLEAR = [
+    ("book tickets", "book_ticket"),
+    ("arsenal next match", "next_fixture"),
+    ("tell me about chelsea", "ambiguous_query"),
+]
+
+# Utterances the model has no real evidence for: they must go to ambiguous_query
+VAGUE = ["tell me something", "i want to know", "who won", "show me", "can you help", "give me info",
+         "i have a question", "hmm ok", "asdf qwer", "i like pizza"]
+
+
+def route(router, text):
+    return asyncio.run(router.classify(prem_bot.preprocess_input(text)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent routing check")
+    parser.add_argument("--inputs", type=int, default=20000, help="random in-vocabulary inputs")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    scorer = prem_bot.get_intent_scorer()
+
+    async def predict(text):
+        return scorer.predict_with_confidence([text])[0]
+
+    router = IntentRouter(predict, lambda text: None, prem_bot.intent_priors)
+
+    correct = [(text, label) for text, label in prem_bot.training_data
+               if scorer.predict([prem_bot.preprocess_input(text)])[0] == label]
+    for text, label in correct + CLEAR:
+        result = route(router, text)
+        assert result.intent == label, (text, label, result)
+    print(f"training phrases: all {len(correct)} correctly classified ones stay on their intents; "
+          f"clear requests: {len(CLEAR)}/{len(CLEAR)} acted on")
+
+    for text in VAGUE:
+        result = route(router, text)
+        assert result.stage == STAGE_LOW_CONFIDENCE, (text, result)
+    print(f"vague utterances: {len(VAGUE)}/{len(VAGUE)} sent to ambiguous_query")
+
+    rng = random.Random(args.seed)
+    vocabulary = sorted(scorer._terms)
+    samples = [("templated match requests", build_corpus(min(args.inputs, 5000), args.seed)),
+               ("random in-vocabulary inputs", [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 4)))
+                                                for _ in range(args.inputs)])]
+    for label, texts in samples:
+        results = [route(router, text) for text in texts]
+        lifted = sum(result.stage == STAGE_LOW_CONFIDENCE for result in results)
+        fixed = sum(result.confidence <= 0.15 for result in results)
+        print(f"{label} sent to ambiguous_query: {lifted / len(texts):.1%} "
+              f"(a fixed 0.15 threshold: {fixed / len(texts):.1%})")
+    print(f"thresholds: { {intent: round(t, 3) for intent, t in router.thresholds.items()} }")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Parity check and latency benchmark for the exported intent scorer.
+#
+# Exports the fitted sklearn pipeline to an IntentScorer, checks that both give the same intent and
+# probabilities (within 1e-9) on the training phrases plus a sampled corpus, then times one utterance
+# at a time through pipeline.predict_proba([text]) and scorer.predict_with_confidence([text]).
+# Finally checks that a fresh interpreter can classify from data/intent_scorer.json without sklearn.
+#
+#   python benchmarks/bench_intent_scorer.py --utterances 4096
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prem_bot  # noqa: E402
+from intent_model import IntentScorer, export_intent_scorer, training_data_hash, verify_intent_scorer  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVE_CHECK = """
+import sys
+import prem_bot
+prem_bot.predict_intents(["book two tickets for arsenal vs chelsea"])
+loaded = sorted(m for m in ("sklearn", "numpy", "scipy") if m in sys.modules)
+print(",".join(loaded))
+"""
+
+
+# Preprocessed utterances sampled from the training phrases with team names swapped in, plus noise words
+def build_corpus(size, seed=42):
+    rng = random.Random(seed)
+    teams = list(prem_bot.team_aliases)
+    noise = ["please", "mate", "asap", "tomorrow", "xyz", "the", "again"]
+    corpus = []
+    for _ in range(size):
+        text, _ = rng.choice(prem_bot.training_data)
+        for team in ("Chelsea", "Arsenal", "Liverpool"):
+            text = text.replace(team, rng.choice(teams))
+        if rng.random() < 0.5:
+            text += " " + " ".join(rng.sample(noise, rng.randint(1, 3)))
+        corpus.append(prem_bot.preprocess_input(text))
+    return corpus
+
+
+def time_per_call(predict, corpus):
+    start = time.perf_counter()
+    for text in corpus:
+        predict([text])
+    return (time.perf_counter() - start) / len(corpus)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--utterances", type=int, default=4096)
+    args = parser.parse_args()
+
+    pipeline = prem_bot.get_intent_pipeline()
+    scorer = IntentScorer(export_intent_scorer(pipeline, training_data_hash(prem_bot.training_data)))
+    corpus = build_corpus(args.utterances)
+
+    parity_texts = [prem_bot.preprocess_input(text) for text, _ in prem_bot.training_data] + corpus + [""]
+    verify_intent_scorer(pipeline, scorer, parity_texts)
+    print(f"Parity: {len(parity_texts)} utterances, identical intents, probabilities within 1e-9")
+
+    pipeline_time = time_per_call(pipeline.predict_proba, corpus)
+    scorer_time = time_per_call(scorer.predict_with_confidence, corpus)
+    print(f"{'path':<28} {'us/utterance':>13} {'speedup':>8}")
+    print(f"{'sklearn predict_proba':<28} {pipeline_time * 1e6:>13.1f} {1.0:>7.1f}x")
+    print(f"{'IntentScorer':<28} {scorer_time * 1e6:>13.1f} {pipeline_time / scorer_time:>7.1f}x")
+
+    prem_bot.get_intent_scorer()  # Make sure data/intent_scorer.json exists for the serve-time check
+    loaded = subprocess.run([sys.executable, "-c", SERVE_CHECK], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout.strip()
+    assert not loaded, f"serve-time classification imported {loaded}"
+    print("Serve path: classified a turn without importing sklearn, numpy or scipy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Scaling benchmark for the pre-fork worker pool.
+#
+# Runs the same batch of conversations on pools of 1, 2, 4, ... workers (up to the CPU count) and reports
+# throughput and memory per worker. Each worker's memory is split into RSS, PSS (shared pages divided
+# between the processes mapping them) and private pages: the private figure is what one more worker
+# costs, compared against a standalone process that loads everything itself. The turns need no network
+# (utterances without team names), so the numbers measure the bot rather than TheSportsDB.
+#
+#   python benchmarks/bench_prefork.py --sessions 400 --turns 25 --workers 1 2 4 8
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+# In-memory stores, and no fixtures sync, so workers only share what the parent preloaded
+for name in ("FIXTURES_DB_PATH", "PROFILES_DB_PATH", "TICKETS_DB_PATH", "TEAM_IDS_PATH"):
+    os.environ[name] = ""
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import prem_bot  # noqa: E402
+from worker_pool import WorkerPool  # noqa: E402
+
+STANDALONE = ("import prem_bot, worker_pool; prem_bot.get_intent_scorer(); prem_bot.load_team_id_snapshot(); "
+              "import json; print(json.dumps(worker_pool.memory_usage()))")
+
+
+# Utterances from the training data that name no team, so answering them never calls the API
+def offline_utterances():
+    return [text for text, _ in prem_bot.training_data
+            if prem_bot.extract_match_info(prem_bot.preprocess_input(text))[:2] == (None, None)]
+
+
+def run_pool(workers, conversations):
+    pool = WorkerPool(workers).start()
+
+    async def conversation(session_id, messages):
+        for message in messages:
+            await pool.turn(session_id, message)
+
+    async def run():
+        await pool.turn("warm-up", "hello")
+        start = time.perf_counter()
+        await asyncio.gather(*(conversation(f"session-{i}", messages) for i, messages in enumerate(conversations)))
+        elapsed = time.perf_counter() - start
+        return elapsed, await pool.stats()
+
+    try:
+        return asyncio.run(run())
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork worker pool scaling benchmark")
+    cpus = os.cpu_count() or 1
+    parser.add_argument("--workers", type=int, nargs="*",
+                        default=sorted({1, 2} | {2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus}))
+    parser.add_argument("--sessions", type=int, default=400)
+    parser.add_argument("--turns", type=int, default=25, help="turns per session")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    utterances = offline_utterances()
+    conversations = [[rng.choice(utterances) for _ in range(args.turns)] for _ in range(args.sessions)]
+    total_turns = args.sessions * args.turns
+
+    standalone = json.loads(subprocess.run([sys.executable, "-c", STANDALONE], cwd=REPO_ROOT, check=True,
+                                           capture_output=True, text=True, env=os.environ).stdout)
+    results = {"cpu_count": cpus, "turns": total_turns, "standalone_process": standalone, "pools": []}
+    if not args.json:
+        print(f"{cpus} CPU(s); {total_turns} turns over {args.sessions} sessions")
+        print(f"Standalone process: RSS {standalone['rss_kb'] / 1024:.1f} MiB")
+        print(f"{'workers':>7} {'turns/s':>9} {'speedup':>8} {'RSS/worker':>11} {'PSS/worker':>11} "
+              f"{'private/worker':>15} {'total PSS':>10}")
+    base_rate = None
+    for workers in args.workers:
+        elapsed, stats = run_pool(workers, conversations)
+        rate = total_turns / elapsed
+        base_rate = base_rate or rate
+        per_worker = stats["workers"]
+        total_pss = stats["parent"].get("pss_kb", 0) + sum(w.get("pss_kb", 0) for w in per_worker)
+        results["pools"].append({"workers": workers, "turns_per_s": round(rate), "elapsed_s": round(elapsed, 3),
+                                 "total_pss_kb": total_pss, **stats})
+        if not args.json:
+            def mean(key):
+                return sum(w.get(key, 0) for w in per_worker) / len(per_worker) / 1024
+            print(f"{workers:>7} {rate:>9.0f} {rate / base_rate:>7.2f}x {mean('rss_kb'):>9.1f}Mi "
+                  f"{mean('pss_kb'):>9.1f}Mi {mean('private_kb'):>13.1f}Mi {total_pss / 1024:>8.1f}Mi")
+            for w in per_worker:
+                print(f"        worker {w['worker']}: {w['turns']} turns, {w['turns_per_s']} turns/s, "
+                      f"{w['cpu_s']}s CPU, RSS {w['rss_kb'] / 1024:.1f} MiB")
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
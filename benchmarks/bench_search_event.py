@@ -0,0 +1,107 @@
+# Head-to-head latency benchmark for search_event against a local TheSportsDB stub.
+#
+# Compares fetching team1_vs_team2 and team2_vs_team1 one after the other (the old path) with the
+# concurrent search_event, for a single season and for a batch of seasons. With a per-request
+# latency of L, the sequential path costs about 2L (2 * seasons * L) and search_event about L.
+# First checks that the answer does not depend on which orientation responds first: the slower one
+# holds the newest meetings.
+#
+#   python benchmarks/bench_search_event.py --latency-ms 50
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prem_bot  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+from sports_client import SportsDataClient, set_sports_client  # noqa: E402
+from stub_sportsdb import StubSportsDB  # noqa: E402
+
+
+# The old search_event fetch: one orientation, then the other, one season at a time
+def sequential_search(client, event_name, seasons):
+    team1, team2 = event_name.split("_vs_")
+    events = []
+    for name in (f"{team1}_vs_{team2}", f"{team2}_vs_{team1}"):
+        for season in seasons:
+            params = {"e": name, "s": season} if season else {"e": name}
+            response = client.get("searchevents.php", params)
+            if response is not None and response.status_code == 200:
+                events.extend(response.json().get("event", []) or [])
+    return events
+
+
+# Chelsea_vs_Arsenal answers at once with older meetings; Arsenal_vs_Chelsea answers later with newer ones
+def split_orientation_response(endpoint, params):
+    def event(date):
+        return {"strEvent": params["e"][0], "dateEvent": date}
+
+    if params["e"][0] == "Arsenal_vs_Chelsea":
+        time.sleep(0.05)
+        return {"event": [event("2024-05-01"), event("2025-05-01")]}
+    return {"event": [event("2022-01-01"), event("2023-01-01")]}
+
+
+# search_event must wait for both orientations before picking the latest meetings
+def check_orientations():
+    with StubSportsDB(latency=0, responder=split_orientation_response) as stub:
+        client = SportsDataClient(base_url=stub.base_url, cache=ResponseCache(max_entries=0), rate_limit=0)
+        set_sports_client(client)
+        for query_type, expected in (("future", "2025-05-01"), ("past", "2024-05-01")):
+            for search in (prem_bot.search_event,
+                           lambda *args, **kw: asyncio.run(prem_bot.search_event_async(*args, **kw))):
+                events = search("Chelsea_vs_Arsenal", query_type=query_type)
+                assert [e["dateEvent"] for e in events] == [expected], (query_type, events)
+        client.close()
+    print("orientations: the slower orientation's newer meetings are used (future 2025-05-01, past 2024-05-01)")
+
+
+# Median wall time in milliseconds of fn() over `runs` calls
+def median_ms(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="search_event latency benchmark")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub latency per request")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    check_orientations()
+    with StubSportsDB(latency=args.latency_ms / 1000) as stub:
+        # A zero-size cache keeps every run going to the stub so only the fan-out is measured
+        client = SportsDataClient(base_url=stub.base_url, cache=ResponseCache(max_entries=0), rate_limit=0)
+        set_sports_client(client)
+        event = "Chelsea_vs_Arsenal"
+        seasons = ["2019-2020", "2020-2021", "2021-2022", "2022-2023"]
+
+        print(f"stub latency: {args.latency_ms:.0f} ms per request")
+        cases = [
+            ("head-to-head, both", lambda: sequential_search(client, event, [None]),
+             lambda: prem_bot.search_event(event)),
+            ("head-to-head, future", lambda: sequential_search(client, event, [None]),
+             lambda: prem_bot.search_event(event, query_type="future")),
+            (f"{len(seasons)} seasons", lambda: sequential_search(client, event, seasons),
+             lambda: prem_bot.search_event(event, seasons)),
+        ]
+        for label, sequential, concurrent in cases:
+            sequential()  # warm up the connection pool
+            concurrent()
+            seq_ms = median_ms(sequential, args.runs)
+            con_ms = median_ms(concurrent, args.runs)
+            print(f"{label:<22} sequential {seq_ms:>7.1f} ms   search_event {con_ms:>7.1f} ms   "
+                  f"({seq_ms / con_ms:.1f}x)")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
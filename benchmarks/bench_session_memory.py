@@ -0,0 +1,74 @@
+# Memory per conversation: dialogue.Session (slots, enum steps) against the dict sessions it replaced.
+#
+# Allocates many sessions of each kind under tracemalloc, both idle (no booking in progress, the bulk of
+# what a server holds) and halfway through a booking, and reports bytes per session. The dict shapes are
+# the ones new_session() and handle_turn used to build. First checks that handle_turn still works on such
+# a dict: a turn outside a booking records current_intent and leaves the caller's other keys alone.
+#
+#   python benchmarks/bench_session_memory.py --sessions 200000
+import argparse
+import os
+import sys
+import tracemalloc
+
+os.environ.setdefault("PROFILES_DB_PATH", "")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dialogue import BookingStep, Session  # noqa: E402
+
+
+def dict_session(booking):
+    session = {"user_name": None, "awaiting_favourite_team": False, "state": {}}
+    if booking:
+        session["state"].update({"current_intent": "book_ticket", "team1": "Chelsea", "team2": "Arsenal",
+                                 "date": "2024-12-15", "venue": "Stamford Bridge", "seating_type": "VIP",
+                                 "pending_task": "ask_for_num_tickets"})
+    return session
+
+
+def slots_session(booking):
+    session = Session()
+    if booking:
+        state = session.state
+        state.team1, state.team2, state.date = "Chelsea", "Arsenal", "2024-12-15"
+        state.venue, state.seating_type = "Stamford Bridge", "VIP"
+        state.step = BookingStep.ASK_FOR_NUM_TICKETS
+    return session
+
+
+# A non-booking turn on a dict state, as older callers pass it
+def check_dict_state():
+    import prem_bot
+
+    state = {"current_intent": "book_ticket", "channel": "sms"}
+    prem_bot.handle_turn("Chelsea vs Arsenal in 2021", state)
+    assert state == {"current_intent": "past_season", "channel": "sms"}, state
+    print(f"dict state after a non-booking turn: {state}")
+
+
+# Bytes allocated per session by make(booking)
+def bytes_per_session(make, booking, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [make(booking) for _ in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del sessions
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-session memory benchmark")
+    parser.add_argument("--sessions", type=int, default=200000)
+    args = parser.parse_args()
+
+    check_dict_state()
+    for booking, label in ((False, "idle"), (True, "mid-booking")):
+        old = bytes_per_session(dict_session, booking, args.sessions)
+        new = bytes_per_session(slots_session, booking, args.sessions)
+        print(f"{label:12} dict {old:6.0f} B/session, slots {new:6.0f} B/session ({new / old:.0%}); "
+              f"1M sessions: {old * 1e6 / 2 ** 20:.0f} MiB -> {new * 1e6 / 2 ** 20:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
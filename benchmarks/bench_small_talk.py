@@ -0,0 +1,71 @@
+# Microbenchmark for small talk detection.
+#
+# Compares the original any(phrase in text) scan over per-category lists with the compiled
+# SmallTalkMatcher as the phrase table grows from the built-in phrases to hundreds of synthetic
+# ones. The matcher's cost per message should stay roughly flat while the scan grows with the table.
+#
+#   python benchmarks/bench_small_talk.py
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from small_talk_matcher import SMALL_TALK_TABLE, SmallTalk, SmallTalkMatcher  # noqa: E402
+
+MESSAGES = [
+    "Hello there", "hi", "thanks a lot", "how are you doing today", "goodbye for now",
+    "When does Arsenal play next?", "Book tickets for Chelsea vs Wolves", "Brighton vs Manchester United",
+    "what's the weather like in London", "show me liverpool match results from last season",
+    "I want 2 VIP tickets please", "my name is Alex",
+]
+
+
+# The check as it was before the matcher: lowercase, then scan each category's list in order
+def legacy_small_talk(table, user_input):
+    user_input = user_input.lower().strip()
+    for category, phrases, _ in table:
+        if any(phrase in user_input for phrase in phrases):
+            return category
+    return SmallTalk.NONE
+
+
+# Pad the real table with synthetic phrases until it holds num_phrases entries
+def build_table(num_phrases):
+    table = [(category, list(phrases), response) for category, phrases, response in SMALL_TALK_TABLE]
+    i = 0
+    while sum(len(phrases) for _, phrases, _ in table) < num_phrases:
+        table[i % len(table)][1].append(f"small talk phrase {i} zq")
+        i += 1
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Small talk matcher microbenchmark")
+    parser.add_argument("--sizes", default="0,100,400,1600", help="comma-separated phrase table sizes")
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    messages = [rng.choice(MESSAGES) for _ in range(args.messages)]
+    print(f"{'phrases':>8} {'scan us/msg':>12} {'matcher us/msg':>15} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        table = build_table(size)
+        matcher = SmallTalkMatcher(table)
+
+        # The matcher matches whole words; on these messages that gives the same categories as the scan
+        for message in MESSAGES:
+            assert matcher.match(message) is legacy_small_talk(table, message), message
+
+        scan_s = min(timeit.repeat(lambda: [legacy_small_talk(table, m) for m in messages], number=1, repeat=3))
+        matcher_s = min(timeit.repeat(lambda: [matcher.match(m) for m in messages], number=1, repeat=3))
+        phrases = sum(len(p) for _, p, _ in table)
+        scan_us = scan_s / len(messages) * 1e6
+        matcher_us = matcher_s / len(messages) * 1e6
+        print(f"{phrases:>8} {scan_us:>12.2f} {matcher_us:>15.2f} {scan_us / matcher_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Microbenchmark for team alias resolution.
+#
+# Compares the original linear scan over team_aliases with the compiled TeamAliasIndex as the
+# alias table grows from the 20 Premier League clubs to a synthetic multi-league roster. The
+# index's per-lookup cost should stay flat while the linear scan grows with the table.
+#
+#   python benchmarks/bench_team_lookup.py
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prem_bot import team_aliases  # noqa: E402
+from team_index import TeamAliasIndex  # noqa: E402
+
+
+# The lookup as it was before the index: scan every team and re-lowercase every alias list
+def linear_map_alias_to_team_name(aliases, alias):
+    for team, team_alias_list in aliases.items():
+        if alias.lower() in map(str.lower, team_alias_list):
+            return team
+    return alias
+
+
+# Pad the real alias table with synthetic clubs until it holds num_teams entries
+def build_roster(num_teams):
+    roster = dict(team_aliases)
+    i = 0
+    while len(roster) < num_teams:
+        roster[f"Club {i} Athletic"] = [f"Club {i}", f"C{i}A", f"The {i}ers"]
+        i += 1
+    return roster
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Team alias lookup microbenchmark")
+    parser.add_argument("--sizes", default="20,100,500,2000", help="comma-separated roster sizes")
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'teams':>6} {'linear ns/lookup':>18} {'index ns/lookup':>17} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        roster = build_roster(size)
+        index = TeamAliasIndex(roster)
+        all_aliases = [alias for alias_list in roster.values() for alias in alias_list]
+        queries = [rng.choice(all_aliases) for _ in range(args.lookups)] + ["Not A Team"] * (args.lookups // 10)
+
+        # Both implementations must agree before we time them
+        for query in queries:
+            assert (index.canonical_name(query) or query) == linear_map_alias_to_team_name(roster, query), query
+
+        linear_s = min(timeit.repeat(
+            lambda: [linear_map_alias_to_team_name(roster, q) for q in queries], number=1, repeat=3))
+        index_s = min(timeit.repeat(
+            lambda: [index.canonical_name(q) or q for q in queries], number=1, repeat=3))
+        linear_ns = linear_s / len(queries) * 1e9
+        index_ns = index_s / len(queries) * 1e9
+        print(f"{size:>6} {linear_ns:>18.0f} {index_ns:>17.0f} {linear_ns / index_ns:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
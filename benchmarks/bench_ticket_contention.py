@@ -0,0 +1,130 @@
+# Contention benchmark for the ticket inventory.
+#
+# Many buyers race for one fixture's seats, each with its own connection to a shared database file
+# (threads, or separate processes with --mode process). Demand far exceeds capacity, and some buyers
+# abandon their holds, which then have to expire and go back on sale. At the end the reservations are
+# counted from the database to prove nothing was oversold.
+#
+#   python benchmarks/bench_ticket_contention.py --buyers 400 --capacity 2000 --mode process
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dialogue import DialogueState  # noqa: E402
+from prem_bot import booking_fixture_key  # noqa: E402
+from ticket_inventory import TicketInventory  # noqa: E402
+
+FIXTURE = "2025-01-01:arsenal:chelsea"
+SEATING = "VIP"
+
+
+# One worker runs `buyers` buyers in turn; each keeps trying to book until the fixture is sold out.
+# Returns (holds, confirmations, abandoned, refused)
+def run_worker(path, buyers, args, seed):
+    rng = random.Random(seed)
+    inventory = TicketInventory(path, capacity={SEATING: args.capacity}, hold_ttl=args.hold_ttl)
+    holds = confirmations = abandoned = refused = 0
+    for _ in range(buyers):
+        for _ in range(args.attempts):
+            hold = inventory.hold(FIXTURE, SEATING, rng.randint(1, args.max_quantity))
+            if hold is None:
+                refused += 1
+                continue
+            holds += 1
+            if rng.random() < args.abandon:
+                abandoned += 1  # Walk away; the hold must expire before the seats are sold again
+                continue
+            if inventory.confirm(hold.hold_id):
+                confirmations += 1
+    inventory.close()
+    return holds, confirmations, abandoned, refused
+
+
+def run_worker_star(job):
+    return run_worker(*job)
+
+
+# Bookings for the same match typed in either team order share one capacity
+def check_team_order(capacity=2):
+    inventory = TicketInventory(":memory:", capacity={SEATING: capacity})
+    sold = 0
+    for team1, team2 in (("Chelsea", "Arsenal"), ("Arsenal", "Chelsea")):
+        state = DialogueState()
+        state.team1, state.team2, state.date = team1, team2, "2024-12-15"
+        hold = inventory.hold(booking_fixture_key(state), SEATING, capacity)
+        if hold is not None and inventory.confirm(hold.hold_id):
+            sold += capacity
+    assert sold == capacity, f"OVERSOLD: {sold} seats sold in either team order against {capacity}"
+    print(f"team order: both orders share one fixture ({sold}/{capacity} sold)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ticket inventory contention benchmark")
+    parser.add_argument("--buyers", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=16, help="concurrent threads or processes")
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--capacity", type=int, default=2000)
+    parser.add_argument("--attempts", type=int, default=5, help="booking attempts per buyer")
+    parser.add_argument("--max-quantity", type=int, default=4)
+    parser.add_argument("--abandon", type=float, default=0.2, help="fraction of holds never confirmed")
+    parser.add_argument("--hold-ttl", type=float, default=0.05, help="seconds before abandoned holds expire")
+    args = parser.parse_args()
+
+    check_team_order()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tickets.db")
+        TicketInventory(path, capacity={SEATING: args.capacity}).stats(FIXTURE, SEATING)  # Create the schema
+        per_worker = [args.buyers // args.workers + (i < args.buyers % args.workers) for i in range(args.workers)]
+        jobs = [(path, n, args, seed) for seed, n in enumerate(per_worker)]
+
+        start = time.perf_counter()
+        if args.mode == "process":
+            with multiprocessing.Pool(args.workers) as pool:
+                results = pool.map(run_worker_star, jobs)
+        else:
+            results = [None] * len(jobs)
+
+            def target(i):
+                results[i] = run_worker(*jobs[i])
+
+            threads = [threading.Thread(target=target, args=(i,)) for i in range(len(jobs))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - start
+
+        time.sleep(args.hold_ttl)
+        inventory = TicketInventory(path, capacity={SEATING: args.capacity})
+        inventory.release_expired()
+        stats = inventory.stats(FIXTURE, SEATING)
+        conn = sqlite3.connect(path)
+        reserved, bookings = conn.execute(
+            "SELECT COALESCE(SUM(quantity), 0), COUNT(*) FROM reservations WHERE fixture_key = ?",
+            (FIXTURE,)).fetchone()
+        conn.close()
+
+    holds, confirmations, abandoned, refused = (sum(column) for column in zip(*results))
+    print(f"{args.buyers} buyers on {args.workers} {args.mode} workers for {args.capacity} seats in {elapsed:.2f}s")
+    print(f"holds: {holds}  abandoned: {abandoned}  refused: {refused}  confirmed: {confirmations}")
+    print(f"reservations/sec: {confirmations / elapsed:.0f}  operations/sec: "
+          f"{(holds + confirmations + refused) / elapsed:.0f}")
+    print(f"seats sold: {stats['sold']}  reserved in bookings table: {reserved}  "
+          f"held after expiry: {stats['held']}  capacity: {stats['capacity']}")
+    assert bookings == confirmations, "every confirmation must produce exactly one reservation"
+    assert reserved == stats["sold"], "sold counter disagrees with the reservations table"
+    assert stats["sold"] <= stats["capacity"], "OVERSOLD"
+    assert stats["held"] == 0, "expired holds were not released"
+    print(f"oversold: {max(0, stats['sold'] - stats['capacity'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Overhead benchmark for per-turn tracing.
+#
+# Runs the same conversations against the local stub API with tracing off and on, reports the
+# per-turn cost of the instrumentation, then prints the per-stage latency percentiles and upstream
+# counters collected while it was on.
+#
+#   python benchmarks/bench_tracing.py --turns 3000
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import timeit
+
+os.environ.setdefault("FIXTURES_DB_PATH", "")
+os.environ.setdefault("PROFILES_DB_PATH", "")
+os.environ.setdefault("TICKETS_DB_PATH", "")
+os.environ.setdefault("SPORTSDB_RATE_LIMIT", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prem_bot  # noqa: E402
+import tracing  # noqa: E402
+from sports_client import SportsDataClient, set_sports_client  # noqa: E402
+from stub_sportsdb import StubSportsDB  # noqa: E402
+
+TEMPLATES = ["hello", "When does {a} play next?", "When was {a} last game?", "{a} vs {b}",
+             "{a} vs {b} in 2019", "who is the best player", "thanks"]
+
+
+def build_messages(count, seed=42):
+    rng = random.Random(seed)
+    teams = list(prem_bot.team_aliases)
+    return [rng.choice(TEMPLATES).format(a=rng.choice(teams), b=rng.choice(teams)) for _ in range(count)]
+
+
+async def run_turns(messages):
+    for message in messages:
+        await prem_bot.respond_async(message, prem_bot.new_session())
+
+
+def timed(messages):
+    start = time.perf_counter()
+    asyncio.run(run_turns(messages))
+    return (time.perf_counter() - start) / len(messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracing overhead benchmark")
+    parser.add_argument("--turns", type=int, default=3000)
+    args = parser.parse_args()
+
+    messages = build_messages(args.turns)
+    with StubSportsDB(latency=0.0) as stub:
+        set_sports_client(SportsDataClient(base_url=stub.base_url))
+        timed(messages)  # Warm the model, team IDs and response cache so both runs measure the same work
+
+        tracing.disable()
+        off = min(timed(messages) for _ in range(3))
+        sink = tracing.enable()
+        on = min(timed(messages) for _ in range(3))
+        tracing.disable()
+
+    number = 1000000
+    noop = timeit.timeit("with span('x'): pass", globals={"span": tracing.span}, number=number) / number
+    print(f"disabled span: {noop * 1e9:.0f} ns each")
+    print(f"tracing off: {off * 1e6:.1f} us/turn   on: {on * 1e6:.1f} us/turn   "
+          f"overhead: {(on - off) * 1e6:.1f} us/turn")
+    print(json.dumps(sink.report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Upstream protection in SportsDataClient: priority rate limiting, the circuit breaker and stale responses.
+#
+# 1. Priorities: a burst of casual lookups and a few booking requests share a small rate limit; bookings
+#    should get through in a fraction of the time the lookups queue for.
+# 2. Outage: fixtures are fetched once while the stub is healthy, then the stub starts failing every
+#    request. The client should open its circuit after a few failures, answer the rest at once from the
+#    last good responses (flagged stale), and a booking turn with nothing to fall back on should get a
+#    reply instead of an exception. Head-to-head results and booking offers built from stale responses
+#    must carry the same out-of-date note as fixtures.
+#
+#   python benchmarks/bench_upstream_protection.py --lookups 60 --bookings 6 --rate 20
+import argparse
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("FIXTURES_DB_PATH", "")
+os.environ.setdefault("PROFILES_DB_PATH", "")
+os.environ.setdefault("TICKETS_DB_PATH", "")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prem_bot  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+from sports_client import (PRIORITY_BOOKING, PRIORITY_LOOKUP, CircuitBreaker, SportsDataClient,  # noqa: E402
+                           set_sports_client)
+from stub_sportsdb import StubSportsDB  # noqa: E402
+
+
+def median_ms(durations):
+    return sorted(durations)[len(durations) // 2] * 1000 if durations else 0.0
+
+
+def bench_priorities(stub, args):
+    client = SportsDataClient(base_url=stub.base_url, cache=ResponseCache(max_entries=0), rate_limit=args.rate,
+                              rate_burst=5, pool_size=args.lookups + args.bookings)
+    durations = {PRIORITY_LOOKUP: [], PRIORITY_BOOKING: []}
+
+    def request(priority, team_id):
+        start = time.perf_counter()
+        client.get_json("eventsnext.php", {"id": team_id}, priority=priority)
+        durations[priority].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=request, args=(PRIORITY_LOOKUP, str(i))) for i in range(args.lookups)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)  # The bookings arrive once the lookups have drained the burst
+    threads += [threading.Thread(target=request, args=(PRIORITY_BOOKING, str(i))) for i in range(args.bookings)]
+    for thread in threads[args.lookups:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"Priorities at {args.rate:g} requests/s: {args.lookups} lookups p50 "
+          f"{median_ms(durations[PRIORITY_LOOKUP]):.0f} ms, {args.bookings} bookings p50 "
+          f"{median_ms(durations[PRIORITY_BOOKING]):.0f} ms; {client.limiter.stats()}")
+    client.close()
+
+
+def bench_outage(stub, args):
+    client = SportsDataClient(base_url=stub.base_url, cache=ResponseCache(max_entries=0), rate_limit=0,
+                              backoff_factor=0.01, breaker=CircuitBreaker(failures=3, reset_timeout=60))
+    set_sports_client(client)
+    team_ids = [str(i) for i in range(args.lookups)]
+    for team_id in team_ids:
+        prem_bot.get_next_fixture_by_id(team_id)
+    head_to_head = "Chelsea vs Arsenal in 2021"
+    prem_bot.respond(head_to_head, prem_bot.new_session())
+    prem_bot.search_event("Chelsea_vs_Arsenal", query_type="future")
+
+    stub.error_rate = 1.0
+    durations, stale = [], 0
+    for team_id in team_ids:
+        start = time.perf_counter()
+        fixture = prem_bot.get_next_fixture_by_id(team_id)
+        durations.append(time.perf_counter() - start)
+        stale += bool(fixture and fixture["stale"])
+    print(f"Outage: {stale}/{len(team_ids)} fixtures served stale, p50 {median_ms(durations):.2f} ms, "
+          f"first {durations[0] * 1000:.0f} ms; breaker {client.breaker.stats()}, "
+          f"{stub.request_count} upstream requests in total")
+
+    replies = prem_bot.respond(head_to_head, prem_bot.new_session())
+    offer = prem_bot.handle_turn("book tickets for chelsea vs arsenal", prem_bot.DialogueState())
+    assert prem_bot.STALE_NOTE in replies, replies
+    assert prem_bot.STALE_NOTE in offer, offer
+    print(f"Head-to-head results and the booking offer during the outage carry the stale note: {offer!r}")
+
+    # A new client with no last good responses, while every request still fails: the turn must still get
+    # an answer
+    set_sports_client(SportsDataClient(base_url=stub.base_url, rate_limit=0, backoff_factor=0.01))
+    prem_bot.team_id_table["Chelsea"] = "133610"
+    reply = prem_bot.handle_turn("book tickets for chelsea", prem_bot.DialogueState())
+    print(f"Booking during the outage with no last good response: {reply!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upstream protection benchmark")
+    parser.add_argument("--lookups", type=int, default=60, help="casual lookups (and teams in the outage run)")
+    parser.add_argument("--bookings", type=int, default=6)
+    parser.add_argument("--rate", type=float, default=20.0, help="rate limit in requests per second")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with StubSportsDB(latency=args.latency_ms / 1000) as stub:
+        bench_priorities(stub, args)
+        bench_outage(stub, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Load test for chat_server.py.
+#
+# Starts a local TheSportsDB stub and a chat server subprocess pointed at it (or targets --url),
+# then runs N concurrent scripted conversations over HTTP or WebSocket and reports p50/p95/p99
+# turn latency and turns per second.
+#
+#   python benchmarks/load_test.py --sessions 200 --mode ws
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from stub_sportsdb import StubSportsDB  # noqa: E402
+
+# One scripted conversation: small talk, a results query, a fixture query and a full booking
+CONVERSATION = [
+    "Hello",
+    "Chelsea vs Arsenal in 2019",
+    "When does Liverpool play next?",
+    "I want to book tickets for Brighton vs Aston Villa",
+    "yes",
+    "VIP",
+    "2",
+    "yes",
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Start chat_server.py in a subprocess that talks to the stub instead of TheSportsDB
+def start_server(port, stub_url):
+    env = dict(os.environ, SPORTSDB_BASE_URL=stub_url, SPORTSDB_RATE_LIMIT="0", FIXTURES_DB_PATH="",
+               PROFILES_DB_PATH="", TICKETS_DB_PATH="", TEAM_IDS_PATH="")
+    return subprocess.Popen([sys.executable, "chat_server.py", "--port", str(port)], cwd=REPO_ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_until_ready(http, url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with http.get(f"{url}/health") as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"chat server at {url} did not become ready")
+
+
+# One conversation over POST /chat; appends each turn's latency in seconds
+async def http_session(http, url, latencies):
+    session_id = None
+    for message in CONVERSATION:
+        start = time.perf_counter()
+        async with http.post(f"{url}/chat", json={"session_id": session_id, "message": message}) as response:
+            body = await response.json()
+        latencies.append(time.perf_counter() - start)
+        session_id = body["session_id"]
+
+
+# One conversation over a WebSocket; appends each turn's latency in seconds
+async def ws_session(http, url, latencies):
+    async with http.ws_connect(f"{url}/ws") as ws:
+        await ws.receive_json()
+        for message in CONVERSATION:
+            start = time.perf_counter()
+            await ws.send_str(message)
+            await ws.receive_json()
+            latencies.append(time.perf_counter() - start)
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_load(url, sessions, mode):
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        await wait_until_ready(http, url)
+        run_session = ws_session if mode == "ws" else http_session
+        latencies = []
+        start = time.perf_counter()
+        await asyncio.gather(*(run_session(http, url, latencies) for _ in range(sessions)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"mode={mode} sessions={sessions} turns={len(latencies)} elapsed={elapsed:.2f}s "
+          f"throughput={len(latencies) / elapsed:.0f} turns/s")
+    print(f"turn latency: p50={percentile(latencies, 50) * 1000:.1f} ms  "
+          f"p95={percentile(latencies, 95) * 1000:.1f} ms  p99={percentile(latencies, 99) * 1000:.1f} ms  "
+          f"mean={statistics.mean(latencies) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat server load test")
+    parser.add_argument("--sessions", type=int, default=100, help="concurrent conversations")
+    parser.add_argument("--mode", choices=["http", "ws"], default="http")
+    parser.add_argument("--url", help="existing chat server to target instead of starting one")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run_load(args.url.rstrip("/"), args.sessions, args.mode))
+        return
+
+    with StubSportsDB(latency=args.stub_latency_ms / 1000) as stub:
+        port = free_port()
+        server = start_server(port, stub.base_url)
+        try:
+            asyncio.run(run_load(f"http://127.0.0.1:{port}", args.sessions, args.mode))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Record live TheSportsDB responses for the benchmark stub to replay.
+#
+# Fetches searchteams.php for every club in team_aliases, eventsnext.php and eventslast.php for each
+# team ID found, and searchevents.php for a sample of fixtures in both orientations over the given
+# seasons, then writes them to a JSON file keyed like stub_sportsdb.recording_key. Needs network access.
+#
+#   python benchmarks/record_sportsdb.py -o benchmarks/recordings.json --seasons 2022-2023 2023-2024
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prem_bot  # noqa: E402
+from sports_client import SportsDataClient  # noqa: E402
+from stub_sportsdb import recording_key  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record TheSportsDB responses for replay")
+    parser.add_argument("-o", "--output", default=os.path.join(os.path.dirname(__file__), "recordings.json"))
+    parser.add_argument("--seasons", nargs="*", default=[], help="seasons for searchevents.php, e.g. 2023-2024")
+    parser.add_argument("--pairs", type=int, default=40, help="fixtures to record searchevents.php for")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    client = SportsDataClient()
+    recordings = {}
+
+    def record(endpoint, params):
+        data = client.get_json(endpoint, params)
+        if data is not None:
+            recordings[recording_key(endpoint, params)] = data
+        return data
+
+    for team in prem_bot.team_aliases:
+        team_id = prem_bot.read_team_id(record("searchteams.php", {"t": team}))
+        if team_id:
+            record("eventsnext.php", {"id": team_id})
+            record("eventslast.php", {"id": team_id})
+
+    pairs = list(itertools.permutations(prem_bot.team_aliases, 2))
+    random.Random(args.seed).shuffle(pairs)
+    for home, away in pairs[:args.pairs]:
+        for name in (f"{home}_vs_{away}", f"{away}_vs_{home}"):
+            name = name.replace(" ", "_")
+            record("searchevents.php", {"e": name})
+            for season in args.seasons:
+                record("searchevents.php", {"e": name, "s": season})
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(recordings, f, indent=1, sort_keys=True)
+    print(f"Recorded {len(recordings)} responses to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
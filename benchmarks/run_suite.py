@@ -0,0 +1,264 @@
+# Reproducible benchmark suite.
+#
+# Runs every hot path against a local TheSportsDB stand-in (stub_sportsdb.py) with fixed seeds and
+# writes the results as JSON, so runs on different commits can be compared:
+#
+#   intent         exported-scorer classification, one utterance at a time and in batches
+#   extraction     extract_match_info on templated utterances
+#   search_event   head-to-head lookups with every request going to the stub
+#   booking_flow   complete handle_turn booking conversations, from request to confirmed hold
+#   multi_session  concurrent respond_async conversations on one event loop
+#
+#   python benchmarks/run_suite.py -o results.json
+#   python benchmarks/run_suite.py -o new.json --compare results.json --fail-on-regression
+#   python benchmarks/run_suite.py --latency-ms 50 --error-rate 0.05 --recordings benchmarks/recordings.json
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+# Keep every store in memory so runs do not depend on (or change) anything under data/
+for name in ("FIXTURES_DB_PATH", "PROFILES_DB_PATH", "TICKETS_DB_PATH", "TEAM_IDS_PATH"):
+    os.environ[name] = ""
+os.environ["TICKET_CAPACITY_VIP"] = os.environ["TICKET_CAPACITY_REGULAR"] = "1000000"
+# The stub has no rate limit to protect
+os.environ["SPORTSDB_RATE_LIMIT"] = "0"
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import prem_bot  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+from sports_client import SportsDataClient, set_sports_client  # noqa: E402
+from stub_sportsdb import ReplayResponder, StubSportsDB, default_response  # noqa: E402
+
+SCENARIOS = ("intent", "extraction", "search_event", "booking_flow", "multi_session")
+
+EXTRACTION_TEMPLATES = [
+    "{a} vs {b}", "{a} vs {b} in {year}", "when did {a} play {b}", "results for {a} and {b} {year}",
+    "book tickets for {a} vs {b} on {iso}", "when does {a} play next", "{a} against {b} last season",
+]
+
+# One scripted conversation per session: small talk, a results query, a fixture query and a full booking
+CONVERSATION = [
+    "Hello",
+    "Chelsea vs Arsenal in 2019",
+    "When does Liverpool play next?",
+    "I want to book tickets for Brighton vs Aston Villa",
+    "yes",
+    "VIP",
+    "2",
+    "yes",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# p50/p95/p99/mean in milliseconds for a list of durations in seconds
+def latency_summary(durations, prefix=""):
+    return {
+        f"{prefix}p50_ms": round(percentile(durations, 50) * 1000, 4),
+        f"{prefix}p95_ms": round(percentile(durations, 95) * 1000, 4),
+        f"{prefix}p99_ms": round(percentile(durations, 99) * 1000, 4),
+        f"{prefix}mean_ms": round(sum(durations) / len(durations) * 1000, 4),
+    }
+
+
+def timed_calls(fn, inputs):
+    durations = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+# Point the bot at the stub with a fresh client and empty caches, so every scenario starts cold
+def fresh_client(stub, args, cache_size=2048):
+    client = SportsDataClient(base_url=stub.base_url, backoff_factor=args.backoff,
+                              cache=ResponseCache(max_entries=cache_size))
+    set_sports_client(client)
+    prem_bot.team_id_table.clear()
+    return client
+
+
+def bench_intent(stub, args, rng):
+    corpus = []
+    for _ in range(args.size):
+        text, _ = rng.choice(prem_bot.training_data)
+        corpus.append(prem_bot.preprocess_input(text.replace("Chelsea", rng.choice(list(prem_bot.team_aliases)))))
+    prem_bot.predict_intents(corpus[:1])  # Load the model outside the timings
+
+    durations = timed_calls(prem_bot.predict_intent, corpus)
+    start = time.perf_counter()
+    for i in range(0, len(corpus), 64):
+        prem_bot.predict_intents(corpus[i:i + 64])
+    batched = time.perf_counter() - start
+    return {"utterances": len(corpus), **latency_summary(durations),
+            "single_per_s": round(len(corpus) / sum(durations)), "batch64_per_s": round(len(corpus) / batched)}
+
+
+def bench_extraction(stub, args, rng):
+    names = [name for team, aliases in prem_bot.team_aliases.items() for name in [team] + aliases]
+    corpus = []
+    for _ in range(args.size):
+        a, b = rng.sample(names, 2)
+        year = rng.randint(2005, 2025)
+        corpus.append(prem_bot.preprocess_input(rng.choice(EXTRACTION_TEMPLATES).format(
+            a=a, b=b, year=year, iso=f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")))
+    durations = timed_calls(prem_bot.extract_match_info, corpus)
+    return {"utterances": len(corpus), **latency_summary(durations), "per_s": round(len(corpus) / sum(durations))}
+
+
+def bench_search_event(stub, args, rng):
+    fresh_client(stub, args, cache_size=0)  # Every lookup goes to the stub, so only the fan-out is measured
+    teams = [team.replace(" ", "_") for team in prem_bot.team_aliases]
+    seasons = ["2019-2020", "2020-2021", "2021-2022", "2022-2023"]
+    runs = max(10, args.size // 100)
+    pairs = [rng.sample(teams, 2) for _ in range(runs)]
+    single = timed_calls(lambda pair: prem_bot.search_event(f"{pair[0]}_vs_{pair[1]}"), pairs)
+    multi = timed_calls(lambda pair: prem_bot.search_event(f"{pair[0]}_vs_{pair[1]}", seasons), pairs)
+    return {"runs": runs, **latency_summary(single, "one_season_"), **latency_summary(multi, "four_seasons_")}
+
+
+def bench_booking_flow(stub, args, rng):
+    fresh_client(stub, args)
+    teams = list(prem_bot.team_aliases)
+    flows = max(20, args.size // 50)
+    turn_durations, flow_durations, confirmed = [], [], 0
+    for _ in range(flows):
+        home, away = rng.sample(teams, 2)
+        script = [f"I want to book tickets for {home} vs {away}", "yes", rng.choice(["VIP", "regular"]),
+                  str(rng.randint(1, 4)), "yes"]
+        state = prem_bot.DialogueState()
+        flow_start = time.perf_counter()
+        reply = None
+        for message in script:
+            start = time.perf_counter()
+            reply = prem_bot.handle_turn(message, state)
+            turn_durations.append(time.perf_counter() - start)
+        flow_durations.append(time.perf_counter() - flow_start)
+        confirmed += "booking is confirmed" in reply
+    return {"flows": flows, "confirmed": confirmed, **latency_summary(turn_durations, "turn_"),
+            **latency_summary(flow_durations, "flow_")}
+
+
+def bench_multi_session(stub, args, rng):
+    fresh_client(stub, args)
+
+    async def conversation(latencies):
+        session = prem_bot.new_session()
+        for message in CONVERSATION:
+            start = time.perf_counter()
+            await prem_bot.respond_async(message, session)
+            latencies.append(time.perf_counter() - start)
+
+    async def run():
+        latencies = []
+        start = time.perf_counter()
+        await asyncio.gather(*(conversation(latencies) for _ in range(args.sessions)))
+        return latencies, time.perf_counter() - start
+
+    latencies, elapsed = asyncio.run(run())
+    return {"sessions": args.sessions, "turns": len(latencies), "turns_per_s": round(len(latencies) / elapsed),
+            **latency_summary(latencies, "turn_")}
+
+
+# Commit the results were measured on, if this is a git checkout
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Print each metric next to the baseline. Latencies (_ms) that grew, or rates (_per_s) that fell, by more
+# than `tolerance` count as regressions; returns their names
+def compare(results, baseline, tolerance):
+    regressions = []
+    for scenario, metrics in results["results"].items():
+        base_metrics = baseline.get("results", {}).get(scenario, {})
+        for metric, value in metrics.items():
+            base = base_metrics.get(metric)
+            if not isinstance(base, (int, float)) or not base or not isinstance(value, (int, float)):
+                continue
+            change = (value - base) / base
+            worse = (metric.endswith("_ms") and change > tolerance) or (metric.endswith("_per_s") and change < -tolerance)
+            if worse:
+                regressions.append(f"{scenario}.{metric}")
+            print(f"{scenario + '.' + metric:<40} {base:>12} -> {value:>12}  {change:+7.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible benchmark suite")
+    parser.add_argument("-o", "--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--only", help=f"comma-separated scenarios out of {','.join(SCENARIOS)}")
+    parser.add_argument("--size", type=int, default=2000, help="utterances per scenario")
+    parser.add_argument("--sessions", type=int, default=200, help="concurrent sessions for multi_session")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stub latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub requests answered 503")
+    parser.add_argument("--backoff", type=float, default=0.05, help="client retry backoff factor")
+    parser.add_argument("--recordings", help="replay responses recorded with record_sportsdb.py")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change before flagging")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    scenarios = args.only.split(",") if args.only else SCENARIOS
+    responder = ReplayResponder(args.recordings) if args.recordings else default_response
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "fail_on_regression")},
+        },
+        "results": {},
+    }
+    benchmarks = {"intent": bench_intent, "extraction": bench_extraction, "search_event": bench_search_event,
+                  "booking_flow": bench_booking_flow, "multi_session": bench_multi_session}
+
+    stub = StubSportsDB(latency=args.latency_ms / 1000, responder=responder, error_rate=args.error_rate,
+                        jitter=args.jitter_ms / 1000, seed=args.seed)
+    with stub:
+        for scenario in scenarios:
+            start = time.perf_counter()
+            before = stub.request_count
+            metrics = benchmarks[scenario](stub, args, random.Random(args.seed))
+            metrics["upstream_requests"] = stub.request_count - before
+            metrics["elapsed_s"] = round(time.perf_counter() - start, 3)
+            results["results"][scenario] = metrics
+            print(f"{scenario}: {json.dumps(metrics)}", file=sys.stderr)
+        results["meta"]["stub_errors"] = stub.error_count
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions and args.fail_on_regression:
+            sys.exit(f"Regressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
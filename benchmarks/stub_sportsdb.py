@@ -0,0 +1,157 @@
+# Local stand-in for TheSportsDB used by the benchmarks.
+#
+# Serves searchevents.php, searchteams.php, eventsnext.php and eventslast.php on 127.0.0.1 with an
+# artificial latency (plus optional seeded jitter) per request and an optional error rate, so
+# client-side changes can be measured without the network. Responses are synthesized by
+# default_response, or replayed from a file recorded with record_sportsdb.py (ReplayResponder).
+#
+# Run it standalone and point the bot at it with SPORTSDB_BASE_URL:
+#
+#   python benchmarks/stub_sportsdb.py --port 8765 --latency-ms 20 --error-rate 0.05
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+# Canned response for an endpoint and its query parameters
+def default_response(endpoint, params):
+    if endpoint == "searchevents.php":
+        event_name = params.get("e", [""])[0]
+        home, _, away = event_name.partition("_vs_")
+        season = params.get("s", ["2024-2025"])[0]
+        year = season[:4]
+        return {"event": [{
+            "strEvent": f"{home} vs {away}", "strHomeTeam": home.replace("_", " "),
+            "strAwayTeam": away.replace("_", " "), "dateEvent": f"{year}-12-15", "strSeason": season,
+            "intHomeScore": "1", "intAwayScore": "0", "strVenue": "Stub Stadium",
+            "strLeague": "English Premier League",
+        }]}
+    if endpoint == "searchteams.php":
+        # crc32 rather than hash(), so a team gets the same ID in every process whatever PYTHONHASHSEED is
+        name = params.get("t", [""])[0]
+        return {"teams": [{"idTeam": str(zlib.crc32(name.encode()) % 100000), "strTeam": name}]}
+    if endpoint in ("eventsnext.php", "eventslast.php"):
+        event = {"strHomeTeam": "Chelsea", "strAwayTeam": "Arsenal", "dateEvent": "2025-01-01",
+                 "strVenue": "Stamford Bridge", "strLeague": "English Premier League", "strTime": "15:00:00",
+                 "intHomeScore": "2", "intAwayScore": "1"}
+        return {"events": [event]} if endpoint == "eventsnext.php" else {"results": [event]}
+    return {}
+
+
+# Key a request the same way in recordings and at replay time: endpoint plus sorted query parameters
+def recording_key(endpoint, params):
+    flat = {name: value[0] if isinstance(value, list) else value for name, value in (params or {}).items()}
+    return f"{endpoint}?{urlencode(sorted(flat.items()))}"
+
+
+# Replays responses recorded from the live API; requests that were not recorded go to `fallback`
+class ReplayResponder:
+    def __init__(self, path, fallback=default_response):
+        with open(path, encoding="utf-8") as f:
+            self.recordings = json.load(f)
+        self.fallback = fallback
+        self.replayed = 0
+        self.synthesized = 0
+
+    def __call__(self, endpoint, params):
+        recorded = self.recordings.get(recording_key(endpoint, params))
+        if recorded is not None:
+            self.replayed += 1
+            return recorded
+        self.synthesized += 1
+        return self.fallback(endpoint, params)
+
+
+# HTTP server that answers like TheSportsDB after `latency` seconds (plus up to `jitter` seconds), failing
+# a seeded `error_rate` fraction of requests with `error_status`
+class StubSportsDB:
+    def __init__(self, latency=0.05, responder=default_response, error_rate=0.0, error_status=503, jitter=0.0,
+                 seed=0, port=0):
+        self.latency = latency
+        self.responder = responder
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.jitter = jitter
+        self.request_count = 0
+        self.error_count = 0
+        self._rng = random.Random(seed)
+        self._count_lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            # Headers and body are written separately; disable Nagle so they are not delayed
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                with stub._count_lock:
+                    stub.request_count += 1
+                    delay = stub.latency + (stub._rng.random() * stub.jitter if stub.jitter else 0)
+                    failed = stub.error_rate and stub._rng.random() < stub.error_rate
+                    if failed:
+                        stub.error_count += 1
+                if delay:
+                    time.sleep(delay)
+                if failed:
+                    self.send_response(stub.error_status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(stub.responder(url.path.rsplit("/", 1)[-1], parse_qs(url.query))).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    # Base URL to pass to SportsDataClient(base_url=...)
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local TheSportsDB stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--recordings", help="JSON file written by record_sportsdb.py")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    responder = ReplayResponder(args.recordings) if args.recordings else default_response
+    stub = StubSportsDB(latency=args.latency_ms / 1000, responder=responder, error_rate=args.error_rate,
+                        jitter=args.jitter_ms / 1000, seed=args.seed, port=args.port)
+    with stub:
+        print(f"Serving on {stub.base_url} (SPORTSDB_BASE_URL={stub.base_url})")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
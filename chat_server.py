@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import os
+import uuid
+
+import prem_bot
+import tracing
+from session_store import InMemorySessionStore
+
+CHAT_SERVER_HOST = os.environ.get("CHAT_SERVER_HOST", "127.0.0.1")
+CHAT_SERVER_PORT = int(os.environ.get("CHAT_SERVER_PORT", "8080"))
+SESSION_EVICTION_INTERVAL = float(os.environ.get("SESSION_EVICTION_INTERVAL", "60"))
+
+
+# Hosts many concurrent conversations on one event loop, each with its own session state. With a started
+# WorkerPool, turns run on the pool's forked workers instead, which keep the sessions
+class ChatServer:
+    def __init__(self, store=None, eviction_interval=SESSION_EVICTION_INTERVAL, pool=None):
+        self.store = store if store is not None else InMemorySessionStore()
+        self.pool = pool
+        self.eviction_interval = eviction_interval
+        self._locks = {}  # session_id -> asyncio.Lock, so one session's turns run in order
+        self._eviction_task = None
+
+    # Return (session_id, session), starting a new conversation if the ID is missing or has expired
+    def open_session(self, session_id=None):
+        if self.pool is not None:
+            return session_id or uuid.uuid4().hex, None
+        session = self.store.get(session_id) if session_id else None
+        if session is None:
+            session_id = session_id or uuid.uuid4().hex
+            session = prem_bot.new_session()
+            self.store.put(session_id, session)
+        return session_id, session
+
+    # Run one turn of a conversation and return (session_id, replies)
+    async def turn(self, session_id, message):
+        if self.pool is not None:
+            return await self.pool.turn(session_id, message)
+        session_id, session = self.open_session(session_id)
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            replies = await prem_bot.respond_async(message, session)
+            for evicted in self.store.put(session_id, session) or []:
+                self._locks.pop(evicted, None)
+        return session_id, replies
+
+    # POST /chat {"message": "...", "session_id": "..."} -> {"session_id": "...", "replies": [...]}
+    async def handle_chat(self, request):
+        from aiohttp import web
+
+        try:
+            payload = await request.json()
+            message = payload["message"]
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({"error": "expected a JSON body with a 'message' field"}, status=400)
+        session_id, replies = await self.turn(payload.get("session_id"), str(message))
+        return web.json_response({"session_id": session_id, "replies": replies})
+
+    # GET /ws[?session_id=...]: each text frame is a user message, answered with a JSON reply frame
+    async def handle_websocket(self, request):
+        from aiohttp import WSMsgType, web
+
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        session_id, _ = self.open_session(request.query.get("session_id"))
+        await ws.send_json({"session_id": session_id, "replies": []})
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT:
+                session_id, replies = await self.turn(session_id, msg.data)
+                await ws.send_json({"session_id": session_id, "replies": replies})
+            elif msg.type == WSMsgType.ERROR:
+                break
+        return ws
+
+    # GET /health: session count, how much traffic each routing stage absorbed and the state of the
+    # TheSportsDB client (rate limiter, circuit breaker, stale responses served), or per-worker sessions,
+    # throughput and memory when serving from a worker pool
+    async def handle_health(self, request):
+        from aiohttp import web
+
+        if self.pool is not None:
+            return web.json_response({"status": "ok", **await self.pool.stats()})
+        return web.json_response({"status": "ok", "sessions": len(self.store), "routing": prem_bot.intent_router.stats(),
+                                  "upstream": prem_bot.get_sports_client().stats()})
+
+    # GET /metrics: per-stage latency percentiles and upstream counters (PREM_BOT_TRACING=1 to record them)
+    async def handle_metrics(self, request):
+        from aiohttp import web
+
+        return web.json_response({"tracing": tracing.is_enabled(), "report": tracing.report()})
+
+    # Periodically drop idle sessions and their locks
+    async def evict_idle_sessions(self):
+        while True:
+            await asyncio.sleep(self.eviction_interval)
+            for session_id in self.store.evict_idle():
+                self._locks.pop(session_id, None)
+
+    async def on_startup(self, app):
+        if self.pool is not None:
+            return  # The pool preloaded everything before forking; its workers do the rest
+        prem_bot.get_intent_scorer()  # Load the classifier before the first user arrives
+        prem_bot.start_team_id_prefetch()
+        prem_bot.start_fixtures_sync()
+        prem_bot.start_team_alias_watch()
+        self._eviction_task = asyncio.ensure_future(self.evict_idle_sessions())
+
+    async def on_cleanup(self, app):
+        if self._eviction_task is not None:
+            self._eviction_task.cancel()
+
+    def make_app(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post("/chat", self.handle_chat)
+        app.router.add_get("/ws", self.handle_websocket)
+        app.router.add_get("/health", self.handle_health)
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.on_startup.append(self.on_startup)
+        app.on_cleanup.append(self.on_cleanup)
+        return app
+
+
+# Serve the chatbot over HTTP and WebSocket: python chat_server.py [--host HOST] [--port PORT] [--workers N]
+if __name__ == "__main__":
+    from aiohttp import web
+
+    parser = argparse.ArgumentParser(description="Premier League chatbot server")
+    parser.add_argument("--host", default=CHAT_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=CHAT_SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="run turns on this many forked workers (0 = one per core)")
+    args = parser.parse_args()
+    pool = None
+    if args.workers is not None:
+        from worker_pool import WorkerPool
+        pool = WorkerPool(args.workers).start()  # Fork before the event loop starts
+    try:
+        web.run_app(ChatServer(pool=pool).make_app(), host=args.host, port=args.port)
+    finally:
+        if pool is not None:
+            pool.close()
@@ -0,0 +1,201 @@
+import datetime
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+# Parsed inputs remembered per parser (relative phrases are cached per day)
+DATE_PARSE_CACHE_SIZE = int(os.environ.get("DATE_PARSE_CACHE_SIZE", "4096"))
+
+# Month names and abbreviations -> month number
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3, "apr": 4, "april": 4,
+    "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7, "aug": 8, "august": 8, "sep": 9, "sept": 9,
+    "september": 9, "oct": 10, "october": 10, "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+MONTH_PATTERN = "|".join(sorted(MONTHS, key=len, reverse=True))
+
+# Weekday names and abbreviations -> date.weekday() number
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1, "wednesday": 2, "wed": 2, "thursday": 3,
+    "thu": 3, "thur": 3, "thurs": 3, "friday": 4, "fri": 4, "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+_WEEKDAY_PATTERN = "|".join(sorted(WEEKDAYS, key=len, reverse=True))
+
+# Words that only ever describe a date, so they are never part of a team name
+DATE_WORDS = frozenset(["today", "tonight", "tomorrow", "yesterday", "season", "weekend", "this", "coming",
+                        "current", "previous"] + [name for name in WEEKDAYS if len(name) > 3])
+
+# A season starts in August: 2024-2025 runs from August 2024 to May 2025
+SEASON_START_MONTH = 8
+
+# Absolute dates and seasons, most specific first. Separators are optional so inputs that went through
+# preprocess_input ("2024-12-15" -> "20241215") still parse
+_ABSOLUTE_PATTERN = re.compile(
+    r"\b(?:(?P<iso>(\d{4})([-./])(\d{1,2})\3(\d{1,2}))"
+    r"|(?P<season>(\d{4})[/-](\d{4}|\d{2}))"
+    r"|(?P<slash>(\d{1,2})/(\d{1,2})/(\d{4}))"
+    r"|(?P<compact>(\d{4})(\d{2})(\d{2}))"
+    r"|(?P<dmy>(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(" + MONTH_PATTERN + r")\.?,?(?:\s+(\d{4}))?)"
+    r"|(?P<mdy>(" + MONTH_PATTERN + r")\.?\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?)"
+    r"|(?P<month_year>(" + MONTH_PATTERN + r")\.?,?\s+(\d{4}))"
+    r"|(?P<year>(?:19|20)\d{2}))\b",
+    re.IGNORECASE
+)
+
+# Dates and seasons relative to today
+_RELATIVE_PATTERN = re.compile(
+    r"\b(?:(?P<day>today|tonight|tomorrow|yesterday)"
+    r"|(?:(?P<season_ref>this|current|last|previous|next)\s+season)"
+    r"|(?:(?P<weekend_ref>this|next|the|coming)\s+weekend)"
+    r"|(?:(?:(?P<weekday_ref>this|next|last|coming|on)\s+)?(?P<weekday>" + _WEEKDAY_PATTERN + r")))\b",
+    re.IGNORECASE
+)
+
+# kind is "date" (value "YYYY-MM-DD") or "season" (value "YYYY-YYYY"); source says which step matched:
+# "pattern", "relative" or "fallback" (dateutil)
+ParsedDate = namedtuple("ParsedDate", ["kind", "value", "source"])
+
+
+# Season label ("2024-2025") for a starting year
+def season_label(start_year):
+    return f"{start_year}-{start_year + 1}"
+
+
+# Season a day falls in
+def season_of(day):
+    return season_label(day.year if day.month >= SEASON_START_MONTH else day.year - 1)
+
+
+def _date(year, month, day):
+    try:
+        return datetime.date(int(year), int(month), int(day))
+    except ValueError:
+        return None  # Invalid dates such as 2024-02-30
+
+
+# Recognizes dates and seasons in free text: common absolute shapes and relative phrases ("next
+# Saturday", "last season") through precompiled patterns, with dateutil's fuzzy parser as the fallback for
+# anything else. clock returns today's date, so relative phrases can be tested against a fixed day.
+# Results are cached per input (and per day, for relative phrases)
+class DateParser:
+    def __init__(self, clock=datetime.date.today, cache_size=DATE_PARSE_CACHE_SIZE, fallback=True):
+        self.clock = clock
+        self.cache_size = cache_size
+        self.fallback = fallback
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    def today(self):
+        today = self.clock()
+        return today.date() if isinstance(today, datetime.datetime) else today
+
+    # Parse the first date or season in text; returns a ParsedDate, or None if there is none
+    def parse(self, text):
+        today = self.today()
+        key = (text, today)
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None or key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+        result = self.absolute(text, today) or self.relative(text, today)
+        if result is None and self.fallback:
+            result = self._fallback(text, today)
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    # The date in text as "YYYY-MM-DD", or None if it names no single day
+    def parse_date(self, text):
+        result = self.parse(text)
+        return result.value if result is not None and result.kind == "date" else None
+
+    # First absolute date or season in text. Dates without a year are the next such day from today
+    def absolute(self, text, today=None):
+        match = _ABSOLUTE_PATTERN.search(text)
+        if match is None:
+            return None
+        kind = match.lastgroup
+        if kind == "month_year":
+            return None  # A month rather than a day: left to the fallback
+        if kind == "year":
+            return ParsedDate("season", season_label(int(match.group("year"))), "pattern")
+        if kind == "season":
+            start, end = match.group(7, 8)
+            start = int(start)
+            # "2019/20" and "2019-2020" are seasons; anything else is not
+            if int(end) not in (start + 1, (start + 1) % 100):
+                return None
+            return ParsedDate("season", season_label(start), "pattern")
+        if kind == "iso":
+            day = _date(*match.group(2, 4, 5))
+        elif kind == "slash":  # Day first, as written in the UK
+            day_of_month, month, year = match.group(10, 11, 12)
+            day = _date(year, month, day_of_month)
+        elif kind == "compact":
+            day = _date(*match.group(14, 15, 16))
+        else:
+            if kind == "dmy":
+                day_of_month, month_name, year = match.group(18, 19, 20)
+            else:
+                month_name, day_of_month, year = match.group(22, 23, 24)
+            month = MONTHS[month_name.lower()]
+            if year is None:
+                today = today or self.today()
+                day = _date(today.year, month, day_of_month)
+                if day is not None and day < today:
+                    day = _date(today.year + 1, month, day_of_month)
+            else:
+                day = _date(year, month, day_of_month)
+        return ParsedDate("date", day.isoformat(), "pattern") if day is not None else None
+
+    # First relative date or season in text ("tomorrow", "next Saturday", "last season")
+    def relative(self, text, today=None):
+        match = _RELATIVE_PATTERN.search(text)
+        if match is None:
+            return None
+        today = today or self.today()
+        if match.group("day"):
+            offset = {"today": 0, "tonight": 0, "tomorrow": 1, "yesterday": -1}[match.group("day").lower()]
+            return ParsedDate("date", (today + datetime.timedelta(days=offset)).isoformat(), "relative")
+        if match.group("season_ref"):
+            start = int(season_of(today)[:4])
+            start += {"last": -1, "previous": -1, "next": 1}.get(match.group("season_ref").lower(), 0)
+            return ParsedDate("season", season_label(start), "relative")
+        if match.group("weekend_ref"):
+            # The coming Saturday, or today during a weekend
+            offset = 0 if today.weekday() >= 5 else 5 - today.weekday()
+            return ParsedDate("date", (today + datetime.timedelta(days=offset)).isoformat(), "relative")
+        weekday = WEEKDAYS[match.group("weekday").lower()]
+        reference = (match.group("weekday_ref") or "").lower()
+        if reference == "last":  # The most recent one before today
+            offset = -((today.weekday() - weekday) % 7 or 7)
+        elif reference == "next":  # The first one after today
+            offset = (weekday - today.weekday()) % 7 or 7
+        else:  # "Saturday", "this Saturday": today or the first one after it
+            offset = (weekday - today.weekday()) % 7
+        return ParsedDate("date", (today + datetime.timedelta(days=offset)).isoformat(), "relative")
+
+    def _fallback(self, text, today):
+        from dateutil.parser import parse
+
+        try:
+            parsed = parse(text, fuzzy=True, default=datetime.datetime(today.year, today.month, today.day))
+        except (ValueError, OverflowError):
+            return None
+        with self._lock:
+            self.fallbacks += 1
+        return ParsedDate("date", parsed.date().isoformat(), "fallback")
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "fallbacks": self.fallbacks,
+                    "entries": len(self._cache)}
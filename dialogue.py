@@ -0,0 +1,108 @@
+import enum
+
+
+# Steps of the booking flow, each named after the question the bot is waiting to have answered
+class BookingStep(enum.Enum):
+    ASK_FOR_TEAMS = "ask_for_teams"
+    CONFIRM_NEXT_MATCH = "confirm_next_match"
+    ASK_FOR_DATE = "ask_for_date"
+    ASK_FOR_SEATING = "ask_for_seating"
+    ASK_FOR_NUM_TICKETS = "ask_for_num_tickets"
+    CONFIRM_BOOKING = "confirm_booking"
+
+
+# Transition table: step -> steps the answer to it can move the conversation on to (None is "no booking in
+# progress", where a book_ticket request starts the flow). Staying on a step to ask again, and leaving the
+# flow (booking confirmed or cancelled, see DialogueState.clear), are always allowed
+BOOKING_TRANSITIONS = {
+    None: (BookingStep.ASK_FOR_TEAMS, BookingStep.CONFIRM_NEXT_MATCH, BookingStep.ASK_FOR_DATE),
+    BookingStep.ASK_FOR_TEAMS: (BookingStep.CONFIRM_NEXT_MATCH, BookingStep.ASK_FOR_DATE),
+    BookingStep.CONFIRM_NEXT_MATCH: (BookingStep.ASK_FOR_SEATING, BookingStep.ASK_FOR_DATE),
+    BookingStep.ASK_FOR_DATE: (BookingStep.ASK_FOR_SEATING,),
+    BookingStep.ASK_FOR_SEATING: (BookingStep.ASK_FOR_NUM_TICKETS,),
+    BookingStep.ASK_FOR_NUM_TICKETS: (BookingStep.CONFIRM_BOOKING,),
+    BookingStep.CONFIRM_BOOKING: (),
+}
+
+
+# The booking in progress in one conversation: the step it is on and the details collected so far. Fixed
+# slots rather than a dict, so the millions of idle conversations a server can hold stay small. True while
+# a booking is in progress
+class DialogueState:
+    __slots__ = ("step", "team1", "team2", "date", "venue", "seating_type", "num_tickets", "hold_id")
+
+    def __init__(self):
+        self.clear()
+
+    # End the booking flow and forget its details
+    def clear(self):
+        self.step = None
+        self.team1 = None
+        self.team2 = None
+        self.date = None
+        self.venue = None
+        self.seating_type = None
+        self.num_tickets = None
+        self.hold_id = None
+
+    # Move to the next step; raises ValueError if BOOKING_TRANSITIONS does not allow it
+    def advance(self, step):
+        if step is not self.step and step not in BOOKING_TRANSITIONS[self.step]:
+            raise ValueError(f"No booking transition from {self.step} to {step}")
+        self.step = step
+
+    # State from a booking mapping in the shape handle_turn used to take ({"pending_task": "ask_for_date",
+    # "team1": "Chelsea", ...}); other keys are ignored
+    @classmethod
+    def from_mapping(cls, mapping):
+        state = cls()
+        for field in _DETAILS:
+            setattr(state, field, mapping.get(field))
+        task = mapping.get("pending_task")
+        state.step = BookingStep(task) if task else None
+        return state
+
+    # Write the state back into such a mapping: the booking details and pending_task (removed when no
+    # booking is in progress) and current_intent, set to the intent the turn acted on, if any. Other keys
+    # the caller keeps in the mapping are left alone
+    def update_mapping(self, mapping, intent=None):
+        for field in _DETAILS:
+            value = getattr(self, field)
+            if value is None:
+                mapping.pop(field, None)
+            else:
+                mapping[field] = value
+        if self.step is None:
+            mapping.pop("pending_task", None)
+        else:
+            mapping["pending_task"] = self.step.value
+            intent = "book_ticket"
+        if intent is not None:
+            mapping["current_intent"] = intent
+
+    # Detail by name, so a DialogueState can be passed where a booking mapping is read
+    # (profile_store.add_booking)
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def __bool__(self):
+        return self.step is not None
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"DialogueState({fields})"
+
+
+# Booking details, i.e. every slot but the step
+_DETAILS = DialogueState.__slots__[1:]
+
+
+# Everything kept for one conversation: who the user is, whether the bot is waiting for their favourite
+# team, and the booking in progress
+class Session:
+    __slots__ = ("user_name", "awaiting_favourite_team", "state")
+
+    def __init__(self, user_name=None):
+        self.user_name = user_name
+        self.awaiting_favourite_team = False
+        self.state = DialogueState()
@@ -0,0 +1,198 @@
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from date_parser import season_label, season_of
+from sports_client import PRIORITY_BACKGROUND, is_completed_season, request_priority
+
+# Local fixtures/results database, overridable through the environment (set FIXTURES_DB_PATH="" to disable)
+FIXTURES_DB_PATH = os.environ.get(
+    "FIXTURES_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fixtures.db"))
+FIXTURES_SYNC_INTERVAL = float(os.environ.get("FIXTURES_SYNC_INTERVAL", "900"))
+FIXTURES_MAX_AGE = float(os.environ.get("FIXTURES_MAX_AGE", "3600"))
+SPORTSDB_LEAGUE_ID = os.environ.get("SPORTSDB_LEAGUE_ID", "4328")  # English Premier League
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id_event TEXT PRIMARY KEY,
+    home_key TEXT NOT NULL,
+    away_key TEXT NOT NULL,
+    id_home TEXT,
+    id_away TEXT,
+    date_event TEXT,
+    season TEXT,
+    digest TEXT NOT NULL,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_pair ON events (home_key, away_key, season, date_event);
+CREATE INDEX IF NOT EXISTS events_season ON events (season, date_event);
+CREATE TABLE IF NOT EXISTS seasons (
+    season TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+# Season string ('2024-2025') that today falls in; seasons roll over on date_parser.SEASON_START_MONTH
+def current_season(today=None):
+    return season_of(today or datetime.date.today())
+
+
+# SQLite store of Premier League events keyed by team pair, date and season
+class FixturesStore:
+    def __init__(self, path=FIXTURES_DB_PATH, team_key=str.lower, max_age=FIXTURES_MAX_AGE, clock=time.time):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.team_key = team_key
+        self.max_age = max_age
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    # Insert new events and update changed ones; returns the number of rows written
+    def upsert_events(self, events):
+        rows = []
+        for event in events or []:
+            if not event.get("idEvent"):
+                continue
+            raw = json.dumps(event, sort_keys=True)
+            rows.append((
+                event["idEvent"], self.team_key(event.get("strHomeTeam") or ""),
+                self.team_key(event.get("strAwayTeam") or ""), event.get("idHomeTeam"), event.get("idAwayTeam"),
+                event.get("dateEvent"), event.get("strSeason"), hashlib.sha1(raw.encode("utf-8")).hexdigest(), raw,
+            ))
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                """INSERT INTO events (id_event, home_key, away_key, id_home, id_away, date_event, season, digest, raw)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (id_event) DO UPDATE SET
+                       home_key = excluded.home_key, away_key = excluded.away_key, id_home = excluded.id_home,
+                       id_away = excluded.id_away, date_event = excluded.date_event, season = excluded.season,
+                       digest = excluded.digest, raw = excluded.raw
+                   WHERE events.digest != excluded.digest""",
+                rows,
+            )
+            return self._conn.total_changes - before
+
+    # Record that a season was synced; complete seasons are never fetched again
+    def mark_season_synced(self, season, complete=False):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO seasons (season, synced_at, complete) VALUES (?, ?, ?)",
+                (season, self.clock(), int(complete)),
+            )
+
+    def season_state(self, season):
+        with self._lock:
+            row = self._conn.execute("SELECT synced_at, complete FROM seasons WHERE season = ?", (season,)).fetchone()
+        return (row["synced_at"], bool(row["complete"])) if row else (None, False)
+
+    # Whether the store can answer for a season: it is complete, or was synced within max_age
+    def covers_season(self, season):
+        synced_at, complete = self.season_state(season)
+        if synced_at is None:
+            return False
+        return complete or self.clock() - synced_at <= self.max_age
+
+    # Head-to-head events in either orientation for the given seasons. Returns None when the store has not
+    # synced one of those seasons, so callers fall back to the API. A season of None means every season, as
+    # in searchevents.php: answered from consecutive synced seasons back from the current one once they hold
+    # `needed` meetings (older seasons cannot hold newer ones), otherwise None
+    def head_to_head(self, team1, team2, seasons=(None,), needed=2):
+        if None not in seasons:
+            if not all(self.covers_season(s) for s in seasons):
+                return None
+            return self._head_to_head(team1, team2, seasons)
+        covered, events = [], []
+        season = current_season()
+        while self.covers_season(season):
+            covered.append(season)
+            events = self._head_to_head(team1, team2, covered)
+            if len(events) >= needed:
+                return events
+            season = season_label(int(season[:4]) - 1)
+        return None
+
+    def _head_to_head(self, team1, team2, seasons):
+        key1, key2 = self.team_key(team1), self.team_key(team2)
+        placeholders = ",".join("?" * len(seasons))
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT raw FROM events
+                    WHERE ((home_key = ? AND away_key = ?) OR (home_key = ? AND away_key = ?))
+                      AND season IN ({placeholders})
+                    ORDER BY date_event DESC""",
+                (key1, key2, key2, key1, *seasons),
+            ).fetchall()
+        return [json.loads(row["raw"]) for row in rows]
+
+    def close(self):
+        self._conn.close()
+
+
+# Pull events from TheSportsDB into the store. Each season is backfilled once (completed seasons are
+# then never fetched again); after that only the league's recent and upcoming windows are pulled, and
+# only events whose content changed are written. Returns the number of rows written
+def sync_fixtures(store, client, seasons=None):
+    seasons = seasons or [current_season()]
+    written = 0
+    for season in seasons:
+        synced_at, complete = store.season_state(season)
+        if complete:
+            continue
+        if synced_at is None:
+            data = client.get_json("eventsseason.php", {"id": SPORTSDB_LEAGUE_ID, "s": season})
+            if data is None:
+                continue
+            written += store.upsert_events(data.get("events"))
+        elif season == current_season():
+            responses = [client.get_json(endpoint, {"id": SPORTSDB_LEAGUE_ID})
+                         for endpoint in ("eventspastleague.php", "eventsnextleague.php")]
+            if all(data is None for data in responses):
+                continue  # Nothing fetched: keep the old sync time, so the season goes stale
+            for data in responses:
+                if data is not None:
+                    written += store.upsert_events(data.get("events"))
+        store.mark_season_synced(season, complete=is_completed_season(season))
+    return written
+
+
+# Run sync_fixtures every `interval` seconds on a daemon thread, at background priority; returns an
+# Event that stops it
+def start_background_sync(store, client, interval=FIXTURES_SYNC_INTERVAL, seasons=None):
+    stop = threading.Event()
+
+    def run():
+        while not stop.is_set():
+            try:
+                with request_priority(PRIORITY_BACKGROUND):
+                    sync_fixtures(store, client, seasons)
+            except Exception as e:  # Keep syncing after transient upstream or database errors
+                print(f"ChatBot: Fixtures sync failed: {e}", file=sys.stderr)
+            stop.wait(interval)
+
+    threading.Thread(target=run, name="fixtures-sync", daemon=True).start()
+    return stop
+
+
+# Backfill seasons into the local store: python fixtures_store.py 2012-2013 2013-2014 ...
+if __name__ == "__main__":
+    from prem_bot import get_fixtures_store
+    from sports_client import get_sports_client
+
+    store = get_fixtures_store()
+    if store is None:
+        sys.exit("FIXTURES_DB_PATH is empty; the local fixtures store is disabled")
+    count = sync_fixtures(store, get_sports_client(), sys.argv[1:] or None)
+    print(f"Wrote {count} events to {FIXTURES_DB_PATH}")
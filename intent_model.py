@@ -0,0 +1,359 @@
+import hashlib
+import json
+import math
+import os
+import pickle
+import re
+
+# Bump when the layout of the saved artifact changes so stale files are rebuilt
+ARTIFACT_VERSION = 1
+
+# Micro-batching limits for IntentBatcher, overridable through the environment
+INTENT_BATCH_MAX_SIZE = int(os.environ.get("INTENT_BATCH_MAX_SIZE", "64"))
+INTENT_BATCH_MAX_WAIT = float(os.environ.get("INTENT_BATCH_MAX_WAIT_MS", "0")) / 1000
+
+# Default location for the trained intent model (see README: data/ holds saved models)
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+MODEL_PATH = os.path.join(MODEL_DIR, "intent_model.pkl")
+SCORER_PATH = os.path.join(MODEL_DIR, "intent_scorer.json")
+
+
+# Hash the training phrases and labels so the artifact can be matched to its data
+def training_data_hash(training_data):
+    payload = json.dumps([[text, label] for text, label in training_data], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Create an untrained bag-of-words + TF-IDF + logistic regression pipeline
+def new_intent_pipeline():
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    return Pipeline([
+        ('vectorizer', CountVectorizer()),
+        ('tfidf', TfidfTransformer()),
+        ('classifier', LogisticRegression())
+    ])
+
+
+# Evaluate the pipeline on a held-out split and return the classification report
+def evaluate_intent_pipeline(texts, labels):
+    from sklearn.metrics import classification_report
+    from sklearn.model_selection import train_test_split
+
+    X_train, X_test, y_train, y_test = train_test_split(texts, labels, test_size=0.2, random_state=42)
+    pipeline = new_intent_pipeline()
+    pipeline.fit(X_train, y_train)
+    y_pred = pipeline.predict(X_test)
+    return classification_report(y_test, y_pred, zero_division=0)
+
+
+# Train the intent classifier on all of the training data and write the artifact to disk, along with
+# the exported scorer used at serve time (pass scorer_path=None to skip it)
+def build_intent_model(training_data, path=MODEL_PATH, evaluate=True, scorer_path=SCORER_PATH):
+    import sklearn
+
+    texts, labels = zip(*training_data)
+    report = evaluate_intent_pipeline(texts, labels) if evaluate else None
+
+    pipeline = new_intent_pipeline()
+    pipeline.fit(texts, labels)
+    scorer = export_intent_scorer(pipeline, training_data_hash(training_data))
+    verify_intent_scorer(pipeline, IntentScorer(scorer), texts)
+
+    artifact = {
+        "version": ARTIFACT_VERSION,
+        "data_hash": training_data_hash(training_data),
+        "sklearn_version": sklearn.__version__,
+        "pipeline": pipeline,
+        "scorer": scorer,
+        "report": report,
+    }
+
+    # Write to a temporary file first so a crash never leaves a half-written artifact
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    if scorer_path:
+        write_intent_scorer(scorer, scorer_path)
+    return artifact
+
+
+# Read a saved artifact, returning None if it is missing or unreadable
+def read_artifact(path=MODEL_PATH):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+# Check that an artifact was built from this training data with this version of sklearn
+def is_artifact_current(artifact, training_data):
+    import sklearn
+
+    return (
+        isinstance(artifact, dict)
+        and artifact.get("version") == ARTIFACT_VERSION
+        and artifact.get("data_hash") == training_data_hash(training_data)
+        and artifact.get("sklearn_version") == sklearn.__version__
+    )
+
+
+# Load the trained pipeline, retraining only when the training data has changed
+def load_intent_model(training_data, path=MODEL_PATH):
+    artifact = read_artifact(path)
+    if not is_artifact_current(artifact, training_data):
+        artifact = build_intent_model(training_data, path, evaluate=False)
+    return artifact["pipeline"]
+
+
+# Export the fitted vocabulary, IDF weights and logistic regression coefficients into a plain dict
+# (JSON-serializable) that IntentScorer can evaluate without sklearn or numpy
+def export_intent_scorer(pipeline, data_hash=None):
+    vectorizer = pipeline.named_steps["vectorizer"]
+    tfidf = pipeline.named_steps["tfidf"]
+    classifier = pipeline.named_steps["classifier"]
+    if (vectorizer.analyzer != "word" or tuple(vectorizer.ngram_range) != (1, 1) or vectorizer.tokenizer
+            or vectorizer.preprocessor or vectorizer.strip_accents or vectorizer.stop_words or vectorizer.binary
+            or tfidf.norm not in ("l2", None)):
+        raise ValueError("The intent scorer only supports unigram word counts with l2 or no normalization")
+
+    classes = [str(c) for c in classifier.classes_]
+    # Binary and one-vs-rest models squash each score with a sigmoid; multinomial models use a softmax
+    multi_class = getattr(classifier, "multi_class", "auto")
+    ovr = len(classes) <= 2 or multi_class == "ovr" or (
+        multi_class in ("auto", "warn") and getattr(classifier, "solver", None) == "liblinear")
+    idf = tfidf.idf_ if tfidf.use_idf else None
+    coef = classifier.coef_
+    return {
+        "version": ARTIFACT_VERSION,
+        "data_hash": data_hash,
+        "token_pattern": vectorizer.token_pattern,
+        "lowercase": bool(vectorizer.lowercase),
+        "sublinear_tf": bool(tfidf.sublinear_tf),
+        "norm": tfidf.norm,
+        "link": "ovr" if ovr else "softmax",
+        "classes": classes,
+        "intercept": [float(b) for b in classifier.intercept_],
+        # term -> [idf, [coefficient for each row of coef_]]
+        "terms": {
+            str(term): [float(idf[i]) if idf is not None else 1.0, [float(w) for w in coef[:, i]]]
+            for term, i in vectorizer.vocabulary_.items()
+        },
+    }
+
+
+def write_intent_scorer(scorer, path=SCORER_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(scorer, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+# Read an exported scorer, returning None if it is missing or unreadable
+def read_intent_scorer(path=SCORER_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# The exported scorer is plain data, so unlike the pickle it does not depend on the sklearn version
+def is_scorer_current(scorer, training_data):
+    return (
+        isinstance(scorer, dict)
+        and scorer.get("version") == ARTIFACT_VERSION
+        and scorer.get("data_hash") == training_data_hash(training_data)
+    )
+
+
+# Load the serve-time scorer. sklearn is only imported when the export is missing or out of date
+def load_intent_scorer(training_data, path=SCORER_PATH, model_path=MODEL_PATH):
+    scorer = read_intent_scorer(path)
+    if not is_scorer_current(scorer, training_data):
+        artifact = read_artifact(model_path)
+        if is_artifact_current(artifact, training_data):
+            scorer = export_intent_scorer(artifact["pipeline"], artifact["data_hash"])
+            write_intent_scorer(scorer, path)
+        else:
+            scorer = build_intent_model(training_data, model_path, evaluate=False, scorer_path=path)["scorer"]
+    return IntentScorer(scorer)
+
+
+# Same predictions and probabilities as the pipeline it was exported from: tokenize, tf-idf weight,
+# l2-normalize, then a sparse dot product against the coefficients of the terms actually present
+class IntentScorer:
+    def __init__(self, scorer):
+        self.classes_ = list(scorer["classes"])
+        self._token_pattern = re.compile(scorer["token_pattern"])
+        self._lowercase = scorer["lowercase"]
+        self._sublinear_tf = scorer["sublinear_tf"]
+        self._norm = scorer["norm"]
+        self._ovr = scorer["link"] == "ovr"
+        self._intercept = tuple(scorer["intercept"])
+        self._terms = {term: (idf, tuple(column)) for term, (idf, column) in scorer["terms"].items()}
+        # Probability of each intent for an utterance with no known words, i.e. the model's prior
+        self.priors = dict(zip(self.classes_, self.predict_proba_one("")))
+
+    # Raw decision scores (one per row of coef_) for one utterance
+    def decision_function_one(self, text):
+        if self._lowercase:
+            text = text.lower()
+        counts = {}
+        for token in self._token_pattern.findall(text):
+            if token in self._terms:
+                counts[token] = counts.get(token, 0) + 1
+
+        weights = []
+        for token, count in counts.items():
+            idf, column = self._terms[token]
+            tf = 1 + math.log(count) if self._sublinear_tf else count
+            weights.append((tf * idf, column))
+        scale = 1.0
+        if self._norm == "l2" and weights:
+            scale = math.sqrt(sum(w * w for w, _ in weights))
+
+        scores = list(self._intercept)
+        for weight, column in weights:
+            weight /= scale
+            for k, coefficient in enumerate(column):
+                scores[k] += weight * coefficient
+        return scores
+
+    def predict_proba_one(self, text):
+        scores = self.decision_function_one(text)
+        if self._ovr:
+            probabilities = [1.0 / (1.0 + math.exp(-s)) for s in scores]
+            if len(probabilities) == 1:
+                return [1.0 - probabilities[0], probabilities[0]]
+            total = sum(probabilities)
+            return [p / total for p in probabilities]
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def predict_proba(self, texts):
+        return [self.predict_proba_one(text) for text in texts]
+
+    def predict(self, texts):
+        return [intent for intent, _ in self.predict_with_confidence(texts)]
+
+    # (intent, confidence) for each utterance; ties go to the first class, as with numpy's argmax
+    def predict_with_confidence(self, texts):
+        results = []
+        for text in texts:
+            probabilities = self.predict_proba_one(text)
+            best = max(range(len(probabilities)), key=probabilities.__getitem__)
+            results.append((self.classes_[best], probabilities[best]))
+        return results
+
+
+# Raise ValueError if the scorer disagrees with the pipeline on any of the given utterances
+def verify_intent_scorer(pipeline, scorer, texts, tolerance=1e-9):
+    texts = list(texts)
+    expected = pipeline.predict_proba(texts)
+    predicted = pipeline.predict(texts)
+    for row, text in enumerate(texts):
+        probabilities = scorer.predict_proba_one(text)
+        drift = max(abs(p - float(e)) for p, e in zip(probabilities, expected[row]))
+        intent = scorer.predict([text])[0]
+        if drift > tolerance or intent != str(predicted[row]):
+            raise ValueError(
+                f"Intent scorer disagrees with the pipeline on {text!r}: "
+                f"{intent} vs {predicted[row]} (probability drift {drift:.2e})")
+
+
+# Predict (intent, confidence) for a batch of preprocessed utterances with the exported IntentScorer,
+# or with one vectorized predict_proba call on an sklearn pipeline
+def predict_with_confidence(model, texts):
+    if not texts:
+        return []
+    if isinstance(model, IntentScorer):
+        return model.predict_with_confidence(texts)
+    probabilities = model.predict_proba(texts)
+    best = probabilities.argmax(axis=1)
+    classes = model.classes_
+    return [(str(classes[i]), float(probabilities[row, i])) for row, i in enumerate(best)]
+
+
+# Collects utterances from concurrent coroutines and classifies them together. A batch is flushed when
+# it reaches max_batch_size, or max_wait seconds after its first utterance (0 = at the next event loop
+# iteration, so a lone request is not delayed). Worth it for the sklearn pipeline, whose predict_proba is
+# vectorized; the exported IntentScorer scores one utterance at a time and is called directly instead
+class IntentBatcher:
+    def __init__(self, model, max_batch_size=INTENT_BATCH_MAX_SIZE, max_wait=INTENT_BATCH_MAX_WAIT):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending = []  # (text, future)
+        self._flush_handle = None
+        self.batches = 0
+        self.predictions = 0
+
+    # Return (intent, confidence) for one preprocessed utterance
+    async def predict(self, text):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            if self.max_wait:
+                self._flush_handle = loop.call_later(self.max_wait, self.flush)
+            else:
+                self._flush_handle = loop.call_soon(self.flush)
+        return await future
+
+    # Classify everything queued so far and hand each caller its result
+    def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            results = predict_with_confidence(self.model, [text for text, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.predictions += len(pending)
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+
+# Build step: python intent_model.py [model_path [scorer_path]]
+if __name__ == "__main__":
+    import sys
+    from prem_bot import training_data
+
+    output_path = sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH
+    scorer_path = sys.argv[2] if len(sys.argv) > 2 else SCORER_PATH
+    artifact = build_intent_model(training_data, output_path, scorer_path=scorer_path)
+    print(f"Wrote intent model to {output_path} and scorer to {scorer_path} "
+          f"(data hash {artifact['data_hash'][:12]})")
+    print(artifact["report"])
+
+    from intent_router import INTENT_MIN_LIFT
+    scorer = IntentScorer(artifact["scorer"])
+    texts, labels = zip(*training_data)
+    below = [(text, label, confidence / scorer.priors[intent]) for text, label, (intent, confidence)
+             in zip(texts, labels, scorer.predict_with_confidence(texts))
+             if intent == label and confidence < INTENT_MIN_LIFT * scorer.priors[intent]]
+    print(f"{len(below)} correctly classified training phrases below INTENT_MIN_LIFT ({INTENT_MIN_LIFT:g}) "
+          f"times their intent's prior")
+    for text, label, lift in below:
+        print(f"  {lift:.2f}x {label}: {text}")
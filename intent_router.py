@@ -0,0 +1,97 @@
+import os
+import re
+import threading
+from collections import namedtuple
+
+# A prediction is acted on only if its confidence is at least this many times its intent's prior (the
+# probability the model gives the intent for an utterance with no known words). The model is trained on
+# few phrases per intent, so raw confidences are low and the priors differ (0.07 for user_info, 0.21 for
+# introduce_name): a fixed cut either lets near-prior guesses through or rejects real matches. Correctly
+# classified training phrases score at least 1.7 times their prior, while vague inputs ("tell me
+# something", "i want to know") and inputs with no known words score about 1.0
+INTENT_MIN_LIFT = float(os.environ.get("INTENT_MIN_LIFT", "1.5"))
+
+# Routing stages, in the order they are tried
+STAGE_EXIT = "exit"
+STAGE_SMALL_TALK = "small_talk"
+STAGE_DIALOGUE = "dialogue"  # A booking flow in progress, handled by handle_turn
+STAGE_NAME = "name"
+STAGE_CLASSIFIER = "classifier"
+STAGE_LOW_CONFIDENCE = "low_confidence"
+STAGES = (STAGE_EXIT, STAGE_SMALL_TALK, STAGE_DIALOGUE, STAGE_NAME, STAGE_CLASSIFIER, STAGE_LOW_CONFIDENCE)
+
+# stage: which stage answered; intent: the intent to act on (None for exit and small talk);
+# confidence: classifier probability (1.0 for rules); reply: the canned answer for small talk
+Route = namedtuple("Route", ["stage", "intent", "confidence", "reply"])
+
+EXIT_PATTERN = re.compile(r"(?:exit|quit|cancel)")
+OUR_PATTERN = re.compile(r"\bour\b", re.IGNORECASE)
+
+# Name statements answered without the classifier, checked in priority order
+NAME_RULES = (
+    ("user_info", re.compile(r"\bwhat is my name\b")),
+    ("introduce_name", re.compile(r"\bmy name is\b")),
+    ("ambiguous_query", OUR_PATTERN),  # "our" means the user's favourite team, resolved by respond_async
+)
+
+
+# Ordered routing: compiled rules for exit, small talk and name statements first, then the intent
+# classifier, whose uncertain predictions (too little above their intent's prior) are routed to
+# ambiguous_query. Counts hits per stage
+class IntentRouter:
+    def __init__(self, predict_async, small_talk, priors, min_lift=INTENT_MIN_LIFT):
+        self.predict_async = predict_async  # async (preprocessed text) -> (intent, confidence)
+        self.small_talk = small_talk  # (raw text) -> reply, or None if it is not small talk
+        self.priors = priors  # () -> {intent: prior probability}, called on first use
+        self.min_lift = min_lift
+        self.thresholds = None  # {intent: minimum confidence}
+        self.counts = dict.fromkeys(STAGES, 0)
+        self._lock = threading.Lock()
+
+    def count(self, stage):
+        with self._lock:
+            self.counts[stage] += 1
+
+    # Exit commands (matched against the whole preprocessed input) and small talk
+    def match_fast_path(self, user_input, user_input_cleaned):
+        if EXIT_PATTERN.fullmatch(user_input_cleaned):
+            self.count(STAGE_EXIT)
+            return Route(STAGE_EXIT, None, 1.0, None)
+        reply = self.small_talk(user_input)
+        if reply is not None:
+            self.count(STAGE_SMALL_TALK)
+            return Route(STAGE_SMALL_TALK, None, 1.0, reply)
+        return None
+
+    # Name statements, or None to fall through to the classifier
+    def match_name(self, user_input_cleaned):
+        for intent, pattern in NAME_RULES:
+            if pattern.search(user_input_cleaned):
+                self.count(STAGE_NAME)
+                return Route(STAGE_NAME, intent, 1.0, None)
+        return None
+
+    # Classify with the model, routing predictions below min_lift times their intent's prior to
+    # ambiguous_query
+    async def classify(self, user_input_cleaned):
+        if self.thresholds is None:
+            self.thresholds = {intent: self.min_lift * prior for intent, prior in self.priors().items()}
+        intent, confidence = await self.predict_async(user_input_cleaned)
+        if confidence < self.thresholds[intent]:
+            self.count(STAGE_LOW_CONFIDENCE)
+            return Route(STAGE_LOW_CONFIDENCE, "ambiguous_query", confidence, None)
+        self.count(STAGE_CLASSIFIER)
+        return Route(STAGE_CLASSIFIER, intent, confidence, None)
+
+    # Hits per stage and the share of traffic each one absorbed
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        return {
+            "total": total,
+            "min_lift": self.min_lift,
+            "thresholds": self.thresholds,
+            "stages": {stage: {"hits": hits, "share": hits / total if total else 0.0}
+                       for stage, hits in counts.items()},
+        }
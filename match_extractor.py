@@ -0,0 +1,109 @@
+import datetime
+import re
+
+from date_parser import DATE_WORDS, MONTH_PATTERN, MONTHS
+
+# One pattern tokenizes the whole utterance: full dates, standalone years (seasons) and words
+_TOKEN_PATTERN = re.compile(
+    r"\b(?:(?P<iso>(\d{4})-(\d{2})-(\d{2}))"
+    r"|(?P<compact>(\d{4})(\d{2})(\d{2}))"
+    r"|(?P<natural>(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(" + MONTH_PATTERN + r")\s+(\d{4}))"
+    r"|(?P<year>\d{4}))\b"
+    r"|(?P<word>[^\W_]+)",
+    re.IGNORECASE
+)
+
+# Words that relate two teams, e.g. "Chelsea vs Arsenal", "Chelsea and Arsenal", "Chelsea play Arsenal"
+RELATION_WORDS = frozenset(["vs", "v", "versus", "and", "play", "plays", "playing", "against"])
+
+# Filler words that are never part of a team name (the old stopword regex, plus "i want to")
+STOPWORDS = frozenset([
+    "i", "want", "to", "book", "ticket", "tickets", "for", "on", "match", "game", "play", "when", "what",
+    "fixture", "fixtures", "result", "results", "did", "will", "were", "of", "does", "the", "show", "find",
+    "recent", "in", "last", "previous", "is", "was", "next", "me",
+])
+
+# Longest run of leftover words tried as one misspelt team name ("newcastel united")
+FUZZY_MAX_WORDS = 3
+
+
+# Single-pass extractor for (team1, team2, date_or_season) built on a TeamAliasIndex. With a DateParser,
+# relative phrases ("last season", "next Saturday") are understood when there is no absolute date
+class MatchInfoExtractor:
+    def __init__(self, team_index, date_parser=None):
+        self.team_index = team_index
+        self.date_parser = date_parser
+
+    # Convert a date/year match into the extract_match_info date or season string
+    @staticmethod
+    def _date_value(match):
+        kind = match.lastgroup
+        if kind == "year":
+            year = int(match.group("year"))
+            return f"{year}-{year + 1}"
+        if kind == "iso":
+            year, month, day = match.group(2, 3, 4)
+        elif kind == "compact":
+            year, month, day = match.group(6, 7, 8)
+        else:
+            day, month_name, year = match.group(10, 11, 12)
+            month = MONTHS[month_name.lower()]
+        try:
+            return datetime.date(int(year), int(month), int(day)).strftime('%Y-%m-%d')
+        except ValueError:
+            return None  # Ignore invalid dates such as 2024-02-30
+
+    # Team named by leftover words: the closest known team if some run of them is a misspelling of one
+    # (see TeamAliasIndex.fuzzy_resolve), otherwise the raw words so callers can report them as invalid
+    def _leftover_team(self, words):
+        words = [w for w in words
+                 if w.lower() not in STOPWORDS and w.lower() not in RELATION_WORDS and w.lower() not in DATE_WORDS]
+        if not words:
+            return None
+        best_record, best_score = None, 0.0
+        for size in range(min(len(words), FUZZY_MAX_WORDS), 0, -1):
+            for start in range(len(words) - size + 1):
+                record, score = self.team_index.fuzzy_resolve(" ".join(words[start:start + size]))
+                if score > best_score:
+                    best_record, best_score = record, score
+        return best_record.name.replace(' ', '_') if best_record else "_".join(words)
+
+    def extract(self, user_input):
+        words, keys = [], []
+        date_or_season = None
+
+        # Scan the input once, pulling out the first date or season and collecting the words
+        for match in _TOKEN_PATTERN.finditer(user_input):
+            word = match.group("word")
+            if word is not None:
+                words.append(word)
+                keys.append(word.lower())
+            elif date_or_season is None:
+                date_or_season = self._date_value(match)
+        if date_or_season is None and self.date_parser is not None:
+            relative = self.date_parser.relative(user_input)
+            date_or_season = relative.value if relative is not None else None
+
+        # Walk the words once, matching the longest team alias at each position
+        mentions = self.team_index.find_mentions(keys)
+        teams = [record.name.replace(' ', '_') for record, _, _ in mentions[:2]]
+        if len(teams) == 2:
+            return teams[0], teams[1], date_or_season
+
+        # Fall back to the raw text either side of "vs" for sides with no known team
+        relation_at = next((i for i, key in enumerate(keys) if key in RELATION_WORDS), None)
+        if relation_at is not None:
+            left = [m for m in mentions if m[2] <= relation_at]
+            right = [m for m in mentions if m[1] > relation_at]
+            team1 = teams[0] if left else self._leftover_team(words[:relation_at])
+            if right:
+                team2 = right[0][0].name.replace(' ', '_')
+            else:
+                team2 = self._leftover_team(words[relation_at + 1:])
+            if team1 is None:
+                team1, team2 = team2, None
+            return team1, team2, date_or_season
+
+        if not teams:
+            return self._leftover_team(words), None, date_or_season
+        return teams[0], None, date_or_season
@@ -1,13 +1,21 @@
-import requests
+import os
 import re
-from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.pipeline import Pipeline
-from sklearn.metrics import classification_report, confusion_matrix
-from dateutil.parser import parse
-
-# User database to store user information
+import sys
+import threading
+
+import tracing
+from intent_router import EXIT_PATTERN, OUR_PATTERN, STAGE_DIALOGUE, STAGE_EXIT, STAGE_NAME, IntentRouter, Route
+from date_parser import DateParser
+from dialogue import BookingStep, DialogueState, Session
+from match_extractor import MatchInfoExtractor
+from small_talk_matcher import SmallTalk, SmallTalkMatcher
+from sports_client import PRIORITY_BACKGROUND, PRIORITY_BOOKING, get_sports_client, is_stale, request_priority
+from team_index import TeamAliasIndex, normalize_team_key, tokenize_team_key
+
+# Heavy dependencies (requests via sports_client, dateutil, sklearn via intent_model) are imported on first use,
+# so importing prem_bot for the parsing utilities stays cheap
+
+# Users seeded into the profile store (see get_profile_store) the first time it is opened
 user_database = {
     "wesley": {"team": "Chelsea"}
 }
@@ -36,18 +44,6 @@ team_aliases = {
     "Bournemouth": ["Cherries", "AFC Bournemouth"]
 }
 
-# State dictionary to manage the current interaction
-dialogue_state = {
-    "current_intent": None,
-    "team1": None,
-    "team2": None,
-    "date": None,
-    "seating_type": None,
-    "num_tickets": None,
-    "ticket_available": False,
-    "pending_task": None,  # e.g., "ask_for_seating" or "confirm_booking"
-}
-
 # Training data for intent classification
 training_data = [
     ("Chelsea vs Arsenal", "current_season"),
@@ -145,141 +141,296 @@ texts, labels = zip(*training_data)
 
 # Preprocess function to clean user input
 def preprocess_input(text):
-    text = text.lower().strip()
-    text = re.sub(r'[^\w\s]', '', text)
-    return text
-
-# Pipeline for intent classification
-intent_pipeline = Pipeline([
-    ('vectorizer', CountVectorizer()),
-    ('tfidf', TfidfTransformer()),
-    ('classifier', LogisticRegression())
-])
-
-# Train the intent classifier
-intent_pipeline.fit(texts, labels)
+    with tracing.span("preprocess"):
+        text = text.lower().strip()
+        text = re.sub(r'[^\w\s]', '', text)
+        return text
+
+# Pipeline for intent classification, loaded from the saved artifact (rebuilt if training_data changed)
+# on first use. Run `python intent_model.py` to retrain and print the evaluation report
+_intent_pipeline = None
+_intent_pipeline_lock = threading.Lock()
+
+# Load the intent classifier the first time it is needed
+def get_intent_pipeline():
+    global _intent_pipeline
+    if _intent_pipeline is None:
+        with _intent_pipeline_lock:
+            if _intent_pipeline is None:
+                from intent_model import load_intent_model
+                _intent_pipeline = load_intent_model(training_data)
+    return _intent_pipeline
+
+# Serve-time classifier: the pipeline's vocabulary, IDF weights and coefficients exported to plain data
+# (data/intent_scorer.json), so answering a turn never imports sklearn or numpy
+_intent_scorer = None
+
+def get_intent_scorer():
+    global _intent_scorer
+    if _intent_scorer is None:
+        with _intent_pipeline_lock:
+            if _intent_scorer is None:
+                from intent_model import load_intent_scorer
+                _intent_scorer = load_intent_scorer(training_data)
+    return _intent_scorer
+
+# Predict the intent of a single preprocessed utterance
+def predict_intent(user_input_cleaned):
+    with tracing.span("classify"):
+        return get_intent_scorer().predict([user_input_cleaned])[0]
+
+# Probability of each intent for an utterance with no known words
+def intent_priors():
+    return get_intent_scorer().priors
+
+# Predict (intent, confidence) for many preprocessed utterances
+def predict_intents(texts):
+    return get_intent_scorer().predict_with_confidence(list(texts))
+
+# Predict (intent, confidence) for one preprocessed utterance. The exported scorer takes microseconds and
+# gains nothing from batching (see benchmarks/bench_intent_batching.py), so it is called directly rather
+# than through an IntentBatcher queue and event loop hop
+async def predict_intent_async(user_input_cleaned):
+    with tracing.span("classify"):
+        return get_intent_scorer().predict_with_confidence([user_input_cleaned])[0]
+
+# Keep `prem_bot.intent_pipeline` working without loading the model at import time
+def __getattr__(name):
+    if name == "intent_pipeline":
+        return get_intent_pipeline()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Compiled alias index: canonical names, aliases and underscore/space variants -> canonical team record
+team_index = TeamAliasIndex(team_aliases)
+
+# Rebuild the alias index after team_aliases changes, optionally replacing the table in place. Returns
+# False if the table is the same as the one the index was built from
+def reload_team_aliases(new_aliases=None):
+    if new_aliases is not None:
+        team_aliases.clear()
+        team_aliases.update(new_aliases)
+    return team_index.reload(team_aliases)
+
+# Optional JSON alias table ({canonical: [aliases]}) replacing the one above. It is read at startup, and
+# start_team_alias_watch() reloads it when the file changes (empty = use the built-in table)
+TEAM_ALIASES_PATH = os.environ.get("TEAM_ALIASES_PATH", "")
+TEAM_ALIASES_CHECK_INTERVAL = float(os.environ.get("TEAM_ALIASES_CHECK_INTERVAL", "30"))
+_team_aliases_file_version = None
+
+# Reload the alias table from path if the file's modification time or size changed since it was last
+# read; returns True if the index was rebuilt (a rewrite with the same content is not)
+def reload_team_aliases_if_changed(path=TEAM_ALIASES_PATH):
+    import json
+    global _team_aliases_file_version
+    if not path:
+        return False
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    if version == _team_aliases_file_version:
+        return False
+    with open(path, encoding="utf-8") as f:
+        aliases = json.load(f)
+    _team_aliases_file_version = version
+    return reload_team_aliases(aliases)
+
+# Check TEAM_ALIASES_PATH for changes every `interval` seconds on a daemon thread; returns an Event that
+# stops it
+def start_team_alias_watch(path=TEAM_ALIASES_PATH, interval=TEAM_ALIASES_CHECK_INTERVAL):
+    stop = threading.Event()
+    if not path:
+        return stop
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                if reload_team_aliases_if_changed(path):
+                    print(f"ChatBot: Reloaded team aliases from {path}", file=sys.stderr)
+            except Exception as e:  # Keep serving the current table; try again next time
+                print(f"ChatBot: Team alias reload failed: {e}", file=sys.stderr)
 
-# Train-test split to evaluate the model
-X_train, X_test, y_train, y_test = train_test_split(texts, labels, test_size=0.2, random_state=42)
-intent_pipeline.fit(X_train, y_train)
+    threading.Thread(target=run, name="team-alias-watch", daemon=True).start()
+    return stop
 
-# Evaluate the pipeline
-y_pred = intent_pipeline.predict(X_test)
+reload_team_aliases_if_changed()
 
 # Function to map team aliases to their official names
 def map_alias_to_team_name(alias):
+    # Misspelt names resolve to the closest team; return the alias as-is if no match is found
+    return team_index.canonical_name(alias, fuzzy=True) or alias
 
-    for team, aliases in team_aliases.items():
-        if alias.lower() in map(str.lower, aliases):  # Match aliases case-insensitively
-            return team
-    return alias  # Return the alias as-is if no match is found
-
-# Function to validate team names
+# Function to validate team names (tolerating typos such as "Totenham", see map_alias_to_team_name)
 def is_valid_team(team_name):
-
-    # Replace underscores with spaces and normalize
-    team_name = team_name.strip().lower()
-    resolved_name = team_name.replace('_', ' ')
-    # Debugging: Log what is being checked
-    # print(f"Debug: Validating team '{team_name}' and '{resolved_name}'")
-
-    # Check against full team names (case-insensitive)
-    if resolved_name in (team.lower().replace('_', ' ').strip() for team in team_aliases.keys()):
-        # print("Debug: Matched with full team name.")
-        return True
-
-    # Check against aliases (case-insensitive)
-    for team, aliases in team_aliases.items():
-        if team_name in map(str.lower, aliases):
-            # print(f"Debug: Matched with alias of '{team}'.")
-            return True
-
-    # print("Debug: No match found.")
-    return False
-
-# Fetch match data between two teams for a given season using TheSportsDB API.
-def search_event(event_name, season=None, query_type="both"):
-    api_key = '771766'
-    base_url = f'https://www.thesportsdb.com/api/v1/json/{api_key}/searchevents.php'
-
-    # Function to fetch events from the API
-    def fetch_events(event_name, season):
-        params = {'e': event_name, 's': season} if season else {'e': event_name}
-        response_url = f"{base_url}?e={event_name}&s={season}"  # Debug URL
-
-        response = requests.get(base_url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('event', []) or []
-        else:
-            print(f"ChatBot: Failed to fetch events, status code: {response.status_code}")
-            return []
-
-    # Properly formatted event names
+    return team_index.resolve(team_name, fuzzy=True) is not None
+
+# Key used to file teams in the fixtures store: the canonical team name where it can be resolved
+def canonical_team_key(name):
+    record = team_index.resolve(name)
+    if record is None:
+        mentions = team_index.find_mentions(tokenize_team_key(name))
+        record = mentions[0][0] if mentions else None
+    return normalize_team_key(record.name if record else name)
+
+_fixtures_store = None
+_fixtures_sync = None
+_fixtures_lock = threading.Lock()
+
+# Open the local fixtures/results store on first use (None when FIXTURES_DB_PATH is empty)
+def get_fixtures_store():
+    global _fixtures_store
+    if _fixtures_store is None:
+        from fixtures_store import FIXTURES_DB_PATH, FixturesStore
+        if not FIXTURES_DB_PATH:
+            return None
+        with _fixtures_lock:
+            if _fixtures_store is None:
+                _fixtures_store = FixturesStore(FIXTURES_DB_PATH, team_key=canonical_team_key)
+    return _fixtures_store
+
+_profile_store = None
+_profile_flush = None
+_profile_lock = threading.Lock()
+
+# Open the persistent user profile store on first use, seeded with user_database, and start flushing
+# its queued writes in the background (they are also flushed at exit)
+def get_profile_store():
+    global _profile_store, _profile_flush
+    if _profile_store is None:
+        with _profile_lock:
+            if _profile_store is None:
+                import atexit
+                from profile_store import PROFILES_DB_PATH, ProfileStore, start_background_flush
+                store = ProfileStore(PROFILES_DB_PATH)
+                store.seed(user_database)
+                _profile_flush = start_background_flush(store)
+                atexit.register(store.flush)
+                _profile_store = store
+    return _profile_store
+
+# Write queued profile changes now, if the store was opened (forked workers exit without atexit handlers)
+def flush_profiles():
+    if _profile_store is not None:
+        _profile_store.flush()
+
+_ticket_inventory = None
+_ticket_lock = threading.Lock()
+
+# Open the ticket inventory on first use
+def get_ticket_inventory():
+    global _ticket_inventory
+    if _ticket_inventory is None:
+        with _ticket_lock:
+            if _ticket_inventory is None:
+                from ticket_inventory import TICKETS_DB_PATH, TicketInventory
+                _ticket_inventory = TicketInventory(TICKETS_DB_PATH)
+    return _ticket_inventory
+
+# Inventory key for the fixture being booked in a dialogue state
+def booking_fixture_key(state):
+    from ticket_inventory import fixture_key
+    return fixture_key(canonical_team_key(state.team1), canonical_team_key(state.team2), state.date)
+
+# Put the seats held for an abandoned booking back on sale
+def release_ticket_hold(state):
+    if state.hold_id:
+        get_ticket_inventory().release(state.hold_id)
+
+# Start the background job that keeps the fixtures store in sync with TheSportsDB
+def start_fixtures_sync():
+    global _fixtures_sync
+    store = get_fixtures_store()
+    if store is not None and _fixtures_sync is None:
+        from fixtures_store import start_background_sync
+        _fixtures_sync = start_background_sync(store, get_sports_client())
+    return _fixtures_sync
+
+# Read the events from a searchevents.php response
+def read_events(data):
+    return (data or {}).get('event', []) or []
+
+# Head-to-head events from search_event; stale is True when any of them came from the last good
+# TheSportsDB response rather than a fresh one (see sports_client.StaleResponse)
+class EventList(list):
+    __slots__ = ("stale",)
+
+    def __init__(self, events, stale=False):
+        super().__init__(events)
+        self.stale = stale
+
+# searchevents.php parameters for both orientations of a fixture and every requested season
+def event_search_params(event_name, seasons):
     team1, team2 = event_name.split('_vs_')
     original_event_name = f"{team1}_vs_{team2}"
     flipped_event_name = f"{team2}_vs_{team1}"
+    return [{'e': name, 's': s} if s else {'e': name}
+            for name in (original_event_name, flipped_event_name) for s in seasons]
 
-    original_events = fetch_events(original_event_name, season)
-    flipped_events = fetch_events(flipped_event_name, season)
-
-    events = original_events + flipped_events
+# Filter head-to-head events based on query type
+def filter_events(events, query_type, season, stale=False):
     sorted_events = sorted(events, key=lambda x: x.get('dateEvent', ''), reverse=True)
-
-    # Filter events based on query type
     if query_type == "past":
-        return sorted_events[1:2]  # Return the most recent past event
+        sorted_events = sorted_events[1:2]  # Return the most recent past event
     elif query_type == "future":
-        return sorted_events[:1]  # Return the next upcoming event
-    else:  # Return both past and future events
-        return sorted_events[:2] if not season else sorted_events
+        sorted_events = sorted_events[:1]  # Return the next upcoming event
+    elif not season:  # Return both past and future events
+        sorted_events = sorted_events[:2]
+    return EventList(sorted_events, stale)
+
+# Answer a head-to-head query from the local fixtures store when it has synced every requested season
+def stored_head_to_head(event_name, seasons):
+    store = get_fixtures_store()
+    if store is None:
+        return None
+    team1, team2 = event_name.split('_vs_')
+    return store.head_to_head(team1, team2, seasons)
+
+# Fetch match data between two teams for a given season (or list of seasons) using TheSportsDB API.
+# Both orientations (and every season) are requested concurrently, so a lookup costs about one round trip.
+# Every response is waited for: the latest meetings can be in either orientation. Returns an EventList
+def search_event(event_name, season=None, query_type="both"):
+    seasons = season if isinstance(season, (list, tuple)) else [season]
+    events = stored_head_to_head(event_name, seasons)
+    stale = False
+
+    if events is None:
+        client = get_sports_client()
+        pending = [client.submit('searchevents.php', params) for params in event_search_params(event_name, seasons)]
+        responses = [future.result() for future in pending]
+        events = [event for data in responses for event in read_events(data)]
+        stale = any(is_stale(data) for data in responses)
+
+    return filter_events(events, query_type, season, stale)
+
+# asyncio version of search_event
+async def search_event_async(event_name, season=None, query_type="both"):
+    with tracing.span("fixture_fetch", kind="head_to_head") as span:
+        return await _search_event_async(event_name, season, query_type, span)
+
+async def _search_event_async(event_name, season, query_type, span):
+    import asyncio
+
+    seasons = season if isinstance(season, (list, tuple)) else [season]
+    events = stored_head_to_head(event_name, seasons)
+    span.set(store="miss" if events is None else "hit")
+    stale = False
+
+    if events is None:
+        client = get_sports_client()
+        responses = await asyncio.gather(*(client.get_json_async('searchevents.php', params)
+                                           for params in event_search_params(event_name, seasons)))
+        events = [event for data in responses for event in read_events(data)]
+        stale = any(is_stale(data) for data in responses)
+
+    return filter_events(events, query_type, season, stale)
+
+# Compiled single-pass extractor for team mentions, dates/seasons and the "vs/and/play" relation
+# Dates and seasons: common shapes and relative phrases ("next Saturday", "last season") without dateutil
+date_parser = DateParser()
+match_extractor = MatchInfoExtractor(team_index, date_parser)
 
 # Function to extract match details (teams and date/season)
 def extract_match_info(user_input):
-    normalized_input = re.sub(
-        r'\b(i want to book|book|tickets?|for|on|match|game|play|when|what|fixtures?|results?|did|will|were|of|does|the|show|find|recent|in|last|previous|is|was|next|me)\b',
-        '',
-        user_input,
-        flags=re.IGNORECASE
-    ).strip()
-
-    # Extract date in the format YYYY-MM-DD, YYYYMMDD, or year (e.g., 2017 or natural dates)
-    date_match = re.search(r'\b(\d{4}-\d{2}-\d{2}|\d{8}|\d{4}|(?:\d{1,2}(?:st|nd|rd|th)?\s\w+\s\d{4}))\b', normalized_input)
-    extracted_date = None
-    season = None
-
-    if date_match:
-        date_text = date_match.group(0)
-        try:
-            if len(date_text) == 4:  # Handle standalone year as a season
-                season = f"{date_text}-{int(date_text) + 1}"
-            else:
-                # Parse natural language or standard dates
-                parsed_date = parse(date_text, fuzzy=True)
-                extracted_date = parsed_date.strftime('%Y-%m-%d')
-            normalized_input = normalized_input.replace(date_text, '').strip()  # Remove date/season from input
-        except ValueError:
-            pass  # Ignore invalid date parsing
-
-    # Convert "and" or "play" to "vs" for compatibility
-    normalized_input = normalized_input.replace(" and ", " vs ")
-    normalized_input = normalized_input.replace(" play ", " vs ")
-
-    # Extract team names
-    team1, team2 = None, None
-    match_teams = re.search(r'(.+?)\s+vs\s+(.+)', normalized_input, re.IGNORECASE)
-
-    if match_teams:
-        team1, team2 = match_teams.groups()
-        team1 = map_alias_to_team_name(team1.strip()).replace(' ', '_')
-        team2 = map_alias_to_team_name(team2.strip()).replace(' ', '_')
-    else:
-        # Handle single team input
-        team_match = re.search(r'(.+)', normalized_input, re.IGNORECASE)
-        if team_match:
-            team1 = map_alias_to_team_name(team_match.group(1).strip()).replace(' ', '_')
-
-    return team1, team2, extracted_date or season
+    with tracing.span("extract"):
+        return match_extractor.extract(user_input)
 
 # Detect if the user is providing their name or asking about their stored name.
 def detect_name_statement(user_input):
@@ -290,262 +441,370 @@ def detect_name_statement(user_input):
         return "retrieve_name"  # Indicate a request to retrieve the name
     return None
 
-# Fetch the team ID for a given team name using TheSportsDB API.
-def get_team_id(team_name):
-    resolved_name = map_alias_to_team_name(team_name)
-    api_key = '771766'
-    base_url = f'https://www.thesportsdb.com/api/v1/json/{api_key}/searchteams.php'
-    response = requests.get(base_url, params={"t": resolved_name})
-
-    if response.status_code == 200:
-        data = response.json()
-        teams = data.get('teams', [])
-        if teams:
-            return teams[0].get('idTeam', None)  # Return the first match's idTeam
-    return None
+# Canonical team name -> TheSportsDB idTeam, filled by prefetch_team_ids() and get_team_id()
+team_id_table = {}
+TEAM_IDS_PATH = os.environ.get(
+    "TEAM_IDS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "team_ids.json"))
+
+# Read the first idTeam from a searchteams.php response
+def read_team_id(data):
+    teams = (data or {}).get('teams', []) or []
+    return teams[0].get('idTeam', None) if teams else None  # Return the first match's idTeam
+
+# Load a saved canonical team -> idTeam snapshot into team_id_table. A snapshot taken from another base URL
+# (a local stub, say) is ignored, since its IDs mean nothing to this one. An empty path disables the snapshot
+def load_team_id_snapshot(path=TEAM_IDS_PATH):
+    import json
+    if not path:
+        return 0
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if not isinstance(snapshot, dict) or snapshot.get("base_url") != get_sports_client().base_url:
+        return 0
+    teams = snapshot.get("teams") or {}
+    team_id_table.update({team: team_id for team, team_id in teams.items() if team in team_aliases})
+    return len(teams)
+
+# Write team_id_table to disk, with the base URL it came from, so the next startup needs no lookups
+def save_team_id_snapshot(path=TEAM_IDS_PATH):
+    import json
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"base_url": get_sports_client().base_url, "teams": dict(sorted(team_id_table.items()))}, f,
+                  indent=2)
+    os.replace(tmp_path, path)
+
+# Warm-up: resolve every canonical team in team_aliases to its idTeam, from the snapshot if present,
+# otherwise in one concurrent batch of searchteams.php lookups at background priority
+def prefetch_team_ids(path=TEAM_IDS_PATH):
+    load_team_id_snapshot(path)
+    missing = [team for team in team_aliases if team not in team_id_table]
+    if missing:
+        client = get_sports_client()
+        with request_priority(PRIORITY_BACKGROUND):
+            pending = {team: client.submit('searchteams.php', {"t": team}) for team in missing}
+        resolved = {team: read_team_id(future.result()) for team, future in pending.items()}
+        resolved = {team: team_id for team, team_id in resolved.items() if team_id}
+        if resolved:
+            team_id_table.update(resolved)
+            save_team_id_snapshot(path)
+    return dict(team_id_table)
+
+# Run prefetch_team_ids() on a background thread so startup is not held up by the network. A failed
+# warm-up is reported and otherwise ignored: team IDs are then looked up as they are needed
+def start_team_id_prefetch(path=TEAM_IDS_PATH):
+    def run():
+        try:
+            prefetch_team_ids(path)
+        except Exception as e:
+            print(f"ChatBot: Team ID prefetch failed: {e}", file=sys.stderr)
+
+    thread = threading.Thread(target=run, name="team-id-prefetch", daemon=True)
+    thread.start()
+    return thread
 
-# Fetch the next fixture for a team using the team ID.
+# Fetch the team ID for a given team name, from the team ID table or TheSportsDB API.
+def get_team_id(team_name):
+    with tracing.span("get_team_id") as span:
+        resolved_name = map_alias_to_team_name(team_name)
+        team_id = team_id_table.get(resolved_name)
+        if team_id:
+            span.set(table="hit")
+            return team_id
+
+        data = get_sports_client().get_json('searchteams.php', params={"t": resolved_name})
+        return remember_team_id(resolved_name, read_team_id(data))
+
+# asyncio version of get_team_id
+async def get_team_id_async(team_name):
+    with tracing.span("get_team_id") as span:
+        resolved_name = map_alias_to_team_name(team_name)
+        team_id = team_id_table.get(resolved_name)
+        if team_id:
+            span.set(table="hit")
+            return team_id
+
+        data = await get_sports_client().get_json_async('searchteams.php', params={"t": resolved_name})
+        return remember_team_id(resolved_name, read_team_id(data))
+
+# Record a looked-up idTeam in the team ID table
+def remember_team_id(resolved_name, team_id):
+    if team_id and resolved_name in team_aliases:
+        team_id_table[resolved_name] = team_id
+    return team_id
+
+# Summarise an eventsnext.php event; stale marks one served from the last good response (see sports_client)
+def format_next_fixture(next_event, stale=False):
+    if not next_event:
+        return None
+    return {
+        "stale": stale,
+        "home": next_event.get('strHomeTeam', 'Unknown'),
+        "away": next_event.get('strAwayTeam', 'Unknown'),
+        "date": next_event.get('dateEvent', 'Unknown'),
+        "venue": next_event.get('strVenue', 'Unknown'),
+        "league": next_event.get('strLeague', 'Unknown'),
+        "time": next_event.get('strTime', 'Unknown')
+    }
+
+# Summarise an eventslast.php event, including the score
+def format_last_fixture(last_event, stale=False):
+    if not last_event:
+        return None
+    return {
+        "stale": stale,
+        "home": last_event.get('strHomeTeam', 'Unknown'),
+        "away": last_event.get('strAwayTeam', 'Unknown'),
+        "date": last_event.get('dateEvent', 'Unknown'),
+        "venue": last_event.get('strVenue', 'Unknown'),
+        "league": last_event.get('strLeague', 'Unknown'),
+        "time": last_event.get('strTime', 'Unknown'),
+        "intHomeScore": last_event.get('intHomeScore', 'Unknown'),
+        "intAwayScore": last_event.get('intAwayScore', 'Unknown'),
+    }
+
+# First event listed under `key` in a TheSportsDB response
+def first_event(data, key):
+    events = data.get(key, []) if data else None
+    return events[0] if events else None
+
+# Fetch the next fixture for a team using the team ID. Always asked of TheSportsDB rather than the local
+# fixtures store, which holds league games only and would skip cup and European fixtures
 def get_next_fixture_by_id(team_id):
-    api_key = '771766'
-    base_url = f'https://www.thesportsdb.com/api/v1/json/{api_key}/eventsnext.php'
-    response = requests.get(base_url, params={"id": team_id})
-
-    if response.status_code == 200:
-        data = response.json()
-        events = data.get('events', [])
-
-        if events:
-            next_event = events[0]
-            return {
-                "home": next_event.get('strHomeTeam', 'Unknown'),
-                "away": next_event.get('strAwayTeam', 'Unknown'),
-                "date": next_event.get('dateEvent', 'Unknown'),
-                "venue": next_event.get('strVenue', 'Unknown'),
-                "league": next_event.get('strLeague', 'Unknown'),
-                "time": next_event.get('strTime', 'Unknown')
-            }
-    return None
+    data = get_sports_client().get_json('eventsnext.php', params={"id": team_id})
+    return format_next_fixture(first_event(data, 'events'), stale=is_stale(data))
+
+# asyncio version of get_next_fixture_by_id
+async def get_next_fixture_by_id_async(team_id):
+    with tracing.span("fixture_fetch", kind="next"):
+        data = await get_sports_client().get_json_async('eventsnext.php', params={"id": team_id})
+        return format_next_fixture(first_event(data, 'events'), stale=is_stale(data))
 
-# Fetch the last fixture for a team using the team ID.
+# Fetch the last fixture for a team using the team ID (from TheSportsDB, see get_next_fixture_by_id)
 def get_last_fixture_by_id(team_id):
-    api_key = '771766'
-    base_url = f'https://www.thesportsdb.com/api/v1/json/{api_key}/eventslast.php'
-    response = requests.get(base_url, params={"id": team_id})
-
-    if response.status_code == 200:
-        data = response.json()
-        events = data.get('results', [])
-        if events:
-            last_event = events [0]
-            return {
-                "home": last_event.get('strHomeTeam', 'Unknown'),
-                "away": last_event.get('strAwayTeam', 'Unknown'),
-                "date": last_event.get('dateEvent', 'Unknown'),
-                "venue": last_event.get('strVenue', 'Unknown'),
-                "league": last_event.get('strLeague', 'Unknown'),
-                "time": last_event.get('strTime', 'Unknown'),
-                "intHomeScore": last_event.get('intHomeScore', 'Unknown'),
-                "intAwayScore": last_event.get('intAwayScore', 'Unknown'),
-            }
-    return None
+    data = get_sports_client().get_json('eventslast.php', params={"id": team_id})
+    return format_last_fixture(first_event(data, 'results'), stale=is_stale(data))
+
+# asyncio version of get_last_fixture_by_id
+async def get_last_fixture_by_id_async(team_id):
+    with tracing.span("fixture_fetch", kind="last"):
+        data = await get_sports_client().get_json_async('eventslast.php', params={"id": team_id})
+        return format_last_fixture(first_event(data, 'results'), stale=is_stale(data))
+
+_sync_loops = threading.local()
+
+# Run a coroutine to completion from synchronous code, reusing one event loop per thread
+def run_sync(coro):
+    import asyncio
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        loop = getattr(_sync_loops, "loop", None)
+        if loop is None or loop.is_closed():
+            loop = _sync_loops.loop = asyncio.new_event_loop()
+        return loop.run_until_complete(coro)
+
+    # Called from inside a running event loop: finish the coroutine on a helper thread instead
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=1) as helper:
+        return helper.submit(asyncio.run, coro).result()
+
+# Handle a single turn of the conversation based on user input and state (blocking wrapper).
+def handle_turn(user_input, state, user_name=None):
+    return run_sync(handle_turn_async(user_input, state, user_name))
+
+# Handle a single turn of the conversation based on user input and state. Confirmed bookings are added
+# to user_name's booking history when the user has introduced themselves. Its TheSportsDB requests are
+# made at booking priority, ahead of other lookups. intent skips classifying a message already classified.
+# state is a DialogueState, or a dict in the shape earlier versions took, which is updated in place
+async def handle_turn_async(user_input, state, user_name=None, intent=None):
+    mapping = None
+    if not isinstance(state, DialogueState):
+        mapping, state = state, DialogueState.from_mapping(state)
+    try:
+        with tracing.turn(), request_priority(PRIORITY_BOOKING):
+            reply, intent = await _handle_turn_async(user_input, state, user_name, intent)
+        return reply
+    finally:
+        if mapping is not None:
+            state.update_mapping(mapping, intent)
+
+# Caveat for an answer built from the last good TheSportsDB response, or "" for a fresh one
+def stale_note(stale):
+    return STALE_NOTE + "\n" if stale else ""
+
+# Prompt for a team name the bot does not know
+def invalid_team_reply(team):
+    return f"ChatBot: {team} is not a valid Premier League team.\nChatBot: " + team_list_prompt()
+
+# Look up the next match for the teams the user wants tickets for and offer to book it: one team books its
+# next fixture, two teams their next meeting (or the bot asks for the date when none is scheduled)
+async def offer_next_match(team1, team2, state):
+    if not team2:
+        team_id = await get_team_id_async(map_alias_to_team_name(team1))
+        if not team_id:
+            return f"I couldn't find any upcoming matches for {team1.replace('_', ' ')}. Please try again later."
+        next_fixture = await get_next_fixture_by_id_async(team_id)
+        if not next_fixture:
+            return f"I couldn't find any upcoming matches for {team1.replace('_', ' ')}. Please try again later."
+        state.team1 = next_fixture['home'].replace(' ', '_')
+        state.team2 = next_fixture['away'].replace(' ', '_')
+        state.date = next_fixture.get('date', 'Unknown')
+        state.venue = next_fixture.get('venue', 'Unknown')
+        state.advance(BookingStep.CONFIRM_NEXT_MATCH)
+        return (
+            f"The next match for {team1.replace('_', ' ')} is:\n"
+            f"{next_fixture['home']} vs {next_fixture['away']} on {next_fixture['date']} at {next_fixture['venue']}.\n"
+            f"{stale_note(next_fixture['stale'])}Would you like to book tickets for this match?"
+        )
+
+    if not is_valid_team(team1):
+        return invalid_team_reply(team1)
+    elif not is_valid_team(team2):
+        return invalid_team_reply(team2)
+    state.team1, state.team2 = team1, team2
+
+    event_name = f"{team1}_vs_{team2}"
+    next_match = await search_event_async(event_name, query_type="future")
+    if next_match:
+        match = next_match[0]
+        state.date = match.get('dateEvent', 'Unknown')
+        state.venue = match.get('strVenue', 'Unknown')
+        state.advance(BookingStep.CONFIRM_NEXT_MATCH)
+        return (f"{team1.replace('_', ' ')} and {team2.replace('_', ' ')} are next playing at "
+                f"{state.venue} on {state.date}.\n{stale_note(next_match.stale)}Would you like to book these tickets?")
+    state.advance(BookingStep.ASK_FOR_DATE)
+    return f"I couldn't find the next match for {team1.replace('_', ' ')} vs {team2.replace('_', ' ')}. When is the match?"
+
+# Answers to each step of the booking flow (see dialogue.BOOKING_TRANSITIONS). Each handler takes
+# (user_input, user_input_cleaned, state, user_name) and returns the reply
+async def _answer_teams(user_input, user_input_cleaned, state, user_name):
+    team1, team2, _ = extract_match_info(user_input_cleaned)
+    if not team1:
+        return "I couldn't identify a team. Please specify valid team names like 'Chelsea' or 'Arsenal'."
+    return await offer_next_match(team1, team2, state)
+
+async def _answer_next_match(user_input, user_input_cleaned, state, user_name):
+    if "yes" in user_input_cleaned or "confirm" in user_input_cleaned:
+        state.advance(BookingStep.ASK_FOR_SEATING)
+        return "What seating type would you like (VIP or regular)?"
+    elif "no" in user_input_cleaned:
+        state.advance(BookingStep.ASK_FOR_DATE)
+        return "Which date is the match on?"
+    return "Please confirm your booking by saying 'yes' or cancel by saying 'no'."
+
+async def _answer_date(user_input, user_input_cleaned, state, user_name):
+    # The raw input keeps the separators in '15/12/2024' and '2024-12-15'
+    with tracing.span("parse_date") as span:
+        parsed = date_parser.parse(user_input)
+        span.set(source=parsed.source if parsed else None)
+    if parsed is None or parsed.kind != "date":
+        print(f"Debug: Failed to Parse Date: {user_input_cleaned}", file=sys.stderr)
+        return "I couldn't understand the date. Please provide it in a format like 'December 15, 2024' or '2024-12-15'."
+    state.date = parsed.value
+    state.advance(BookingStep.ASK_FOR_SEATING)
+    return (
+        f"Tickets are available for {state.team1.replace('_', ' ')} vs {state.team2.replace('_', ' ')} "
+        f"on {state.date}. What seating type would you like (VIP or regular)?")
+
+async def _answer_seating(user_input, user_input_cleaned, state, user_name):
+    seating_type = extract_seating_type(user_input_cleaned)
+    if not seating_type:
+        return "Please specify a seating type (VIP or regular)."
+    if not get_ticket_inventory().available(booking_fixture_key(state), seating_type):
+        return (f"Sorry, {seating_type} tickets for {state.team1.replace('_', ' ')} vs "
+                f"{state.team2.replace('_', ' ')} on {state.date} are sold out. "
+                f"Would you like another seating type (VIP or regular)?")
+    state.seating_type = seating_type
+    state.advance(BookingStep.ASK_FOR_NUM_TICKETS)
+    return f"How many {seating_type} tickets would you like?"
+
+async def _answer_num_tickets(user_input, user_input_cleaned, state, user_name):
+    num_tickets = extract_num_tickets(user_input_cleaned)
+    if not num_tickets:
+        return "Please specify the number of tickets as a number."
+    # Take the seats off sale while the user confirms
+    inventory = get_ticket_inventory()
+    hold = inventory.hold(booking_fixture_key(state), state.seating_type, num_tickets, user_name)
+    if hold is None:
+        available = inventory.available(booking_fixture_key(state), state.seating_type)
+        return (f"Sorry, only {available} {state.seating_type} tickets are left for that match. "
+                f"How many would you like?")
+    state.num_tickets = num_tickets
+    state.hold_id = hold.hold_id
+    state.advance(BookingStep.CONFIRM_BOOKING)
+    return (f"Just to confirm, you want {num_tickets} {state.seating_type} tickets for "
+            f"{state.team1.replace('_', ' ')} vs {state.team2.replace('_', ' ')} "
+            f"on {state.date}. I'll hold them for {inventory.hold_ttl / 60:.0f} minutes. "
+            f"Is that correct?")
+
+async def _answer_booking_confirmation(user_input, user_input_cleaned, state, user_name):
+    if "yes" in user_input_cleaned or "confirm" in user_input_cleaned:
+        inventory = get_ticket_inventory()
+        booking_id = inventory.confirm(state.hold_id)
+        if booking_id is None:
+            # The hold expired while the user was away; book the seats again if they are still free
+            hold = inventory.hold(booking_fixture_key(state), state.seating_type, state.num_tickets, user_name)
+            booking_id = hold and inventory.confirm(hold.hold_id)
+        if booking_id is None:
+            state.clear()
+            return "Sorry, your hold expired and those tickets are no longer available. Can you start over?"
+        if user_name:
+            get_profile_store().add_booking(user_name, state)
+        state.clear()
+        return (f"Great! Your booking is confirmed (reference {booking_id[:8].upper()}). "
+                f"You will receive your tickets via email. Enjoy the match!")
+    elif "no" in user_input_cleaned or "cancel" in user_input_cleaned:
+        release_ticket_hold(state)
+        state.clear()
+        return "Your booking has been cancelled."
+    return "Please confirm your booking by saying 'yes' or cancel by saying 'no'."
+
+# Booking step -> handler for the user's answer to it
+BOOKING_HANDLERS = {
+    BookingStep.ASK_FOR_TEAMS: _answer_teams,
+    BookingStep.CONFIRM_NEXT_MATCH: _answer_next_match,
+    BookingStep.ASK_FOR_DATE: _answer_date,
+    BookingStep.ASK_FOR_SEATING: _answer_seating,
+    BookingStep.ASK_FOR_NUM_TICKETS: _answer_num_tickets,
+    BookingStep.CONFIRM_BOOKING: _answer_booking_confirmation,
+}
 
-# Handle a single turn of the conversation based on user input and state.
-def handle_turn(user_input, state):
+# Returns the reply and the intent the turn acted on (None for a cancellation or a booking step)
+async def _handle_turn_async(user_input, state, user_name, intent):
     # Preprocess input
     user_input_cleaned = preprocess_input(user_input)
 
     # Check for exit or cancel command
-    if user_input_cleaned in ["exit", "cancel"]:
+    if EXIT_PATTERN.fullmatch(user_input_cleaned):
+        release_ticket_hold(state)
         state.clear()
-        return "Transaction cancelled. Let me know if you need help with anything else!"
-
-    # Handle pending tasks in the conversation flow
-    if state.get("pending_task"):
-        task = state["pending_task"]
-
-        if task == "ask_for_teams":
-            team1, team2, _ = extract_match_info(user_input_cleaned)
-
-            if not team1:
-                return "I couldn't identify a team. Please specify valid team names like 'Chelsea' or 'Arsenal'."
-
-            # if not is_valid_team(team1):
-            #     return(f"ChatBot: {team1} is not a valid Premier League team.\nChatBot: Please specify a valid Premier League team from the following: " + ", ".join(team_aliases.keys()))
-
-            if team1 and not team2:
-                # Fetch the next fixture for the specified team
-                resolved_team = map_alias_to_team_name(team1)
-                team_id = get_team_id(resolved_team)
-                if team_id:
-                    next_fixture = get_next_fixture_by_id(team_id)
-                else:
-                    return f"I couldn't find any upcoming matches for {team1.replace('_', ' ')}. Please try again later."
-
-                # Update the state with fixture details
-                state.update({
-                    "team1": next_fixture['home'].replace(' ', '_'),
-                    "team2": next_fixture['away'].replace(' ', '_'),
-                    "date": next_fixture.get('date', 'Unknown'),
-                    "venue": next_fixture.get('venue', 'Unknown'),
-                    "pending_task": "confirm_next_match"
-                })
-
-                # Offer to book tickets for the next match
-                return (
-                    f"The next match for {team1.replace('_', ' ')} is:\n"
-                    f"{next_fixture['home']} vs {next_fixture['away']} on {next_fixture['date']} at {next_fixture['venue']}.\n"
-                    f"Would you like to book tickets for this match?"
-                )
-
-
-            if not is_valid_team(team1):
-                return(f"ChatBot: {team1} is not a valid Premier League team.\nChatBot: Please specify a valid Premier League team from the following: " + ", ".join(team_aliases.keys()))
-            elif not is_valid_team(team2):
-                return(f"ChatBot: {team2} is not a valid Premier League team.\nChatBot: Please specify a valid Premier League team from the following: " + ", ".join(team_aliases.keys()))
-            state.update({"team1": team1, "team2": team2})
-
-            event_name = f"{team1}_vs_{team2}"
-            next_match = search_event(event_name, query_type="future")
-
-            if next_match:
-                match = next_match[0]
-                state.update({
-                    "date": match.get('dateEvent', 'Unknown'),
-                    "venue": match.get('strVenue', 'Unknown'),
-                    "pending_task": "confirm_next_match"
-                })
-                return (f"{team1.replace('_', ' ')} and {team2.replace('_', ' ')} are next playing at "
-                        f"{state['venue']} on {state['date']}. Would you like to book these tickets?")
-            else:
-                state["pending_task"] = "ask_for_date"
-                return f"I couldn't find the next match for {team1.replace('_', ' ')} vs {team2.replace('_', ' ')}. When is the match?"
-
-            if team2:
-                return f"Got it! You want to book tickets for {team1.replace('_', ' ')} vs {team2.replace('_', ' ')}. When is the match?"
-            else:
-                return f"Got it! You want to book tickets for {team1.replace('_', ' ')}. When is the match?"
+        return "Transaction cancelled. Let me know if you need help with anything else!", None
 
-        elif task == "ask_for_date":
-            try:
-                parsed_date = parse(user_input_cleaned, fuzzy=True).strftime('%Y-%m-%d')
-                state["date"] = parsed_date
-                state["pending_task"] = "ask_for_seating"
-                return (
-                    f"Tickets are available for {state['team1'].replace('_', ' ')} vs {state['team2'].replace('_', ' ')} "
-                    f"on {parsed_date}. What seating type would you like (VIP or regular)?")
-            except ValueError:
-                print(f"Debug: Failed to Parse Date: {user_input_cleaned}")
-                return "I couldn't understand the date. Please provide it in a format like 'December 15, 2024' or '2024-12-15'."
-
-
-
-        elif task == "ask_for_seating":
-            seating_type = extract_seating_type(user_input_cleaned)
-            if seating_type:
-                state["seating_type"] = seating_type
-                state["pending_task"] = "ask_for_num_tickets"
-                return f"How many {seating_type} tickets would you like?"
-            return "Please specify a seating type (VIP or regular)."
-
-        elif task == "ask_for_num_tickets":
-            num_tickets = extract_num_tickets(user_input_cleaned)
-            if num_tickets:
-                state["num_tickets"] = num_tickets
-                state["pending_task"] = "confirm_booking"
-                return (f"Just to confirm, you want {num_tickets} {state['seating_type']} tickets for "
-                        f"{state['team1'].replace('_', ' ')} vs {state['team2'].replace('_', ' ')} "
-                        f"on {state['date']}. Is that correct?")
-            return "Please specify the number of tickets as a number."
-
-        elif task == "confirm_booking":
-            if "yes" in user_input_cleaned or "confirm" in user_input_cleaned:
-                state.clear()
-                return "Great! Your booking is confirmed. You will receive your tickets via email. Enjoy the match!"
-            elif "no" in user_input_cleaned or "cancel" in user_input_cleaned:
-                state.clear()
-                return "Your booking has been cancelled."
-            return "Please confirm your booking by saying 'yes' or cancel by saying 'no'."
-
-        elif task == "confirm_next_match":
-            if "yes" in user_input_cleaned or "confirm" in user_input_cleaned:
-                state["pending_task"] = "ask_for_seating"
-                return (
-                    f"What seating type would you like (VIP or regular)?")
-            elif "no" in user_input_cleaned in user_input_cleaned:
-                state["pending_task"] = "ask_for_date"
-                return "Which date is the match on?"
-            else:
-                return "Please confirm your booking by saying 'yes' or cancel by saying 'no'."
-        return "Something went wrong. Can you start over?"
+    # Answer the question asked at the current step of the booking flow
+    if state:
+        return await BOOKING_HANDLERS[state.step](user_input, user_input_cleaned, state, user_name), None
 
-    # Predict Intent if No Pending Task
-    intent = intent_pipeline.predict([user_input_cleaned])[0]
-    state["current_intent"] = intent
+    # Predict Intent if No Booking in Progress (uncertain predictions come back as ambiguous_query)
+    if intent is None:
+        intent = (await intent_router.classify(user_input_cleaned)).intent
 
     if intent == "book_ticket":
         # Extract match details
         team1, team2, _ = extract_match_info(user_input_cleaned)
-
         if not team1:
-            state["pending_task"] = "ask_for_teams"
-            return "Great! Which teams are you booking tickets for"
-
-        if not is_valid_team(team1):
-            print(f"ChatBot: {team1} is not a valid Premier League team.")
-            print(f"ChatBot: Please specify a valid Premier League team from the following: " + ", ".join(team_aliases.keys()))
-
-        if team1 and not team2:
-            # Fetch the next fixture for the specified team
-            resolved_team = map_alias_to_team_name(team1)
-            team_id = get_team_id(resolved_team)
-            if team_id:
-                next_fixture = get_next_fixture_by_id(team_id)
-            else:
-                return f"I couldn't identify any teams. Please provide valid team names like 'Chelsea' or 'Chelsea vs Arsenal'."
-
-            # Update the state with fixture details
-            state.update({
-                "team1": next_fixture['home'].replace(' ', '_'),
-                "team2": next_fixture['away'].replace(' ', '_'),
-                "date": next_fixture.get('date', 'Unknown'),
-                "venue": next_fixture.get('venue', 'Unknown'),
-                "pending_task": "confirm_next_match"
-            })
-
-            # Offer to book tickets for the next match
-            return (
-                f"The next match for {team1.replace('_', ' ')} is:\n"
-                f"{next_fixture['home']} vs {next_fixture['away']} on {next_fixture['date']} at {next_fixture['venue']}.\n"
-                f"Would you like to book tickets for this match?"
-            )
-
-        # Fetch the next match for two teams
-
-        if not is_valid_team(team1):
-            return (f"ChatBot: {team1} is not a valid Premier League team.\nChatBot: Please specify a valid Premier League team from the following: " + ", ".join(
-                    team_aliases.keys()))
-        elif not is_valid_team(team2):
-            return (f"ChatBot: {team2} is not a valid Premier League team.\nChatBot: Please specify a valid Premier League team from the following: " + ", ".join(
-                    team_aliases.keys()))
-        state.update({"team1": team1, "team2": team2})
-        event_name = f"{team1}_vs_{team2}"
-        next_match = search_event(event_name, query_type="future")
-
-        if next_match:
-            match = next_match[0]
-            state.update({
-                "date": match.get('dateEvent', 'Unknown'),
-                "venue": match.get('strVenue', 'Unknown'),
-                "pending_task": "confirm_next_match"
-            })
-            return (f"{team1.replace('_', ' ')} and {team2.replace('_', ' ')} are next playing at "
-                    f"{state['venue']} on {state['date']}. Would you like to book these tickets?")
-        else:
-            state["pending_task"] = "ask_for_date"
-            return f"I couldn't find the next match for {team1.replace('_', ' ')} vs {team2.replace('_', ' ')}. When is the match?"
+            state.advance(BookingStep.ASK_FOR_TEAMS)
+            return "Great! Which teams are you booking tickets for", intent
+        return await offer_next_match(team1, team2, state), intent
 
     # Fallback for Unrecognized Input
-    return "I didn't understand that. Can you rephrase?"
+    return "I didn't understand that. Can you rephrase?", intent
 
 # Extract seating type (VIP or regular) from user input.
 def extract_seating_type(user_input):
@@ -560,240 +819,261 @@ def extract_num_tickets(user_input):
     match = re.search(r'\b(\d+)\b', user_input)  # Match any number in the input
     return int(match.group(1)) if match else None
 
+SMALL_TALK_FALLBACK = "I didn't quite catch that. Can you rephrase or let me know how I can assist?"
+
+# Compiled small talk phrases and responses (see small_talk_matcher.SMALL_TALK_TABLE)
+small_talk_matcher = SmallTalkMatcher()
+
+# Small talk category of a message, or SmallTalk.NONE
+def classify_small_talk(user_input):
+    return small_talk_matcher.match(user_input)
+
 #Handle Small Talk
 def small_talk(user_input):
-    user_input = user_input.lower().strip()
-
-    # Small talk responses
-    greetings = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"]
-    farewells = ["bye", "goodbye", "see you", "take care"]
-    how_are_you = ["how are you", "how are you doing"]
-    thanks = ["thank you", "thanks", "appreciate it"]
-    weather = ["how's the weather", "what's the weather like"]
-
-    # Match user input to categories
-    if any(greet in user_input for greet in greetings):
-        return "Hello! How can I assist you today?"
-    elif any(farewell in user_input for farewell in farewells):
-        return "Goodbye! Have a great day!"
-    elif any(how in user_input for how in how_are_you):
-        return "I'm just a chatbot, but I'm here to help! How can I assist you?"
-    elif any(ty in user_input for ty in thanks):
-        return "You're welcome! Let me know if there's anything else I can help with."
-    elif any(w in user_input for w in weather):
-        return "I can't check the weather right now, but it's always a good day to talk about football!"
-
-    # Default response if no match
-    return "I didn't quite catch that. Can you rephrase or let me know how I can assist?"
-
-# Chatbot function to handle user interactions
-def chatbot():
-    print(f"Welcome to the Premier League Interactive NLP-based AI! I can help you with the following:")
-    print(f"•	Find match results for your favourite teams. Try 'Wolves vs Crystal Palace in 2021'")
-    print(f"•	Check upcoming fixtures. Try 'Chelsea vs Arsenal'")
-    print(f"•	Book tickets for matches. Try 'I want to book tickets for Brighton vs Aston Villa'")
-    print(f"You can start by introducing yourself or asking about a match. How can I assist you today?")
+    category = classify_small_talk(user_input)
+    if category is SmallTalk.NONE:
+        # Default response if no match
+        return SMALL_TALK_FALLBACK
+    return small_talk_matcher.response(category)
+
+# Small talk reply for the router, or None if the input is not small talk
+def small_talk_reply(user_input):
+    return small_talk_matcher.response(classify_small_talk(user_input))
+
+# Ordered routing stage shared by all conversations: rules for exit, small talk and name statements, then
+# the classifier with a confidence threshold per intent. intent_router.stats() shows how much traffic each stage absorbs
+intent_router = IntentRouter(predict_intent_async, small_talk_reply, intent_priors)
+
+# Suggestions shown when a request could not be handled
+HELP_MESSAGE = ("I can assist with match results, fixtures, and ticket bookings. Try asking:\n"
+                "         •	‘Brighton vs Manchester United’\n"
+                "         •	‘Book tickets for Chelsea vs Wolves.’\n"
+                "         •	‘When does Liverpool play next?’")
+
+# Said with fixtures served from the last good response while TheSportsDB is failing or throttled
+STALE_NOTE = "TheSportsDB isn't responding right now, so this may be out of date."
+
+# Prompt listing every team the bot knows about
+def team_list_prompt():
+    return "Please specify a valid Premier League team from the following: " + ", ".join(team_aliases.keys())
+
+# Create the state kept for one conversation: who the user is and the booking in progress (see dialogue.Session)
+def new_session():
+    return Session()
+
+# Respond to one message in a conversation (blocking wrapper); returns the chatbot's messages
+def respond(user_input, session):
+    return run_sync(respond_async(user_input, session))
+
+# Respond to one message in a conversation; returns the chatbot's messages
+async def respond_async(user_input, session):
+    with tracing.turn():
+        replies, _ = await _respond_routed_async(user_input, session)
+        return replies
+
+# Respond to one message in a conversation; returns the chatbot's messages and the intent_router.Route
+# that decided how it was answered (stage, intent acted on, confidence)
+async def respond_routed_async(user_input, session):
+    with tracing.turn():
+        return await _respond_routed_async(user_input, session)
+
+async def _respond_routed_async(user_input, session):
+    replies = []
+    user_name = session.user_name
+    state = session.state
+
+    # Finish introducing a new user by asking for their favourite team
+    if session.awaiting_favourite_team:
+        favourite_team = user_input.strip()
+        route = Route(STAGE_DIALOGUE, "introduce_name", 1.0, None)
+        if is_valid_team(favourite_team):
+            resolved_team = map_alias_to_team_name(favourite_team)
+            get_profile_store().set_favourite_team(user_name, resolved_team)
+            session.awaiting_favourite_team = False
+            return [f"Got it. You are now a fan of {resolved_team}. You can now ask:\n"
+                    f"    • 'When does {resolved_team} play next?'\n"
+                    f"    • 'Show me {resolved_team} match results.'\n"
+                    f"    • 'Book tickets for {resolved_team} next match.'"], route
+        return [team_list_prompt(), "What is your favourite team?"], route
+
+    # Handle exit commands and small talk without the classifier
+    user_input_cleaned = preprocess_input(user_input)
+    route = intent_router.match_fast_path(user_input, user_input_cleaned)
+    if route is not None:
+        if route.stage != STAGE_EXIT:
+            return [route.reply], route
+        if not state:
+            return ["Goodbye! Have a great day!"], route
+
+    # Process the user input (an exit command cancels the booking in progress)
+    if state:
+        if route is None:
+            intent_router.count(STAGE_DIALOGUE)
+            route = Route(STAGE_DIALOGUE, "book_ticket", 1.0, None)
+        return [await handle_turn_async(user_input, state, user_name)], route
+
+    # Name statements are matched by rule, anything else is classified
+    route = intent_router.match_name(user_input_cleaned) or await intent_router.classify(user_input_cleaned)
+    intent = route.intent
+    # Check for "our" in the input and replace with the user's favorite team
+    if route.stage == STAGE_NAME and intent == "ambiguous_query":
+        profile = get_profile_store().get(user_name) if user_name else None
+        if profile is not None:
+            favourite_team = profile.get("team")
+            if favourite_team:
+                user_input = OUR_PATTERN.sub(lambda m: favourite_team.lower(), user_input)
+                user_input_cleaned = OUR_PATTERN.sub(lambda m: favourite_team.lower(), user_input_cleaned)
+
+                # Determine intent explicitly
+                if "next" in user_input_cleaned or "upcoming" in user_input_cleaned:
+                    intent = "next_fixture"
+                elif "last" in user_input_cleaned or "previous" in user_input_cleaned:
+                    intent = "last_fixture"
+        else:
+            replies.append("I don't know who 'our' refers to.")
+            intent = "user_info"
 
-    user_name = None
-    state = {}
+    # Determine query type based on user input
+    query_type = "both"
+    if "when did" in user_input_cleaned:
+        query_type = "past"
+    elif "when will" in user_input_cleaned:
+        query_type = "future"
+
+    if intent == "introduce_name":
+        name_match = re.search(r"my name is (\w+)|call me (\w+)|i am (\w+)|i go by (\w+)", user_input_cleaned,
+                               re.IGNORECASE)
+        if not name_match:
+            replies.append(HELP_MESSAGE)
+        else:
+            user_name = session.user_name = (name_match.group(1) or name_match.group(2) or
+                                             name_match.group(3) or name_match.group(4))
+            if user_name in get_profile_store():
+                replies.append(f"Welcome back, {user_name}!")
+            else:
+                replies.append(f"Nice to meet you, {user_name}!")
+                replies.append("What is your favourite team?")
+                session.awaiting_favourite_team = True
+
+    # Handle user_info intent
+    elif intent == "user_info":
+        if not user_name:
+            replies.append("I don't know your name yet. Please tell me by saying 'My name is [Your Name]'.")
+        else:
+            favourite_team = (get_profile_store().get(user_name) or {}).get("team") or "unknown"
+            replies.append(f"Your name is {user_name}, and your favourite team is {favourite_team}.")
 
-    while True:
-        user_input = input("You: ")
-        if user_input.lower() in ['exit', 'quit']:
-            print("ChatBot: Goodbye!")
-            break
+    elif intent == "book_ticket":
+        replies.append(await handle_turn_async(user_input, state, user_name, intent=intent))
 
-        # Handle small talk
-        response = small_talk(user_input)
-        if response != "I didn't quite catch that. Can you rephrase or let me know how I can assist?":
-            print(f"ChatBot: {response}")
-            continue
-
-        # Process the user input
-        if state:
-            response = handle_turn(user_input, state)
-            print(f"ChatBot: {response}")
-            continue
-
-        # Predict intent for new interactions
-        user_input_cleaned = preprocess_input(user_input)
-        if "what is my name" in user_input_cleaned:
-            intent = "user_info"
-        elif "my name is" in user_input_cleaned:
-            intent = "introduce_name"
-        # Check for "our" in the input and replace with the user's favorite team
-        elif "our" in user_input_cleaned:
-            if user_name and user_name in user_database:
-                favourite_team = user_database[user_name].get("team", None)
-                if favourite_team:
-                    user_input = user_input.replace("our", favourite_team.lower())
-                    user_input_cleaned = user_input_cleaned.replace("our", favourite_team.lower())
-
-                    # Determine intent explicitly
-                    if "next" in user_input_cleaned or "upcoming" in user_input_cleaned:
-                        intent = "next_fixture"
-                    elif "last" in user_input_cleaned or "previous" in user_input_cleaned:
-                        intent = "last_fixture"
-                    else:
-                        # Default to ambiguous query for general "our" use cases
-                        intent = "ambiguous_query"
+    elif intent == "next_fixture":
+        # Extract the team name from user input
+        team1, _, _ = extract_match_info(user_input_cleaned)
+
+        if not team1:
+            replies.append("I couldn't identify a team. Please specify a valid team name like 'Arsenal' or 'Chelsea'.")
+            return replies, route._replace(intent=intent)
+
+        # Fetch the next fixture for the specified team
+        team_id = await get_team_id_async(team1)
+        if team_id:
+            next_fixture = await get_next_fixture_by_id_async(team_id)
+            if next_fixture:
+                replies.append(f"{next_fixture['home']}'s next fixture is against {next_fixture['away']} in the {next_fixture['league']}. It's being played at {next_fixture['venue']} on {next_fixture['date']} at {next_fixture['time']}.")
+                if next_fixture["stale"]:
+                    replies.append(STALE_NOTE)
+                replies.append(f"By the way, I can also help you find {next_fixture['home']}’s last match. Type 'When was {next_fixture['home']} last game?'.”")
             else:
-                print("ChatBot: I don't know who 'our' refers to.")
-                intent = "user_info"
+                replies.append(f"Sorry, I couldn't find any upcoming fixtures for {team1.replace('_', ' ')}.")
         else:
-            intent = intent_pipeline.predict([user_input_cleaned])[0]
-        handled = False  # Tracks whether the intent was successfully handled
-
-        # Determine query type based on user input
-        query_type = "both"
-        if "when did" in user_input_cleaned:
-            query_type = "past"
-        elif "when will" in user_input_cleaned:
-            query_type = "future"
-
-        if intent == "introduce_name":
-            name_match = re.search(r"my name is (\w+)|call me (\w+)|i am (\w+)|i go by (\w+)", user_input_cleaned,
-                                   re.IGNORECASE)
-            if name_match:
-                user_name = name_match.group(1) or name_match.group(2) or name_match.group(3) or name_match.group(4)
-                if user_name in user_database:
-                    print(f"ChatBot: Welcome back, {user_name}!")
-                else:
-                    print(f"ChatBot: Nice to meet you, {user_name}!")
-                    while True:
-                        print("ChatBot: What is your favourite team?")
-                        favourite_team = input("You: ").strip()
-                        if is_valid_team(favourite_team):
-                            resolved_team = map_alias_to_team_name(favourite_team)
-                            user_database[user_name] = {"team": resolved_team}
-                            print(f"ChatBot: Got it. You are now a fan of {resolved_team}. You can now ask:\n"
-                                  f"    • 'When does {resolved_team} play next?'\n"
-                                  f"    • 'Show me {resolved_team} match results.'\n"
-                                  f"    • 'Book tickets for {resolved_team} next match.'")
-                            break
-                        else:
-                            print(
-                                "ChatBot: Please specify a valid Premier League team from the following: " + ", ".join(
-                                    team_aliases.keys()))
-                handled = True
-
-        # Handle user_info intent
-        if intent == "user_info" and not handled:
-            if not user_name:
-                print("ChatBot: I don't know your name yet. Please tell me by saying 'My name is [Your Name]'.")
+            replies.append(f"Sorry, I couldn't find the team ID for {team1.replace('_', ' ')}. Please check the team name.")
+
+    elif intent == "last_fixture":
+        # Extract the team name from user input
+        team1, _, _ = extract_match_info(user_input_cleaned)
+
+        if not team1:
+            replies.append("I couldn't identify a team. Please specify a valid team name like 'Arsenal' or 'Chelsea'.")
+            return replies, route._replace(intent=intent)
+        if not is_valid_team(team1):
+            replies.append(team_list_prompt())
+
+        # Fetch the last fixture for the specified team
+        team_id = await get_team_id_async(team1)
+        if team_id:
+            last_fixture = await get_last_fixture_by_id_async(team_id)
+            if last_fixture:
+                replies.append(f"{last_fixture['home']} last played {last_fixture['away']} on {last_fixture['date']} at {last_fixture['time']} and the score was {last_fixture['intHomeScore']} - {last_fixture['intAwayScore']}.")
+                if last_fixture["stale"]:
+                    replies.append(STALE_NOTE)
+                replies.append(f"By the way, I can also help you find {last_fixture['home']}’s upcoming game. Type 'When is {last_fixture['home']} next game?'.”")
+            else:
+                replies.append(f"Sorry, I couldn't find any upcoming fixtures for {team1.replace('_', ' ')}.")
+        else:
+            replies.append(f"Sorry, I couldn't find the team ID for {team1.replace('_', ' ')}. Please check the team name.")
+
+    # Handle match-related queries
+    elif intent in ["current_season", "past_season"]:
+        team1, team2, season = extract_match_info(user_input_cleaned)
+        if not (team1 and team2):
+            replies.append(HELP_MESSAGE)
+        elif not is_valid_team(team1):
+            replies.append(f"I didn’t catch the first team '{team1.replace('_', ' ')}'\n" + team_list_prompt())
+        elif not is_valid_team(team2):
+            replies.append(f"I didn’t catch the second team '{team2.replace('_', ' ')}'\n" + team_list_prompt())
+        else:
+            team1 = map_alias_to_team_name(team1).replace(" ", "_")
+            team2 = map_alias_to_team_name(team2).replace(" ", "_")
+            event_name = f"{team1}_vs_{team2}"
+            events = await search_event_async(event_name, season, query_type)
+
+            if events:
+                lines = [f"Here are the results for {team1.replace('_', ' ')} vs {team2.replace('_', ' ')}:"]
+                for event in events:
+                    lines.append(f"- Date: {event.get('dateEvent', 'Unknown')}")
+                    lines.append(f"  {event.get('strHomeTeam', 'Unknown')} vs {event.get('strAwayTeam', 'Unknown')}")
+                    lines.append(f"  Score: {event.get('intHomeScore', 'N/A')} - {event.get('intAwayScore', 'N/A')}")
+                    lines.append(f"  Venue: {event.get('strVenue', 'Unknown')}")
+                    lines.append(f"  League: {event.get('strLeague', 'Unknown')}")
+                replies.append("\n".join(lines))
+                if events.stale:
+                    replies.append(STALE_NOTE)
             else:
-                favourite_team = user_database.get(user_name, {}).get("team", "unknown")
-                print(f"ChatBot: Your name is {user_name}, and your favourite team is {favourite_team}.")
-            handled = True
+                replies.append(f"No matches found for {team1.replace('_', ' ')} vs {team2.replace('_', ' ')} in {season if season else 'current season'}.")
 
+    elif intent == "ambiguous_query":
+        replies.append("Do you want recent results, upcoming fixtures, or ticket information? Please specify so I can assist you better.")
 
-        if intent == "book_ticket":
-            response = handle_turn(user_input, state)
-            print(f"ChatBot: {response}")
-            handled = True
-            continue
+    elif intent == "out_of_scope":
+        replies.append("I can’t provide player stats or unrelated information. Try asking about match results, fixtures, or ticket bookings. How can I assist you?")
 
+    # Fallback for unhandled intents
+    else:
+        replies.append(HELP_MESSAGE)
 
+    return replies, route._replace(intent=intent)
 
-        if intent == "next_fixture" and not handled:
-            # Extract the team name from user input
-            team1, _, _ = extract_match_info(user_input_cleaned)
+# Chatbot function to handle user interactions in the terminal
+def chatbot():
+    print(f"Welcome to the Premier League Interactive NLP-based AI! I can help you with the following:")
+    print(f"•	Find match results for your favourite teams. Try 'Wolves vs Crystal Palace in 2021'")
+    print(f"•	Check upcoming fixtures. Try 'Chelsea vs Arsenal'")
+    print(f"•	Book tickets for matches. Try 'I want to book tickets for Brighton vs Aston Villa'")
+    print(f"You can start by introducing yourself or asking about a match. How can I assist you today?")
 
-            if not team1:
-                return "ChatBot: I couldn't identify a team. Please specify a valid team name like 'Arsenal' or 'Chelsea'."
+    session = new_session()
+    start_team_id_prefetch()
+    start_fixtures_sync()
+    start_team_alias_watch()
 
-            # Fetch the next fixture for the specified team
-            team_id = get_team_id(team1)
-            if team_id:
-                next_fixture = get_next_fixture_by_id(team_id)
-                if next_fixture:
-                    print(f"ChatBot: {next_fixture['home']}'s next fixture is against {next_fixture['away']} in the {next_fixture['league']}. It's being played at {next_fixture['venue']} on {next_fixture['date']} at {next_fixture['time']}.")
-                    print(f"ChatBot: By the way, I can also help you find {next_fixture['home']}’s last match. Type 'When was {next_fixture['home']} last game?'.”")
+    while True:
+        user_input = input("You: ")
+        if user_input.lower() in ['exit', 'quit']:
+            print("ChatBot: Goodbye!")
+            break
 
-                else:
-                    print(f"ChatBot: Sorry, I couldn't find any upcoming fixtures for {team1.replace('_', ' ')}.")
-            else:
-                print(
-                    f"ChatBot: Sorry, I couldn't find the team ID for {team1.replace('_', ' ')}. Please check the team name.")
-            handled = True
-
-        if intent == "last_fixture" and not handled:
-            # Extract the team name from user input
-            team1, _, _ = extract_match_info(user_input_cleaned)
-
-            if not is_valid_team(team1):
-                print("ChatBot: Please specify a valid Premier League team from the following: " + ", ".join(team_aliases.keys()))
-
-
-            if not team1:
-                return "ChatBot: I couldn't identify a team. Please specify a valid team name like 'Arsenal' or 'Chelsea'."
-
-            # Fetch the last fixture for the specified team
-            team_id = get_team_id(team1)
-            if team_id:
-                last_fixture = get_last_fixture_by_id(team_id)
-                if last_fixture:
-                    print(f"ChatBot: {last_fixture['home']} last played {last_fixture['away']} on {last_fixture['date']} at {last_fixture['time']} and the score was {last_fixture['intHomeScore']} - {last_fixture['intAwayScore']}.")
-                    print(f"ChatBot: By the way, I can also help you find {last_fixture['home']}’s upcoming game. Type 'When is {last_fixture['home']} next game?'.”")
-                else:
-                    print(f"ChatBot: Sorry, I couldn't find any upcoming fixtures for {team1.replace('_', ' ')}.")
-            else:
-                print(
-                    f"ChatBot: Sorry, I couldn't find the team ID for {team1.replace('_', ' ')}. Please check the team name.")
-            handled = True
-
-        # Handle match-related queries
-        if intent in ["current_season", "past_season"] and not handled:
-            team1, team2, season = extract_match_info(user_input_cleaned)
-            if team1 and team2:
-                if not is_valid_team(team1):
-                    print(
-                        f"ChatBot: I didn’t catch the first team '{team1.replace('_', ' ')}'\nPlease specify a valid Premier League team from the following: " + ", ".join(
-                            team_aliases.keys()))
-                elif not is_valid_team(team2):
-                    print(
-                        f"ChatBot: I didn’t catch the second team '{team2.replace('_', ' ')}'\nPlease specify a valid Premier League team from the following: " + ", ".join(
-                            team_aliases.keys()))
-                else:
-                    print(f"intent = {intent}")
-                    team1 = map_alias_to_team_name(team1).replace(" ", "_")
-                    team2 = map_alias_to_team_name(team2).replace(" ", "_")
-                    event_name = f"{team1}_vs_{team2}"
-                    events = search_event(event_name, season, query_type)
-
-                    if events:
-                        print(
-                            f"\nChatBot: Here are the results for {team1.replace('_', ' ')} vs {team2.replace('_', ' ')}:")
-                        for event in events:
-                            print(f"- Date: {event.get('dateEvent', 'Unknown')}")
-                            print(f"  {event.get('strHomeTeam', 'Unknown')} vs {event.get('strAwayTeam', 'Unknown')}")
-                            print(f"  Score: {event.get('intHomeScore', 'N/A')} - {event.get('intAwayScore', 'N/A')}")
-                            print(f"  Venue: {event.get('strVenue', 'Unknown')}")
-                            print(f"  League: {event.get('strLeague', 'Unknown')}\n")
-                    else:
-                        print(
-                            f"ChatBot: No matches found for {team1.replace('_', ' ')} vs {team2.replace('_', ' ')} in {season if season else 'current season'}.")
-            else:
-                print("ChatBot: I can assist with match results, fixtures, and ticket bookings. Try asking:")
-                print("         •	‘Brighton vs Manchester United’")
-                print("         •	‘Book tickets for Chelsea vs Wolves.’")
-                print("         •	‘When does Liverpool play next?’")
-            handled = True
-
-        if intent == "ambiguous_query" and not handled:
-            print(f"ChatBot: Do you want recent results, upcoming fixtures, or ticket information? Please specify so I can assist you better.")
-            handled = True
-
-        if intent == "out_of_scope" and not handled:
-            print(f"ChatBot: I can’t provide player stats or unrelated information. Try asking about match results, fixtures, or ticket bookings. How can I assist you?" )
-            handled = True
-
-        # Fallback for unhandled intents
-        if not handled:
-            print("ChatBot: I can assist with match results, fixtures, and ticket bookings. Try asking:")
-            print("         •	‘Brighton vs Manchester United’")
-            print("         •	‘Book tickets for Chelsea vs Wolves.’")
-            print("         •	‘When does Liverpool play next?’")
+        for message in respond(user_input, session):
+            print(f"ChatBot: {message}")
 
 # Example usage
 if __name__ == "__main__":
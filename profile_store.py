@@ -0,0 +1,191 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# User profiles database, overridable through the environment (set PROFILES_DB_PATH="" to keep profiles
+# in memory only, as the old user_database dict did)
+PROFILES_DB_PATH = os.environ.get(
+    "PROFILES_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "profiles.db"))
+PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", "10000"))
+# Cached profiles are re-read after this many seconds, so changes made by other processes show up
+PROFILE_CACHE_TTL = float(os.environ.get("PROFILE_CACHE_TTL", "30"))
+# Pending writes are flushed in one transaction when this many are queued, or every flush interval
+PROFILE_FLUSH_BATCH = int(os.environ.get("PROFILE_FLUSH_BATCH", "100"))
+PROFILE_FLUSH_INTERVAL = float(os.environ.get("PROFILE_FLUSH_INTERVAL", "1"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    name_key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    favourite_team TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name_key TEXT NOT NULL,
+    team1 TEXT,
+    team2 TEXT,
+    date TEXT,
+    venue TEXT,
+    seating_type TEXT,
+    num_tickets INTEGER,
+    booked_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bookings_user ON bookings (name_key, booked_at);
+"""
+
+BOOKING_FIELDS = ("team1", "team2", "date", "venue", "seating_type", "num_tickets")
+
+# Cached marker for a name that has no profile, so unknown users do not hit the disk every turn either
+_MISSING = object()
+
+
+# Key profiles are filed under: case-insensitive, with runs of whitespace collapsed
+def normalize_name(name):
+    return " ".join(name.casefold().split())
+
+
+# SQLite store of user profiles (favourite team) and booking history, with an in-process LRU cache.
+# Writes update the cache immediately and are queued; the queue is written in one transaction when it
+# reaches flush_batch entries, when flush() is called, or by the background flusher
+class ProfileStore:
+    def __init__(self, path=PROFILES_DB_PATH, cache_size=PROFILE_CACHE_SIZE, cache_ttl=PROFILE_CACHE_TTL,
+                 flush_batch=PROFILE_FLUSH_BATCH, clock=time.monotonic):
+        path = path or ":memory:"
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.flush_batch = flush_batch
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._cache = OrderedDict()  # name_key -> (profile or _MISSING, cached_at)
+        self._pending_profiles = {}  # name_key -> (name, favourite_team, updated_at); latest write wins
+        self._pending_bookings = []
+        self.reads = 0
+        self.flushes = 0
+
+    # Profile for a user as {"name": ..., "team": ...}, or None if they have never introduced themselves
+    def get(self, name):
+        key = normalize_name(name)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and (key in self._pending_profiles or self.clock() - entry[1] <= self.cache_ttl):
+                self._cache.move_to_end(key)
+                profile = entry[0]
+            else:
+                self.reads += 1
+                row = self._conn.execute(
+                    "SELECT name, favourite_team FROM profiles WHERE name_key = ?", (key,)).fetchone()
+                profile = {"name": row["name"], "team": row["favourite_team"]} if row else _MISSING
+                self._remember(key, profile)
+        return None if profile is _MISSING else dict(profile)
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def _remember(self, key, profile):
+        self._cache[key] = (profile, self.clock())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # Create or update a user's profile with their favourite team
+    def set_favourite_team(self, name, team):
+        key = normalize_name(name)
+        with self._lock:
+            self._remember(key, {"name": name, "team": team})
+            self._pending_profiles[key] = (name, team, time.time())
+            self._flush_if_full()
+
+    # Add profiles that do not exist yet, e.g. {"wesley": {"team": "Chelsea"}}
+    def seed(self, profiles):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO profiles (name_key, name, favourite_team, updated_at) VALUES (?, ?, ?, ?)",
+                [(normalize_name(name), name, profile.get("team"), time.time()) for name, profile in profiles.items()],
+            )
+            for name in profiles:
+                self._cache.pop(normalize_name(name), None)
+
+    # Queue a confirmed booking (a dict with BOOKING_FIELDS) for a user's history
+    def add_booking(self, name, booking):
+        with self._lock:
+            self._pending_bookings.append(
+                (normalize_name(name), *(booking.get(field) for field in BOOKING_FIELDS), time.time()))
+            self._flush_if_full()
+
+    # A user's most recent bookings, newest first
+    def bookings(self, name, limit=20):
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT {", ".join(BOOKING_FIELDS)}, booked_at FROM bookings
+                    WHERE name_key = ? ORDER BY booked_at DESC, id DESC LIMIT ?""",
+                (normalize_name(name), limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _flush_if_full(self):
+        if len(self._pending_profiles) + len(self._pending_bookings) >= self.flush_batch:
+            self.flush()
+
+    # Write all queued profile updates and bookings in one transaction; returns the number of rows written
+    def flush(self):
+        with self._lock:
+            profiles, self._pending_profiles = self._pending_profiles, {}
+            bookings, self._pending_bookings = self._pending_bookings, []
+            if not profiles and not bookings:
+                return 0
+            try:
+                self._write(profiles, bookings)
+            except sqlite3.Error:
+                # Put the writes back in the queue (newer updates win) so the next flush retries them
+                profiles.update(self._pending_profiles)
+                self._pending_profiles = profiles
+                self._pending_bookings = bookings + self._pending_bookings
+                raise
+            self.flushes += 1
+            return len(profiles) + len(bookings)
+
+    def _write(self, profiles, bookings):
+        with self._conn:
+            self._conn.executemany(
+                """INSERT INTO profiles (name_key, name, favourite_team, updated_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (name_key) DO UPDATE SET
+                       name = excluded.name, favourite_team = excluded.favourite_team,
+                       updated_at = excluded.updated_at""",
+                [(key, *values) for key, values in profiles.items()],
+            )
+            self._conn.executemany(
+                f"""INSERT INTO bookings (name_key, {", ".join(BOOKING_FIELDS)}, booked_at)
+                    VALUES (?, {", ".join("?" * len(BOOKING_FIELDS))}, ?)""",
+                bookings,
+            )
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+# Flush the store every `interval` seconds on a daemon thread; returns an Event that stops it
+def start_background_flush(store, interval=PROFILE_FLUSH_INTERVAL):
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                store.flush()
+            except sqlite3.Error as e:  # The writes stay queued and are retried on the next tick
+                print(f"ChatBot: Profile flush failed: {e}", file=sys.stderr)
+
+    threading.Thread(target=run, name="profile-flush", daemon=True).start()
+    return stop
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Pass as ttl to keep an entry until it is evicted by LRU
+NEVER_EXPIRE = None
+
+
+# An upstream call in progress; concurrent callers for the same key wait on it instead of calling again
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+# Bounded LRU cache with a TTL per entry, request coalescing and hit/miss counters
+class ResponseCache:
+    def __init__(self, max_entries=2048, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (value, expires_at or None)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # Return the cached value for key (counted as a hit), or None if it is missing or expired
+    def get(self, key):
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+            return value
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    # Store a value; ttl is seconds, NEVER_EXPIRE, or 0 to skip caching
+    def set(self, key, value, ttl=NEVER_EXPIRE):
+        if ttl == 0:
+            return
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key, value, ttl):
+        expires_at = None if ttl is NEVER_EXPIRE else self.clock() + ttl
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # Return the cached value or call loader() once, sharing its result with concurrent callers.
+    # None results are treated as failures and are not cached
+    def get_or_load(self, key, loader, ttl=NEVER_EXPIRE):
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                inflight = self._inflight[key] = _InFlight()
+                leader = True
+
+        if not leader:
+            inflight.done.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.value
+
+        try:
+            inflight.value = loader()
+        except BaseException as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                if inflight.value is not None and ttl != 0:
+                    self._store(key, inflight.value, ttl)
+                del self._inflight[key]
+            inflight.done.set()
+        return inflight.value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Counters for monitoring
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
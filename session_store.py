@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SESSION_IDLE_TIMEOUT", "1800"))
+SESSION_MAX_SESSIONS = int(os.environ.get("SESSION_MAX_SESSIONS", "100000"))
+
+
+# Interface for per-conversation state storage used by the chat server
+class SessionStore:
+    # Return the session for session_id, or None if it does not exist (or has expired)
+    def get(self, session_id):
+        raise NotImplementedError
+
+    # Save a session after a turn
+    def put(self, session_id, session):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    # Drop sessions idle for longer than the timeout; returns the evicted session IDs
+    def evict_idle(self):
+        raise NotImplementedError
+
+
+# Session store kept in process memory, ordered by last use so idle sessions are evicted in O(1) each
+class InMemorySessionStore(SessionStore):
+    def __init__(self, idle_timeout=SESSION_IDLE_TIMEOUT, max_sessions=SESSION_MAX_SESSIONS, clock=time.monotonic):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self._sessions = OrderedDict()  # session_id -> (session, last_used)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            session, last_used = entry
+            now = self.clock()
+            if now - last_used > self.idle_timeout:
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (session, now)
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def put(self, session_id, session):
+        evicted = []
+        with self._lock:
+            self._sessions[session_id] = (session, self.clock())
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                evicted.append(self._sessions.popitem(last=False)[0])
+        return evicted
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self):
+        evicted = []
+        cutoff = self.clock() - self.idle_timeout
+        with self._lock:
+            while self._sessions:
+                session_id, (_, last_used) = next(iter(self._sessions.items()))
+                if last_used > cutoff:
+                    break
+                del self._sessions[session_id]
+                evicted.append(session_id)
+        return evicted
+
+    def __len__(self):
+        return len(self._sessions)
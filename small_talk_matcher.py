@@ -0,0 +1,85 @@
+import enum
+import re
+
+
+class SmallTalk(enum.Enum):
+    NONE = "none"
+    GREETING = "greeting"
+    FAREWELL = "farewell"
+    HOW_ARE_YOU = "how_are_you"
+    THANKS = "thanks"
+    WEATHER = "weather"
+
+
+# Response table: (category, phrases, response). When a message matches several categories, the one
+# listed first wins. Phrases match whole words, case-insensitively, with any run of whitespace between words
+SMALL_TALK_TABLE = [
+    (SmallTalk.GREETING, ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"],
+     "Hello! How can I assist you today?"),
+    (SmallTalk.FAREWELL, ["bye", "goodbye", "see you", "take care"],
+     "Goodbye! Have a great day!"),
+    (SmallTalk.HOW_ARE_YOU, ["how are you", "how are you doing"],
+     "I'm just a chatbot, but I'm here to help! How can I assist you?"),
+    (SmallTalk.THANKS, ["thank you", "thanks", "appreciate it"],
+     "You're welcome! Let me know if there's anything else I can help with."),
+    (SmallTalk.WEATHER, ["how's the weather", "what's the weather like"],
+     "I can't check the weather right now, but it's always a good day to talk about football!"),
+]
+
+_END = ""
+
+
+# Regex for a set of phrases, factored into a character trie so matching at each position costs the
+# length of the longest common prefix rather than the number of phrases
+def trie_pattern(phrases):
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[_END] = {}
+
+    def emit(node):
+        branches = []
+        for char, child in node.items():
+            if char != _END:
+                branches.append((r"\s+" if char == " " else re.escape(char)) + emit(child))
+        if not branches:
+            return ""
+        optional = _END in node
+        body = branches[0] if len(branches) == 1 and not optional else "(?:" + "|".join(branches) + ")"
+        return body + "?" if optional else body
+
+    return emit(trie)
+
+
+# Single compiled matcher over every small talk phrase; match() returns a SmallTalk category in one pass
+class SmallTalkMatcher:
+    def __init__(self, table=SMALL_TALK_TABLE):
+        self.responses = {}
+        self._categories = {}  # normalized phrase -> (priority, category)
+        for priority, (category, phrases, response) in enumerate(table):
+            self.responses[category] = response
+            for phrase in phrases:
+                key = self.normalize(phrase)
+                if key not in self._categories:
+                    self._categories[key] = (priority, category)
+        self._pattern = re.compile(r"(?<!\w)" + trie_pattern(self._categories) + r"(?!\w)")
+
+    @staticmethod
+    def normalize(text):
+        return " ".join(text.lower().replace("’", "'").split())
+
+    def match(self, user_input):
+        best = None
+        for found in self._pattern.finditer(user_input.lower().replace("’", "'")):
+            priority, category = self._categories[" ".join(found.group(0).split())]
+            if best is None or priority < best[0]:
+                best = (priority, category)
+                if priority == 0:
+                    break
+        return best[1] if best else SmallTalk.NONE
+
+    # Canned response for a category, or None for SmallTalk.NONE
+    def response(self, category):
+        return self.responses.get(category)
@@ -0,0 +1,397 @@
+import contextlib
+import contextvars
+import datetime
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+
+import tracing
+from date_parser import SEASON_START_MONTH
+from response_cache import NEVER_EXPIRE, ResponseCache
+
+# TheSportsDB settings, overridable through the environment
+SPORTSDB_API_KEY = os.environ.get("SPORTSDB_API_KEY", "771766")
+SPORTSDB_BASE_URL = os.environ.get("SPORTSDB_BASE_URL", "https://www.thesportsdb.com/api/v1/json")
+SPORTSDB_CONNECT_TIMEOUT = float(os.environ.get("SPORTSDB_CONNECT_TIMEOUT", "3.05"))
+SPORTSDB_READ_TIMEOUT = float(os.environ.get("SPORTSDB_READ_TIMEOUT", "10"))
+SPORTSDB_MAX_RETRIES = int(os.environ.get("SPORTSDB_MAX_RETRIES", "3"))
+SPORTSDB_BACKOFF_FACTOR = float(os.environ.get("SPORTSDB_BACKOFF_FACTOR", "0.5"))
+SPORTSDB_POOL_SIZE = int(os.environ.get("SPORTSDB_POOL_SIZE", "20"))
+
+SPORTSDB_CACHE_SIZE = int(os.environ.get("SPORTSDB_CACHE_SIZE", "2048"))
+SPORTSDB_FIXTURE_TTL = float(os.environ.get("SPORTSDB_FIXTURE_TTL", "300"))
+# Last good responses kept to answer with while TheSportsDB is failing (0 = fail instead)
+SPORTSDB_STALE_SIZE = int(os.environ.get("SPORTSDB_STALE_SIZE", "4096"))
+
+# Client-side rate limit: requests per second on average (0 = unlimited) and the burst allowed on top. The
+# defaults match the free key's 30 requests per minute. Requests that cannot get a slot within
+# SPORTSDB_RATE_MAX_WAIT seconds fail, and are answered from the last good response if there is one
+SPORTSDB_RATE_LIMIT = float(os.environ.get("SPORTSDB_RATE_LIMIT", "0.5"))
+SPORTSDB_RATE_BURST = int(os.environ.get("SPORTSDB_RATE_BURST", "30"))
+SPORTSDB_RATE_MAX_WAIT = float(os.environ.get("SPORTSDB_RATE_MAX_WAIT", "2"))
+# Tokens only booking requests may take, so lookups cannot use up a burst a booking needs
+SPORTSDB_RATE_RESERVE = int(os.environ.get("SPORTSDB_RATE_RESERVE", "5"))
+
+# Circuit breaker: consecutive failures that stop requests, and seconds before one is let through again
+SPORTSDB_BREAKER_FAILURES = int(os.environ.get("SPORTSDB_BREAKER_FAILURES", "5"))
+SPORTSDB_BREAKER_RESET = float(os.environ.get("SPORTSDB_BREAKER_RESET", "30"))
+
+# Upstream statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Request priorities, most urgent first: booking flows, then questions asked in conversation, then
+# background work (team ID prefetch, fixtures sync)
+PRIORITY_BOOKING = 0
+PRIORITY_LOOKUP = 1
+PRIORITY_BACKGROUND = 2
+
+_priority = contextvars.ContextVar("sportsdb_priority", default=PRIORITY_LOOKUP)
+
+
+# Priority of requests made in the current context
+def current_priority():
+    return _priority.get()
+
+
+# Make the requests inside the block with the given priority
+@contextlib.contextmanager
+def request_priority(priority):
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# Whether a season such as '2012-2013' has finished, so its results can no longer change: the next one has
+# started (date_parser.SEASON_START_MONTH)
+def is_completed_season(season, today=None):
+    today = today or datetime.date.today()
+    try:
+        end_year = int(str(season).split("-")[-1][:4])
+    except ValueError:
+        return False
+    return today >= datetime.date(end_year, SEASON_START_MONTH, 1)
+
+
+# Cache tiers: team IDs never change, completed seasons never change, everything else is short-lived
+def cache_ttl(endpoint, params):
+    if endpoint == "searchteams.php":
+        return NEVER_EXPIRE
+    if endpoint == "searchevents.php" and params and params.get("s") and is_completed_season(params["s"]):
+        return NEVER_EXPIRE
+    return SPORTSDB_FIXTURE_TTL
+
+
+# Number of retries urllib3 made before this response (0 if unknown)
+def retry_count(response):
+    retries = getattr(response.raw, "retries", None)
+    return len(retries.history) if retries is not None else 0
+
+
+# Token bucket shared by every request to TheSportsDB: `rate` requests per second on average, bursts of up
+# to `burst`. Waiting requests are served in priority order, and requests below PRIORITY_BOOKING leave
+# `reserve` tokens in the bucket, so a booking is not held up by a burst of lookups
+class RateLimiter:
+    def __init__(self, rate, burst, reserve=SPORTSDB_RATE_RESERVE):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.reserve = max(min(reserve, self.burst - 1), 0)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiters = []  # heap of (priority, arrival)
+        self._arrivals = itertools.count()
+        self._cond = threading.Condition()
+        self.granted = 0
+        self.delayed = 0
+        self.rejected = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    # Take a token, waiting up to timeout seconds behind requests of the same or higher priority; returns
+    # False if none became available in time
+    def acquire(self, priority=PRIORITY_LOOKUP, timeout=SPORTSDB_RATE_MAX_WAIT):
+        needed = 1 if priority <= PRIORITY_BOOKING else 1 + self.reserve
+        deadline = time.monotonic() + timeout
+        waiter = (priority, next(self._arrivals))
+        with self._cond:
+            heapq.heappush(self._waiters, waiter)
+            delayed = False
+            try:
+                while True:
+                    self._refill()
+                    first = self._waiters[0] == waiter
+                    if first and self._tokens >= needed:
+                        self._tokens -= 1
+                        self.granted += 1
+                        return True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        return False
+                    if not delayed:
+                        delayed = True
+                        self.delayed += 1
+                    # The first waiter sleeps until its tokens have accrued; the others until it leaves
+                    self._cond.wait(min(remaining, (needed - self._tokens) / self.rate) if first else remaining)
+            finally:
+                if self._waiters[0] == waiter:
+                    heapq.heappop(self._waiters)
+                else:
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            self._refill()
+            return {"tokens": round(self._tokens, 2), "waiting": len(self._waiters), "granted": self.granted,
+                    "delayed": self.delayed, "rejected": self.rejected}
+
+
+# Stops calling an upstream that keeps failing. After `failures` consecutive failures the circuit opens and
+# requests fail at once; after `reset_timeout` seconds one trial request is let through (half open), which
+# closes the circuit if it succeeds and opens it again if it fails
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failures=SPORTSDB_BREAKER_FAILURES, reset_timeout=SPORTSDB_BREAKER_RESET,
+                 clock=time.monotonic):
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self._consecutive = 0
+        self._changed_at = 0.0  # When the circuit opened, or the trial request started
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.short_circuited = 0
+
+    # Whether a request may go upstream now
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # Also retries a trial request that never reported back
+            if self.clock() - self._changed_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._changed_at = self.clock()
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._consecutive = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self.state == self.HALF_OPEN or self._consecutive >= self.failures:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._changed_at = self.clock()
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self._consecutive, "opened": self.opened,
+                    "short_circuited": self.short_circuited}
+
+
+# A last good response served while TheSportsDB is failing or throttled; fetched_at is when it was
+# fetched (time.time())
+class StaleResponse(dict):
+    __slots__ = ("fetched_at",)
+
+    def __init__(self, data, fetched_at):
+        super().__init__(data)
+        self.fetched_at = fetched_at
+
+
+# Whether a response came from the last good copy rather than from TheSportsDB just now
+def is_stale(data):
+    return isinstance(data, StaleResponse)
+
+
+# Shared HTTP client for TheSportsDB with a pooled keep-alive session, timeouts and retries, behind a
+# priority rate limiter (rate_limit=0 disables it) and a circuit breaker. Requests that fail are answered
+# with the last good response for the same request, as a StaleResponse, when there is one
+class SportsDataClient:
+    def __init__(self, api_key=SPORTSDB_API_KEY, base_url=SPORTSDB_BASE_URL,
+                 timeout=(SPORTSDB_CONNECT_TIMEOUT, SPORTSDB_READ_TIMEOUT),
+                 max_retries=SPORTSDB_MAX_RETRIES, backoff_factor=SPORTSDB_BACKOFF_FACTOR,
+                 pool_size=SPORTSDB_POOL_SIZE, cache=None, rate_limit=SPORTSDB_RATE_LIMIT,
+                 rate_burst=SPORTSDB_RATE_BURST, breaker=None, stale_size=SPORTSDB_STALE_SIZE):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+        # Retry connection errors and 429/5xx with exponential backoff, honouring Retry-After
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._request_exception = requests.RequestException
+        self._pool_size = pool_size
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.cache = cache if cache is not None else ResponseCache(max_entries=SPORTSDB_CACHE_SIZE)
+        self.limiter = RateLimiter(rate_limit, rate_burst) if rate_limit > 0 else None
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.last_good = ResponseCache(max_entries=stale_size)  # key -> (response, fetched_at)
+        self.stale_served = 0
+        self._stale_lock = threading.Lock()
+
+    # Full URL for an endpoint such as 'searchevents.php'
+    def url(self, endpoint):
+        return f"{self.base_url}/{self.api_key}/{endpoint}"
+
+    # GET an endpoint; returns the response, or None if the request could not be completed
+    def get(self, endpoint, params=None):
+        try:
+            return self.session.get(self.url(endpoint), params=params, timeout=self.timeout)
+        except self._request_exception as e:
+            print(f"ChatBot: Could not reach TheSportsDB ({endpoint}): {e}", file=sys.stderr)
+            return None
+
+    # GET an endpoint and decode the JSON body. Successful responses are cached per cache_ttl() and
+    # concurrent identical requests share a single upstream call. On failure, returns the last good
+    # response as a StaleResponse, or None if there is none. priority defaults to current_priority()
+    def get_json(self, endpoint, params=None, priority=None):
+        key = self.cache_key(endpoint, params)
+        priority = current_priority() if priority is None else priority
+        data = self.cache.get_or_load(key, lambda: self._fetch_json(key, endpoint, params, priority),
+                                      ttl=cache_ttl(endpoint, params))
+        return data if data is not None else self.stale(key)
+
+    # Last good response for a cache key as a StaleResponse, or None
+    def stale(self, key):
+        entry = self.last_good.get(key)
+        if entry is None:
+            return None
+        with self._stale_lock:
+            self.stale_served += 1
+        return StaleResponse(*entry)
+
+    # asyncio version of get_json(): cache hits are answered on the event loop, misses run on the
+    # client's worker pool so the loop keeps serving other sessions while the request is in flight
+    async def get_json_async(self, endpoint, params=None):
+        import asyncio
+
+        with tracing.span("sportsdb", endpoint=endpoint) as span:
+            cached = self.cache.get(self.cache_key(endpoint, params))
+            if cached is not None:
+                span.set(cache="hit")
+                return cached
+            span.set(cache="miss")
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(self.executor(), tracing.bind(self.get_json), endpoint, params,
+                                              current_priority())
+            if is_stale(data):
+                span.set(stale=True)
+            return data
+
+    @staticmethod
+    def cache_key(endpoint, params):
+        return endpoint, tuple(sorted((params or {}).items()))
+
+    def _fetch_json(self, key, endpoint, params, priority):
+        with tracing.span("http", endpoint=endpoint) as span:
+            if not self.breaker.allow():
+                span.set(breaker=CircuitBreaker.OPEN)
+                return None
+            if self.limiter is not None and not self.limiter.acquire(priority):
+                span.set(throttled=True)
+                return None
+            response = self.get(endpoint, params)
+            if response is not None:
+                span.set(status=response.status_code, retries=retry_count(response))
+        if response is None:
+            self.breaker.record_failure()
+            return None
+        if response.status_code != 200:
+            print(f"ChatBot: Failed to fetch {endpoint}, status code: {response.status_code}", file=sys.stderr)
+            # Only throttling and server errors count against the upstream; a bad request is ours
+            if response.status_code in RETRY_STATUSES:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return None
+        try:
+            data = response.json()
+        except ValueError:
+            print(f"ChatBot: TheSportsDB returned an unreadable response for {endpoint}", file=sys.stderr)
+            self.breaker.record_failure()
+            return None
+        self.breaker.record_success()
+        if data is not None:
+            self.last_good.set(key, (data, time.time()))
+        return data
+
+    # Worker pool for upstream requests, sized to the connection pool and created on first use
+    def executor(self):
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._pool_size,
+                                                        thread_name_prefix="sportsdb")
+        return self._executor
+
+    # Run get_json() on the client's worker pool so several lookups can be in flight at once
+    def submit(self, endpoint, params=None):
+        return self.executor().submit(self.get_json, endpoint, params, current_priority())
+
+    # Counters for monitoring: response cache, rate limiter, circuit breaker and stale responses served
+    def stats(self):
+        return {"cache": self.cache.stats(), "limiter": self.limiter.stats() if self.limiter else None,
+                "breaker": self.breaker.stats(), "stale_served": self.stale_served,
+                "last_good": len(self.last_good)}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+# Return the process-wide client, creating it on first use
+def get_sports_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SportsDataClient()
+    return _client
+
+
+# Replace the process-wide client, e.g. to point at a different base URL
+def set_sports_client(client):
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,254 @@
+import heapq
+import re
+import threading
+from collections import namedtuple
+
+# Canonical record for a team: its official name and every alias it is known by
+TeamRecord = namedtuple("TeamRecord", ["name", "aliases"])
+
+
+# Marks the end of an alias in the token trie (tokens are never None)
+_TERMINAL = None
+
+_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+# Fuzzy matches must score at least this (1 - edits / length of the longer key), e.g. one typo in four
+# letters or two in eight, and are at most FUZZY_MAX_EDITS edits away. Queries shorter than
+# FUZZY_MIN_LENGTH are never fuzzy-matched: too many everyday words are one edit from a short alias
+# ("place" -> "palace", "blue" -> "blues", "saint" -> "saints")
+FUZZY_MIN_SCORE = 0.75
+FUZZY_MAX_EDITS = 2
+FUZZY_MIN_LENGTH = 6
+# Keys sharing the most trigrams with a query that are checked by edit distance
+FUZZY_CANDIDATES = 8
+# Fuzzy lookups remembered per index (the cache is cleared when it fills up)
+FUZZY_CACHE_SIZE = 4096
+
+
+# Normalise a team name or alias for lookup: case-insensitive, underscores as spaces, single spacing
+def normalize_team_key(name):
+    return " ".join(name.replace("_", " ").lower().split())
+
+
+# Split a name or utterance into lowercase word tokens, dropping punctuation such as '&'
+def tokenize_team_key(name):
+    return _WORD_PATTERN.findall(name.lower())
+
+
+# Character trigrams of a normalized key, padded so the start and end of the key count twice and once
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Edit distance where swapping two adjacent letters counts as one edit (optimal string alignment).
+# Only the band of cells within max_distance of the diagonal is filled in, and max_distance + 1 is
+# returned as soon as the distance is known to exceed max_distance
+def edit_distance(a, b, max_distance):
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    over = max_distance + 1
+    before_previous, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        low, high = max(1, i - max_distance), min(len(b), i + max_distance)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= max_distance else over
+        row_best = current[0]
+        for j in range(low, high + 1):
+            value = previous[j - 1] + (a[i - 1] != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1] and before_previous[j - 2] + 1 < value:
+                value = before_previous[j - 2] + 1
+            current[j] = value
+            if value < row_best:
+                row_best = value
+        if row_best > max_distance:
+            return over
+        before_previous, previous = previous, current
+    return min(previous[-1], over)
+
+
+# Typo-tolerant lookup over normalized alias keys, through a trigram inverted index split by key length.
+# A key within d edits of the query shares all but at most 4d of the query's trigrams (a swap of two
+# letters touches four), so it must appear in the postings of one of the query's 4d + 1 rarest trigrams: only those short lists are read, only for
+# key lengths within d of the query's, and only the keys sharing the most trigrams are compared by edit
+# distance. The cost follows how rare the query's trigrams are rather than the size of the table
+class FuzzyTeamMatcher:
+    def __init__(self, lookup, candidates=FUZZY_CANDIDATES, max_edits=FUZZY_MAX_EDITS):
+        self.candidates = candidates
+        self.max_edits = max_edits
+        self._keys = list(lookup)
+        self._records = [lookup[key] for key in self._keys]
+        self._grams = [trigrams(key) for key in self._keys]
+        self._postings = {}  # (trigram, key length) -> [key number]
+        for i, key in enumerate(self._keys):
+            for gram in self._grams[i]:
+                self._postings.setdefault((gram, len(key)), []).append(i)
+
+    # Best (TeamRecord, score) for a normalized key, or (None, 0.0) if nothing scores min_score
+    def match(self, key, min_score=FUZZY_MIN_SCORE):
+        if len(key) < FUZZY_MIN_LENGTH:
+            return None, 0.0
+        grams = trigrams(key)
+        shared = {}
+        for length in range(max(1, len(key) - self.max_edits), len(key) + self.max_edits + 1):
+            max_distance = self._max_distance(max(len(key), length), min_score)
+            if abs(length - len(key)) > max_distance:
+                continue
+            required = len(grams) - 4 * max_distance
+            postings = sorted((self._postings.get((gram, length), ()) for gram in grams), key=len)
+            if required > 0:
+                postings = postings[:len(grams) - required + 1]
+            for posting in postings:
+                for i in posting:
+                    if i not in shared:
+                        count = len(grams & self._grams[i])
+                        shared[i] = count if count >= required else 0
+        best_record, best_score = None, 0.0
+        for i in heapq.nlargest(self.candidates, (i for i in shared if shared[i]), key=shared.__getitem__):
+            candidate = self._keys[i]
+            longest = max(len(key), len(candidate))
+            max_distance = self._max_distance(longest, min_score)
+            distance = edit_distance(key, candidate, max_distance)
+            score = 1 - distance / longest
+            if distance <= max_distance and score > best_score:
+                best_record, best_score = self._records[i], score
+        return best_record, round(best_score, 3)
+
+    # Edits allowed between keys whose longer one has `longest` characters
+    def _max_distance(self, longest, min_score):
+        return min(self.max_edits, int(longest * (1 - min_score) + 1e-9))
+
+
+# Everything a TeamAliasIndex reads, built together and replaced as one object, so a lookup running
+# during a reload sees either the old table or the new one, never a mix. table is the alias table it was
+# built from, frozen, so a reload with the same table can be skipped
+_IndexSnapshot = namedtuple("_IndexSnapshot", ["table", "records", "lookup", "trie", "fuzzy", "fuzzy_cache"])
+
+
+# Precomputed alias index built once from a team_aliases-style table ({canonical: [aliases]})
+class TeamAliasIndex:
+    def __init__(self, aliases):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self.reload(aliases)
+
+    # Rebuild the index from a new alias table and swap it in with one assignment. Returns False, without
+    # rebuilding, if the table is unchanged since the last reload
+    def reload(self, aliases):
+        table = tuple((name, tuple(alias_list)) for name, alias_list in aliases.items())
+        with self._lock:
+            if self._snapshot is not None and self._snapshot.table == table:
+                return False
+            records = [TeamRecord(name, alias_list) for name, alias_list in table]
+            lookup = {}
+
+            # Canonical names win over aliases; otherwise the first team listing an alias keeps it
+            for record in records:
+                lookup.setdefault(normalize_team_key(record.name), record)
+            for record in records:
+                for alias in record.aliases:
+                    lookup.setdefault(normalize_team_key(alias), record)
+
+            # Token trie over every key so team mentions can be found in a single scan of an utterance
+            trie = {}
+            for key, record in lookup.items():
+                node = trie
+                for token in tokenize_team_key(key):
+                    node = node.setdefault(token, {})
+                node.setdefault(_TERMINAL, record)
+
+            self._snapshot = _IndexSnapshot(table, tuple(records), lookup, trie, FuzzyTeamMatcher(lookup), {})
+            return True
+
+    # Return the TeamRecord for a name or alias, or None if it is unknown. With fuzzy=True a misspelt
+    # name ("Totenham", "Man Utdd") resolves to the closest team when exact lookup fails
+    def resolve(self, name, fuzzy=False):
+        if not name:
+            return None
+        snapshot = self._snapshot
+        record = snapshot.lookup.get(normalize_team_key(name))
+        if record is None and fuzzy:
+            record = self._fuzzy_resolve(snapshot, name, FUZZY_MIN_SCORE)[0]
+        return record
+
+    # Return the canonical team name for a name or alias, or None if it is unknown
+    def canonical_name(self, name, fuzzy=False):
+        record = self.resolve(name, fuzzy)
+        return record.name if record else None
+
+    # Closest team to a possibly misspelt name: (TeamRecord, score from 0 to 1), or (None, 0.0)
+    def fuzzy_resolve(self, name, min_score=FUZZY_MIN_SCORE):
+        return self._fuzzy_resolve(self._snapshot, name, min_score)
+
+    @staticmethod
+    def _fuzzy_resolve(snapshot, name, min_score):
+        key = normalize_team_key(name or "")
+        cache = snapshot.fuzzy_cache
+        result = cache.get((key, min_score))
+        if result is None:
+            result = snapshot.fuzzy.match(key, min_score)
+            if len(cache) >= FUZZY_CACHE_SIZE:
+                cache.clear()
+            cache[(key, min_score)] = result
+        return result
+
+    # Longest team mention starting at tokens[start]; returns (TeamRecord, end) or (None, start).
+    # A trailing possessive 's' is tolerated on the last token ("chelseas" -> Chelsea)
+    def match_tokens(self, tokens, start):
+        return self._match_tokens(self._snapshot.trie, tokens, start)
+
+    @staticmethod
+    def _match_tokens(trie, tokens, start):
+        node = trie
+        best_record, best_end = None, start
+        for i in range(start, len(tokens)):
+            token = tokens[i]
+            child = node.get(token)
+            if child is None:
+                if token.endswith("s"):
+                    possessive = node.get(token[:-1])
+                    if possessive is not None and _TERMINAL in possessive:
+                        return possessive[_TERMINAL], i + 1
+                break
+            node = child
+            if _TERMINAL in node:
+                best_record, best_end = node[_TERMINAL], i + 1
+        return best_record, best_end
+
+    # Every non-overlapping team mention in a token list, longest match first: [(TeamRecord, start, end)]
+    def find_mentions(self, tokens):
+        root = self._snapshot.trie
+        mentions = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token in root or (token.endswith("s") and token[:-1] in root):
+                record, end = self._match_tokens(root, tokens, i)
+                if record is not None:
+                    mentions.append((record, i, end))
+                    i = end
+                    continue
+            i += 1
+        return mentions
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    def __len__(self):
+        return len(self._snapshot.records)
+
+    # Canonical team names in table order
+    def team_names(self):
+        return [record.name for record in self._snapshot.records]
+
+    # Every normalized name and alias key
+    def keys(self):
+        return list(self._snapshot.lookup)
+
+    # Forget remembered fuzzy lookups (for benchmarks timing the matcher itself)
+    def clear_fuzzy_cache(self):
+        self._snapshot.fuzzy_cache.clear()
@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+# Ticket inventory database, overridable through the environment (set TICKETS_DB_PATH="" to keep it in
+# memory only)
+TICKETS_DB_PATH = os.environ.get(
+    "TICKETS_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tickets.db"))
+# Seats per fixture for each seating type, used when a fixture is first booked
+TICKET_CAPACITY = {
+    "VIP": int(os.environ.get("TICKET_CAPACITY_VIP", "200")),
+    "regular": int(os.environ.get("TICKET_CAPACITY_REGULAR", "20000")),
+}
+# Seconds a hold keeps its seats before they go back on sale (e.g. the user abandons the conversation)
+TICKET_HOLD_TTL = float(os.environ.get("TICKET_HOLD_TTL", "600"))
+
+# The CHECK constraint is the last line of defence against overselling: no statement can leave
+# held + sold above capacity
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inventory (
+    fixture_key TEXT NOT NULL,
+    seating_type TEXT NOT NULL,
+    capacity INTEGER NOT NULL,
+    held INTEGER NOT NULL DEFAULT 0,
+    sold INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (fixture_key, seating_type),
+    CHECK (held >= 0 AND sold >= 0 AND held + sold <= capacity)
+);
+CREATE TABLE IF NOT EXISTS holds (
+    hold_id TEXT PRIMARY KEY,
+    fixture_key TEXT NOT NULL,
+    seating_type TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    holder TEXT,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS holds_expiry ON holds (expires_at);
+CREATE TABLE IF NOT EXISTS reservations (
+    booking_id TEXT PRIMARY KEY,
+    fixture_key TEXT NOT NULL,
+    seating_type TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    holder TEXT,
+    confirmed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reservations_fixture ON reservations (fixture_key, seating_type);
+"""
+
+Hold = namedtuple("Hold", ["hold_id", "fixture_key", "seating_type", "quantity", "expires_at"])
+
+
+# Key for a fixture's inventory: match date plus both teams. The teams are sorted, so "Chelsea vs Arsenal"
+# and "Arsenal vs Chelsea" on the same day draw on the same seats
+def fixture_key(team1, team2, date):
+    team1, team2 = sorted((team1, team2))
+    return f"{date}:{team1}:{team2}"
+
+
+# Per-fixture, per-seating-type ticket inventory in SQLite. Seats are reserved in two steps: hold() takes
+# them off sale for hold_ttl seconds, confirm() turns the hold into a reservation. Every change runs in a
+# write transaction (BEGIN IMMEDIATE), so concurrent threads and processes sharing the database file
+# cannot oversell
+class TicketInventory:
+    def __init__(self, path=TICKETS_DB_PATH, capacity=None, hold_ttl=TICKET_HOLD_TTL, clock=time.time):
+        path = path or ":memory:"
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.capacity = dict(TICKET_CAPACITY if capacity is None else capacity)
+        self.hold_ttl = hold_ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    # Run fn(conn) in a write transaction, holding the database write lock from the start
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    # Put the seats of every expired hold back on sale; returns the number of holds released
+    def _release_expired(self, conn):
+        expired = conn.execute(
+            "SELECT hold_id, fixture_key, seating_type, quantity FROM holds WHERE expires_at <= ?",
+            (self.clock(),)).fetchall()
+        for row in expired:
+            self._release_hold(conn, row)
+        return len(expired)
+
+    @staticmethod
+    def _release_hold(conn, row):
+        conn.execute("DELETE FROM holds WHERE hold_id = ?", (row["hold_id"],))
+        conn.execute(
+            "UPDATE inventory SET held = held - ? WHERE fixture_key = ? AND seating_type = ?",
+            (row["quantity"], row["fixture_key"], row["seating_type"]))
+
+    def _ensure_fixture(self, conn, fixture, seating_type):
+        if seating_type not in self.capacity:
+            raise ValueError(f"Unknown seating type {seating_type!r}")
+        conn.execute(
+            "INSERT OR IGNORE INTO inventory (fixture_key, seating_type, capacity) VALUES (?, ?, ?)",
+            (fixture, seating_type, self.capacity[seating_type]))
+
+    # Override the capacity of one fixture's seating type (it cannot drop below the seats already taken)
+    def set_capacity(self, fixture, seating_type, capacity):
+        def run(conn):
+            self._ensure_fixture(conn, fixture, seating_type)
+            conn.execute(
+                "UPDATE inventory SET capacity = ? WHERE fixture_key = ? AND seating_type = ?",
+                (capacity, fixture, seating_type))
+        self._transaction(run)
+
+    # Seats still on sale
+    def available(self, fixture, seating_type):
+        return self.stats(fixture, seating_type)["available"]
+
+    def stats(self, fixture, seating_type):
+        def run(conn):
+            self._release_expired(conn)
+            self._ensure_fixture(conn, fixture, seating_type)
+            return conn.execute(
+                "SELECT capacity, held, sold FROM inventory WHERE fixture_key = ? AND seating_type = ?",
+                (fixture, seating_type)).fetchone()
+        row = self._transaction(run)
+        return {"capacity": row["capacity"], "held": row["held"], "sold": row["sold"],
+                "available": row["capacity"] - row["held"] - row["sold"]}
+
+    # Take quantity seats off sale for hold_ttl seconds; returns a Hold, or None if not enough are left
+    def hold(self, fixture, seating_type, quantity, holder=None):
+        if quantity <= 0:
+            raise ValueError("quantity must be positive")
+
+        def run(conn):
+            self._release_expired(conn)
+            self._ensure_fixture(conn, fixture, seating_type)
+            taken = conn.execute(
+                """UPDATE inventory SET held = held + ?
+                   WHERE fixture_key = ? AND seating_type = ? AND capacity - held - sold >= ?""",
+                (quantity, fixture, seating_type, quantity)).rowcount
+            if not taken:
+                return None
+            hold = Hold(uuid.uuid4().hex, fixture, seating_type, quantity, self.clock() + self.hold_ttl)
+            conn.execute(
+                """INSERT INTO holds (hold_id, fixture_key, seating_type, quantity, holder, expires_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (hold.hold_id, fixture, seating_type, quantity, holder, hold.expires_at))
+            return hold
+        return self._transaction(run)
+
+    # Turn a live hold into a reservation; returns the booking ID, or None if the hold expired or is unknown
+    def confirm(self, hold_id):
+        def run(conn):
+            self._release_expired(conn)
+            row = conn.execute(
+                "SELECT fixture_key, seating_type, quantity, holder FROM holds WHERE hold_id = ?",
+                (hold_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM holds WHERE hold_id = ?", (hold_id,))
+            conn.execute(
+                "UPDATE inventory SET held = held - ?, sold = sold + ? WHERE fixture_key = ? AND seating_type = ?",
+                (row["quantity"], row["quantity"], row["fixture_key"], row["seating_type"]))
+            booking_id = uuid.uuid4().hex
+            conn.execute(
+                """INSERT INTO reservations (booking_id, fixture_key, seating_type, quantity, holder, confirmed_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (booking_id, row["fixture_key"], row["seating_type"], row["quantity"], row["holder"], self.clock()))
+            return booking_id
+        return self._transaction(run)
+
+    # Give a hold's seats back (the user cancelled); returns whether the hold was still live
+    def release(self, hold_id):
+        def run(conn):
+            row = conn.execute(
+                "SELECT hold_id, fixture_key, seating_type, quantity FROM holds WHERE hold_id = ?",
+                (hold_id,)).fetchone()
+            if row is not None:
+                self._release_hold(conn, row)
+            return row is not None
+        return self._transaction(run)
+
+    # Put the seats of abandoned holds back on sale; returns the number of holds released
+    def release_expired(self):
+        return self._transaction(self._release_expired)
+
+    def close(self):
+        self._conn.close()
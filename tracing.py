@@ -0,0 +1,271 @@
+import contextvars
+import functools
+import math
+import os
+import sys
+import threading
+import time
+
+# Per-turn tracing, off by default. Set PREM_BOT_TRACING=1 (or call enable()) to record spans
+TRACING_ENABLED = os.environ.get("PREM_BOT_TRACING", "") not in ("", "0")
+
+# Histogram buckets grow by 5%, from 1 microsecond up, so percentiles are accurate to within ~5%
+_BUCKET_BASE = 1e-6
+_BUCKET_GROWTH = math.log(1.05)
+
+_enabled = False
+_sink = None
+_current = contextvars.ContextVar("prem_bot_trace", default=None)
+
+
+# One stage of a turn: name, offset from the start of the turn and duration (seconds), and attributes
+# such as the endpoint, HTTP status, cache outcome and retries of an upstream call
+class Span:
+    __slots__ = ("name", "start", "duration", "attrs")
+
+    def __init__(self, name, start, duration, attrs):
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.attrs = attrs
+
+    def to_dict(self):
+        return {"name": self.name, "start_ms": round(self.start * 1000, 3),
+                "duration_ms": round(self.duration * 1000, 3), **self.attrs}
+
+
+# Spans recorded during one turn of a conversation
+class Trace:
+    __slots__ = ("started", "spans", "duration")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.duration = None
+
+    def to_dict(self):
+        return {"duration_ms": round(self.duration * 1000, 3), "spans": [s.to_dict() for s in self.spans]}
+
+
+class _SpanTimer:
+    __slots__ = ("trace", "name", "attrs", "start")
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    # Add attributes once they are known, e.g. the HTTP status after the request returns
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.trace.spans.append(Span(self.name, self.start - self.trace.started, end - self.start, self.attrs))
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def set(self, **attrs):
+        pass
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+# Time a stage of the current turn: `with span("classify"): ...`. Returns a shared no-op when tracing is
+# off or no turn is being traced, so instrumented code costs one function call
+def span(name, **attrs):
+    if not _enabled:
+        return _NOOP
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return _SpanTimer(trace, name, attrs)
+
+
+class _TurnTimer:
+    __slots__ = ("trace", "token")
+
+    def __enter__(self):
+        self.trace = Trace()
+        self.token = _current.set(self.trace)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.duration = time.perf_counter() - self.trace.started
+        _current.reset(self.token)
+        sink = _sink
+        if sink is not None:
+            sink.record(self.trace)
+        return False
+
+
+# Trace one turn: `with turn(): ...`. Nested calls (respond_async -> handle_turn_async) join the outer turn
+def turn():
+    if not _enabled or _current.get() is not None:
+        return _NOOP
+    return _TurnTimer()
+
+
+# Wrap fn so it runs in the caller's trace context when it is called on another thread
+def bind(fn):
+    if not _enabled or _current.get() is None:
+        return fn
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+# Destination for finished traces. record() is called once per traced turn; report() returns aggregated
+# statistics, if the sink keeps any
+class TraceSink:
+    def record(self, trace):
+        raise NotImplementedError
+
+    def report(self):
+        return None
+
+
+# Latency histogram with logarithmic buckets: constant memory however many values it sees
+class Histogram:
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        index = int(math.log(value / _BUCKET_BASE) / _BUCKET_GROWTH) if value > _BUCKET_BASE else 0
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    # Upper bound of the bucket holding the q-th quantile (0 < q <= 1)
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(_BUCKET_BASE * math.exp((index + 1) * _BUCKET_GROWTH), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+# Aggregates per-stage latency histograms plus upstream counters (cache outcomes, HTTP statuses, retries)
+class HistogramSink(TraceSink):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+
+    def record(self, trace):
+        with self._lock:
+            self._add("turn", trace.duration)
+            for s in trace.spans:
+                self._add(s.name, s.duration)
+                for key in ("cache", "status"):
+                    if key in s.attrs:
+                        counter = f"{s.name}.{key}.{s.attrs[key]}"
+                        self.counters[counter] = self.counters.get(counter, 0) + 1
+                if s.attrs.get("retries"):
+                    counter = f"{s.name}.retries"
+                    self.counters[counter] = self.counters.get(counter, 0) + s.attrs["retries"]
+
+    def _add(self, name, duration):
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = Histogram()
+        histogram.add(duration)
+
+    def report(self):
+        with self._lock:
+            return {"stages": {name: h.summary() for name, h in sorted(self.stages.items())},
+                    "counters": dict(sorted(self.counters.items()))}
+
+
+# Writes every trace as one JSON line, e.g. to stderr or a log file
+class JsonLinesSink(TraceSink):
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def record(self, trace):
+        import json
+
+        line = json.dumps(trace.to_dict())
+        with self._lock:
+            self.stream.write(line + "\n")
+
+
+# Sends traces to several sinks; reports come from the first sink that has one
+class MultiSink(TraceSink):
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def record(self, trace):
+        for sink in self.sinks:
+            sink.record(trace)
+
+    def report(self):
+        for sink in self.sinks:
+            report = sink.report()
+            if report is not None:
+                return report
+        return None
+
+
+# Turn tracing on, sending finished turns to sink (a HistogramSink by default); returns the sink
+def enable(sink=None):
+    global _enabled, _sink
+    _sink = sink if sink is not None else HistogramSink()
+    _enabled = True
+    return _sink
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def get_sink():
+    return _sink
+
+
+# Aggregated statistics from the current sink, or None when tracing was never enabled
+def report():
+    return _sink.report() if _sink is not None else None
+
+
+if TRACING_ENABLED:
+    enable()
@@ -0,0 +1,263 @@
+import gc
+import itertools
+import os
+import sys
+import time
+import uuid
+import zlib
+
+import prem_bot
+
+# Worker processes forked by the pool (0 = one per CPU core)
+PREFORK_WORKERS = int(os.environ.get("PREFORK_WORKERS", "0"))
+# Turns sent to one worker and not yet answered. Keeps the requests queued on a pipe below the kernel
+# buffer size, so the parent never blocks writing to a worker that is itself blocked writing replies
+PREFORK_MAX_IN_FLIGHT = int(os.environ.get("PREFORK_MAX_IN_FLIGHT", "256"))
+
+
+# Load everything the workers only read (exported intent scorer, team-ID snapshot; the alias index,
+# match extractor and small talk matcher are built at import) and move it out of the garbage collector's
+# reach, so the workers' GC passes do not touch, and thereby copy, the shared pages
+def preload():
+    prem_bot.get_intent_scorer()
+    prem_bot.load_team_id_snapshot()
+    gc.collect()
+    if hasattr(gc, "freeze"):  # Python 3.7+
+        gc.freeze()
+
+
+# Memory of the current process in KiB: rss, plus pss (shared pages split between the processes that map
+# them) and private (pages only this process maps) where Linux reports them
+def memory_usage():
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                    usage[key] = int(value.split()[0])
+    except OSError:
+        import resource
+        return {"rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    return {"rss_kb": usage["Rss"], "pss_kb": usage["Pss"],
+            "private_kb": usage["Private_Clean"] + usage["Private_Dirty"]}
+
+
+# Messages waiting to go down a pipe. Everything queued during one pass of the event loop is sent as one
+# list, so a busy pipe costs one pickle and one write per pass rather than per turn
+class _Outbox:
+    def __init__(self, conn, loop):
+        self.conn = conn
+        self.loop = loop
+        self.messages = []
+
+    def put(self, message):
+        self.messages.append(message)
+        if len(self.messages) == 1:
+            self.loop.call_soon(self.flush)
+
+    def flush(self):
+        messages, self.messages = self.messages, []
+        if messages:
+            self.conn.send(messages)
+
+
+# Body of one forked worker: answer ("turn", request_id, session_id, message) requests from the pipe with
+# (request_id, replies, error), keeping the sessions routed to it. ("stats", request_id) returns its
+# counters and memory; None shuts it down. Both directions carry lists of messages (see _Outbox)
+def worker_main(conn, index):
+    import asyncio
+    from session_store import InMemorySessionStore
+
+    sessions = InMemorySessionStore()
+    locks = {}
+    counters = {"turns": 0, "errors": 0, "first_turn": None, "last_turn": None}
+    outbox = None
+
+    async def turn(request_id, session_id, message):
+        lock = locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            session = sessions.get(session_id) or prem_bot.new_session()
+            try:
+                replies = await prem_bot.respond_async(message, session)
+            except Exception as e:  # Answer the turn either way, so the caller is never left waiting
+                counters["errors"] += 1
+                outbox.put((request_id, None, f"{type(e).__name__}: {e}"))
+                return
+            for evicted in sessions.put(session_id, session):
+                locks.pop(evicted, None)
+        now = time.perf_counter()
+        counters["turns"] += 1
+        counters["first_turn"] = counters["first_turn"] or now
+        counters["last_turn"] = now
+        outbox.put((request_id, replies, None))
+
+    def stats():
+        elapsed = (counters["last_turn"] or 0) - (counters["first_turn"] or 0)
+        return {"worker": index, "pid": os.getpid(), "sessions": len(sessions), "turns": counters["turns"],
+                "errors": counters["errors"], "turns_per_s": round(counters["turns"] / elapsed) if elapsed else 0,
+                "cpu_s": round(time.process_time(), 3), **memory_usage()}
+
+    async def serve():
+        nonlocal outbox
+        loop = asyncio.get_running_loop()
+        outbox = _Outbox(conn, loop)
+        stopped = loop.create_future()
+
+        def on_readable():
+            while conn.poll():
+                try:
+                    requests = conn.recv()
+                except EOFError:  # The parent went away
+                    requests = None
+                if requests is None:
+                    loop.remove_reader(conn.fileno())
+                    if not stopped.done():
+                        stopped.set_result(None)
+                    return
+                for request in requests:
+                    if request[0] == "stats":
+                        outbox.put((request[1], stats(), None))
+                    else:
+                        asyncio.ensure_future(turn(*request[1:]))
+
+        loop.add_reader(conn.fileno(), on_readable)
+        await stopped
+
+    if index == 0:
+        prem_bot.start_fixtures_sync()  # One worker keeps the shared fixtures store fresh
+    prem_bot.start_team_alias_watch()  # Each worker has its own alias index
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        prem_bot.flush_profiles()
+        conn.close()
+
+
+class _Worker:
+    def __init__(self, index, process, conn, max_in_flight):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.max_in_flight = max_in_flight
+        self.pending = {}  # request_id -> future
+        self.slots = None  # asyncio.Semaphore and _Outbox, created on the serving loop
+        self.outbox = None
+
+
+# Pre-fork serving: the parent loads the read-only structures once (preload) and forks workers that
+# share them copy-on-write. Each conversation is pinned to one worker by its session ID, so its state
+# never leaves that process; different conversations run in parallel on different cores. Fork before
+# starting an event loop or any threads in the parent
+class WorkerPool:
+    def __init__(self, workers=PREFORK_WORKERS, max_in_flight=PREFORK_MAX_IN_FLIGHT):
+        self.size = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight
+        self.workers = []
+        self._request_ids = itertools.count()
+        self._loop = None
+
+    def start(self):
+        import multiprocessing
+
+        context = multiprocessing.get_context("fork")
+        preload()
+        for index in range(self.size):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=worker_main, args=(child_conn, index),
+                                      name=f"prem-bot-worker-{index}", daemon=True)
+            process.start()
+            child_conn.close()
+            self.workers.append(_Worker(index, process, parent_conn, self.max_in_flight))
+        return self
+
+    # Start reading worker replies on the running event loop (done on first use)
+    def _attach(self):
+        import asyncio
+
+        self._loop = asyncio.get_running_loop()
+        for worker in self.workers:
+            worker.slots = asyncio.Semaphore(worker.max_in_flight)
+            worker.outbox = _Outbox(worker.conn, self._loop)
+            self._loop.add_reader(worker.conn.fileno(), self._on_readable, worker)
+
+    def _on_readable(self, worker):
+        try:
+            while worker.conn.poll():
+                for request_id, result, error in worker.conn.recv():
+                    future = worker.pending.pop(request_id, None)
+                    if future is None or future.done():
+                        continue
+                    if error is None:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(RuntimeError(f"worker {worker.index}: {error}"))
+        except (EOFError, OSError):  # The worker died: fail its outstanding requests
+            self._loop.remove_reader(worker.conn.fileno())
+            for future in worker.pending.values():
+                if not future.done():
+                    future.set_exception(RuntimeError(f"worker {worker.index} exited"))
+            worker.pending.clear()
+
+    def worker_for(self, session_id):
+        return self.workers[zlib.crc32(session_id.encode("utf-8")) % len(self.workers)]
+
+    async def _call(self, worker, request):
+        if self._loop is None:
+            self._attach()
+        async with worker.slots:
+            request_id = next(self._request_ids)
+            future = self._loop.create_future()
+            worker.pending[request_id] = future
+            worker.outbox.put((request[0], request_id) + request[1:])
+            return await future
+
+    # Run one turn of a conversation on its worker; returns (session_id, replies)
+    async def turn(self, session_id, message):
+        session_id = session_id or uuid.uuid4().hex
+        replies = await self._call(self.worker_for(session_id), ("turn", session_id, message))
+        return session_id, replies
+
+    # Per-worker counters and memory (see memory_usage), plus the parent's own memory
+    async def stats(self):
+        import asyncio
+
+        workers = await asyncio.gather(*(self._call(worker, ("stats",)) for worker in self.workers))
+        return {"parent": {"pid": os.getpid(), **memory_usage()}, "workers": list(workers)}
+
+    def close(self, timeout=5):
+        for worker in self.workers:
+            if self._loop is not None:
+                self._loop.remove_reader(worker.conn.fileno())
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        self.workers = []
+
+
+# Answer stdin lines on a pool of workers, one conversation per line: python worker_pool.py [workers]
+if __name__ == "__main__":
+    import asyncio
+    import json
+
+    pool = WorkerPool(int(sys.argv[1]) if len(sys.argv) > 1 else PREFORK_WORKERS).start()
+
+    async def main():
+        lines = [line.rstrip("\n") for line in sys.stdin if line.strip()]
+        results = await asyncio.gather(*(pool.turn(None, line) for line in lines))
+        for line, (_, replies) in zip(lines, results):
+            print(json.dumps({"text": line, "replies": replies}, ensure_ascii=False))
+        print(json.dumps(await pool.stats(), indent=2), file=sys.stderr)
+
+    try:
+        asyncio.run(main())
+    finally:
+        pool.close()